@@ -0,0 +1,517 @@
+# Service HTTP/JSON local : les calculs de la page (indicateurs, balayage prix x volume,
+# projection de trésorerie) pour les tableurs et outils internes, sans Streamlit.
+#
+# Serveur asyncio de la bibliothèque standard ; les calculs sont exécutés dans un pool de
+# processus, la boucle ne fait que lire, répondre et consulter le cache. Les résultats sont
+# mis en cache par empreinte de scénario (scenario.hachage_scenario) : un tableau de bord qui
+# redemande les mêmes scénarios est servi depuis la mémoire.
+#
+# Points d'accès :
+#   GET  /sante          état du service et statistiques du cache
+#   GET  /defauts        scénario par défaut de la page (format de scenario.py)
+#   POST /indicateurs    {scénario} -> indicateurs (format de calculer_indicateurs())
+#   POST /balayage       {"scenario": {...}, "clients_max": 200, "multiplicateur_min": 0.5,
+#                         "multiplicateur_max": 1.5, "nb_multiplicateurs": 151} -> grille de profit
+#   POST /projection     {"scenario": {...}, "nb_mois": 60, ...options de projeter_tresorerie}
+#   POST /lot            scénarios en JSON Lines (un par ligne) ou tableau JSON -> indicateurs
+#                        en JSON Lines, dans l'ordre, envoyés au fil du calcul
+#
+# Un scénario ne précise que ce qui change par rapport au scénario par défaut : les
+# dictionnaires (prix_vente, charges_mensuelles...) sont fusionnés avec ceux par défaut, et
+# les clés aplaties "prix_vente.Crêpes" du simulateur en ligne de commande sont acceptées.
+# Les autres clés (identifiant...) sont recopiées dans les résultats du lot.
+# Les indicateurs sont calculés hors plan de financement (investissements en fonds propres,
+# sans amortissement), comme pour les scénarios de la bibliothèque.
+#
+# Exemple :
+#   python api.py --port 8765 --processus 4
+#   curl -s localhost:8765/indicateurs -d '{"prix_vente": {"Crêpes": 32}}'
+#   curl -s localhost:8765/lot --data-binary @scenarios.jsonl
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import defauts
+from balayage import grille_profit
+from bibliotheque import indicateurs_scenarios
+from cache import CacheLRU
+from moteur import calculer_indicateurs_scenario
+from projection import projeter_tresorerie
+from scenario import CLES_SCENARIO, hachage_scenario, scenario_depuis_session, vecteurs_scenario
+
+# Paramètres d'un scénario donnés par nom (produit, charge ou investissement)
+DICTIONNAIRES = ('prix_vente', 'cout_unitaire', 'commandes_jour', 'charges_mensuelles', 'charges_investissement')
+PARAMETRES_ACTIVITE = {'jours_activite': int, 'taux_impot': float, 'nb_associes': int}
+
+# Options acceptées par /projection (voir projection.projeter_tresorerie)
+OPTIONS_PROJECTION = {
+    'nb_mois': int, 'niveau_initial': float, 'duree_montee': int, 'mois_depart': int,
+    'inflation_prix': float, 'inflation_couts': float, 'inflation_charges': float,
+    'taux_actualisation': float,
+}
+
+# Scénarios évalués par bloc dans /lot, et blocs en vol par processus
+TAILLE_BLOC = 2_000
+BLOCS_PAR_PROCESSUS = 2
+
+# Taille maximale d'un corps de requête lu d'un coup (le lot JSON Lines est lu au fil de l'eau)
+TAILLE_MAX_CORPS = 64 << 20
+# Résultats conservés par le processus principal (une entrée par scénario ou ligne de lot) : de
+# quoi rejouer sans calcul les lots d'un tableau de bord de plusieurs centaines de milliers de lignes
+TAILLE_CACHE = 1 << 18
+
+STATUTS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ErreurRequete(Exception):
+    def __init__(self, message, statut=400):
+        super().__init__(message)
+        self.statut = statut
+
+
+# Scénario par défaut de la page (calculé une fois par processus)
+@functools.lru_cache(maxsize=1)
+def scenario_defaut():
+    return scenario_depuis_session(defauts.ETAT_INITIAL)
+
+
+# Scénario complet à partir d'une requête : valeurs par défaut de la page, remplacées par
+# celles de `donnees`. Retourne (scénario, autres clés de la requête).
+def completer_scenario(donnees):
+    if not isinstance(donnees, dict):
+        raise ErreurRequete("Un scénario doit être un objet JSON")
+    base = scenario_defaut()
+    modifications = {}
+    autres = {}
+    for cle, valeur in donnees.items():
+        parametre, _, nom = cle.partition('.')
+        if parametre in DICTIONNAIRES and nom:
+            modifications.setdefault(parametre, {})[nom] = valeur
+        elif parametre in DICTIONNAIRES:
+            if not isinstance(valeur, dict):
+                raise ErreurRequete(f"« {cle} » doit être un objet {{nom: valeur}}")
+            modifications.setdefault(parametre, {}).update(valeur)
+        elif cle in PARAMETRES_ACTIVITE or cle == 'produits':
+            modifications[cle] = valeur
+        else:
+            autres[cle] = valeur
+
+    try:
+        nouveaux = [nom for p in DICTIONNAIRES[:3] for nom in modifications.get(p, {})]
+        produits = [str(p) for p in modifications.get('produits', list(dict.fromkeys(base['produits'] + nouveaux)))]
+        scenario = {'produits': produits}
+        for parametre in DICTIONNAIRES:
+            valeurs = {**base[parametre], **modifications.get(parametre, {})}
+            if parametre in DICTIONNAIRES[:3]:
+                valeurs = {p: valeurs.get(p, 0.0) for p in produits}
+            scenario[parametre] = {str(nom): float(valeur) for nom, valeur in valeurs.items()}
+        for parametre, conversion in PARAMETRES_ACTIVITE.items():
+            scenario[parametre] = conversion(modifications.get(parametre, base[parametre]))
+    except (TypeError, ValueError) as erreur:
+        raise ErreurRequete(f"Scénario invalide : {erreur}")
+    return scenario, autres
+
+
+# Valeurs JSON : tableaux en listes, infinis et NaN en null (JSON strict)
+def en_json(valeur):
+    if isinstance(valeur, dict):
+        return {str(cle): en_json(v) for cle, v in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return [en_json(v) for v in valeur]
+    if isinstance(valeur, np.ndarray):
+        return en_json(valeur.tolist())
+    if isinstance(valeur, (float, np.floating)):
+        return float(valeur) if math.isfinite(valeur) else None
+    if isinstance(valeur, np.integer):
+        return int(valeur)
+    return valeur
+
+
+def _texte_json(valeur):
+    return json.dumps(en_json(valeur), ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+
+# Calculs exécutés dans les processus de travail (fonctions de module, sérialisables)
+def _indicateurs(scenario):
+    return calculer_indicateurs_scenario(*[scenario[cle] for cle in CLES_SCENARIO])
+
+
+def _balayage(scenario, clients_max, multiplicateur_min, multiplicateur_max, nb_multiplicateurs):
+    return grille_profit(*vecteurs_scenario(scenario), clients=np.arange(0, clients_max + 1),
+                         multiplicateurs=np.linspace(multiplicateur_min, multiplicateur_max, nb_multiplicateurs))
+
+
+def _projection(scenario, options, saisonnalite):
+    return projeter_tresorerie(*vecteurs_scenario(scenario)[:7], saisonnalite=saisonnalite, **options)
+
+
+# Indicateurs déjà calculés par le processus de travail, par empreinte de scénario (texte JSON)
+_CACHE_PROCESSUS = CacheLRU(65_536)
+
+
+# Scénario d'une ligne du lot, ou l'erreur qui l'empêche d'être lu
+def _scenario_ligne(ligne):
+    try:
+        return completer_scenario(_lire_json(ligne))
+    except ErreurRequete as erreur:
+        return erreur
+
+
+# Lignes JSON de résultats d'un bloc de lignes JSON de scénarios : lecture, empreinte,
+# évaluation des scénarios inconnus du processus en un lot par le moteur, puis formatage.
+# Une ligne illisible donne une ligne {"erreur": ...} à sa place, sans empêcher les autres.
+# Tout le travail par scénario est fait dans le processus de travail.
+def _lot(lignes):
+    scenarios = [_scenario_ligne(ligne) for ligne in lignes]
+    cles = [None if isinstance(lu, ErreurRequete) else hachage_scenario(lu[0]) for lu in scenarios]
+    inconnus = {}
+    for cle, lu in zip(cles, scenarios):
+        if cle is not None and cle not in inconnus and cle not in _CACHE_PROCESSUS:
+            inconnus[cle] = lu[0]
+    for cle, indicateurs in zip(inconnus, indicateurs_scenarios(list(inconnus.values()))):
+        _CACHE_PROCESSUS.ecrire(cle, _texte_json(indicateurs))
+    resultats = []
+    for cle, lu in zip(cles, scenarios):
+        if cle is None:
+            resultats.append(_texte_json({'erreur': str(lu)}))
+            continue
+        scenario, autres = lu
+        texte = _CACHE_PROCESSUS.lire(cle) or _texte_json(indicateurs_scenarios([scenario])[0])
+        # Clés recopiées de la requête placées avant les indicateurs, dans le même objet JSON
+        resultats.append(texte if not autres else f"{_texte_json(autres)[:-1]},{texte[1:]}")
+    return resultats
+
+
+class ServiceAPI:
+    def __init__(self, processus=None, taille_cache=TAILLE_CACHE, taille_bloc=TAILLE_BLOC):
+        self.processus = processus or os.cpu_count() or 1
+        self.taille_bloc = taille_bloc
+        self.cache = CacheLRU(taille_cache)
+        self.executeur = ProcessPoolExecutor(max_workers=self.processus,
+                                             mp_context=multiprocessing.get_context("spawn"))
+
+    def fermer(self):
+        self.executeur.shutdown(cancel_futures=True)
+
+    # Calcul dans le pool, mis en cache sous `cle`
+    async def calculer(self, cle, fonction, *args):
+        manquant = object()
+        resultat = self.cache.lire(cle, manquant)
+        if resultat is manquant:
+            resultat = await asyncio.get_running_loop().run_in_executor(self.executeur, fonction, *args)
+            self.cache.ecrire(cle, resultat)
+        return resultat
+
+    # --- Points d'accès simples : corps JSON -> réponse JSON ---
+
+    async def sante(self, corps):
+        return {'statut': 'ok', 'processus': self.processus, 'cache': self.cache.statistiques()}
+
+    async def defauts(self, corps):
+        return scenario_defaut()
+
+    async def indicateurs(self, corps):
+        scenario, _ = completer_scenario(_lire_json(corps))
+        return await self.calculer(f"indicateurs:{hachage_scenario(scenario)}", _indicateurs, scenario)
+
+    async def balayage(self, corps):
+        donnees = _lire_objet(corps)
+        scenario, _ = completer_scenario(donnees.get('scenario', {}))
+        try:
+            parametres = (int(donnees.get('clients_max', 200)), float(donnees.get('multiplicateur_min', 0.5)),
+                          float(donnees.get('multiplicateur_max', 1.5)), int(donnees.get('nb_multiplicateurs', 151)))
+        except (TypeError, ValueError) as erreur:
+            raise ErreurRequete(f"Paramètres de balayage invalides : {erreur}")
+        if not (0 <= parametres[0] <= 10_000 and 2 <= parametres[3] <= 1_000):
+            raise ErreurRequete("Grille de balayage trop grande (clients_max <= 10000, nb_multiplicateurs <= 1000)")
+        cle = f"balayage:{hachage_scenario(scenario)}:{parametres}"
+        return await self.calculer(cle, _balayage, scenario, *parametres)
+
+    async def projection(self, corps):
+        donnees = _lire_objet(corps)
+        scenario, _ = completer_scenario(donnees.get('scenario', {}))
+        inconnues = set(donnees) - set(OPTIONS_PROJECTION) - {'scenario', 'saisonnalite'}
+        if inconnues:
+            raise ErreurRequete(f"Options de projection inconnues : {', '.join(sorted(inconnues))}")
+        try:
+            options = {cle: conversion(donnees[cle]) for cle, conversion in OPTIONS_PROJECTION.items()
+                       if cle in donnees}
+            # Saisonnalité : {produit: [12 coefficients]}, 1 pour les produits absents
+            saisons = donnees.get('saisonnalite')
+            saisonnalite = None if saisons is None else np.array(
+                [saisons.get(p, [1.0] * 12) for p in scenario['produits']], dtype=float).reshape(-1, 12)
+        except (TypeError, ValueError, AttributeError) as erreur:
+            raise ErreurRequete(f"Options de projection invalides : {erreur}")
+        if not 1 <= options.get('nb_mois', 60) <= 600:
+            raise ErreurRequete("nb_mois doit être compris entre 1 et 600")
+        cle = f"projection:{hachage_scenario(scenario)}:{_texte_json([options, saisonnalite])}"
+        return await self.calculer(cle, _projection, scenario, options, saisonnalite)
+
+    # --- Lot : scénarios lus au fil de l'eau, résultats écrits au fil du calcul ---
+
+    # Lignes JSON de résultats du lot, par blocs, dans l'ordre des scénarios. Une ligne de
+    # requête déjà vue est servie depuis le cache (clé : empreinte de la ligne, sans la lire) ;
+    # les autres sont évaluées par blocs dans le pool, où les scénarios sont lus et reconnus
+    # par empreinte de scénario. Au plus BLOCS_PAR_PROCESSUS blocs en vol par processus : la
+    # mémoire reste bornée quel que soit le lot.
+    async def lot(self, lignes):
+        boucle = asyncio.get_running_loop()
+        en_cours = []
+        async for bloc in _par_blocs(lignes, self.taille_bloc):
+            cles = [f"lot:{hashlib.blake2b(ligne, digest_size=16).hexdigest()}" for ligne in bloc]
+            connus, a_calculer = {}, {}
+            for cle, ligne in zip(cles, bloc):
+                if cle not in connus and cle not in a_calculer:
+                    texte = self.cache.lire(cle)
+                    if texte is None:
+                        a_calculer[cle] = ligne
+                    else:
+                        connus[cle] = texte
+            tache = boucle.run_in_executor(self.executeur, _lot, list(a_calculer.values())) if a_calculer else None
+            en_cours.append((cles, connus, list(a_calculer), tache))
+            if len(en_cours) >= BLOCS_PAR_PROCESSUS * self.processus:
+                yield await self._terminer_bloc(*en_cours.pop(0))
+        while en_cours:
+            yield await self._terminer_bloc(*en_cours.pop(0))
+
+    async def _terminer_bloc(self, cles, connus, cles_calculees, tache):
+        if tache is not None:
+            for cle, texte in zip(cles_calculees, await tache):
+                self.cache.ecrire(cle, texte)
+                connus[cle] = texte
+        return [connus[cle] for cle in cles]
+
+
+# Regroupement d'un itérateur asynchrone de scénarios en listes de `taille` scénarios
+async def _par_blocs(scenarios, taille):
+    bloc = []
+    async for scenario in scenarios:
+        bloc.append(scenario)
+        if len(bloc) >= taille:
+            yield bloc
+            bloc = []
+    if bloc:
+        yield bloc
+
+
+def _lire_json(corps):
+    try:
+        return json.loads(corps or b'{}')
+    except (UnicodeDecodeError, json.JSONDecodeError) as erreur:
+        raise ErreurRequete(f"JSON invalide : {erreur}")
+
+
+# Corps JSON qui doit être un objet (paramètres nommés d'un point d'accès)
+def _lire_objet(corps):
+    donnees = _lire_json(corps)
+    if not isinstance(donnees, dict):
+        raise ErreurRequete("Le corps de la requête doit être un objet JSON")
+    return donnees
+
+
+# --- Protocole HTTP/1.1 minimal (requêtes successives sur une même connexion) ---
+
+# Morceaux du corps d'une requête, lus au fil de l'eau (Content-Length ou envoi par morceaux)
+async def _morceaux_corps(lecteur, entetes):
+    if entetes.get('transfer-encoding', '').lower() == 'chunked':
+        while taille := int((await lecteur.readline()).split(b';')[0].strip() or b'0', 16):
+            yield await lecteur.readexactly(taille)
+            await lecteur.readexactly(2)
+        await lecteur.readline()
+        return
+    restant = int(entetes.get('content-length', 0))
+    while restant > 0:
+        morceau = await lecteur.read(min(restant, 1 << 16))
+        if not morceau:
+            raise ErreurRequete("Corps de requête incomplet")
+        restant -= len(morceau)
+        yield morceau
+
+
+# Lignes du corps d'une requête (fins de ligne comprises), au fil de l'eau
+async def _lignes_corps(lecteur, entetes):
+    reste = b''
+    async for morceau in _morceaux_corps(lecteur, entetes):
+        donnees = reste + morceau
+        coupure = donnees.rfind(b'\n') + 1
+        for ligne in donnees[:coupure].splitlines(keepends=True):
+            yield ligne
+        reste = donnees[coupure:]
+    if reste:
+        yield reste
+
+
+async def _lire_corps(lecteur, entetes):
+    morceaux, total = [], 0
+    async for morceau in _morceaux_corps(lecteur, entetes):
+        total += len(morceau)
+        if total > TAILLE_MAX_CORPS:
+            raise ErreurRequete("Corps de requête trop volumineux (utilisez /lot en JSON Lines)", 413)
+        morceaux.append(morceau)
+    return b''.join(morceaux)
+
+
+# Scénarios d'un lot, une ligne JSON (octets) par scénario : JSON Lines lues au fil de l'eau,
+# ou tableau JSON (reconnu à sa première ligne) lu d'un coup puis découpé
+async def _scenarios_lot(lecteur, entetes):
+    lignes = _lignes_corps(lecteur, entetes)
+    premiere = True
+    async for ligne in lignes:
+        ligne = ligne.strip()
+        if not ligne:
+            continue
+        if premiere and ligne.startswith(b'['):
+            reste = [ligne] + [suite async for suite in lignes]
+            contenu = _lire_json(b''.join(reste))
+            if not isinstance(contenu, list):
+                raise ErreurRequete("Le lot doit être un tableau JSON ou des lignes JSON")
+            for scenario in contenu:
+                yield json.dumps(scenario, ensure_ascii=False).encode('utf-8')
+            return
+        premiere = False
+        yield ligne
+
+
+def _entete_reponse(statut, type_contenu, longueur=None, garder=True):
+    lignes = [f"HTTP/1.1 {statut} {STATUTS.get(statut, '')}", f"Content-Type: {type_contenu}",
+              f"Content-Length: {longueur}" if longueur is not None else "Transfer-Encoding: chunked"]
+    if not garder:
+        lignes.append("Connection: close")
+    return ("\r\n".join(lignes) + "\r\n\r\n").encode('latin-1')
+
+
+async def _repondre_json(ecrivain, statut, valeur, garder=True):
+    corps = (_texte_json(valeur) + "\n").encode('utf-8')
+    ecrivain.write(_entete_reponse(statut, "application/json; charset=utf-8", len(corps), garder) + corps)
+    await ecrivain.drain()
+
+
+# Réponse JSON Lines envoyée par morceaux : un morceau par bloc de résultats. Une erreur en
+# cours de flux (scénario invalide au milieu du lot) est signalée par une dernière ligne
+# {"erreur": ...}, l'en-tête étant déjà parti avec le statut 200. Retourne False après une
+# erreur (le reste du corps n'est pas lu : la connexion ne peut pas être réutilisée).
+async def _repondre_lot(ecrivain, lignes, garder=True):
+    ecrivain.write(_entete_reponse(200, "application/x-ndjson; charset=utf-8", garder=garder))
+    complet = True
+    try:
+        async for bloc in lignes:
+            _ecrire_morceau(ecrivain, ("\n".join(bloc) + "\n").encode('utf-8'))
+            await ecrivain.drain()
+    except ConnectionError:
+        raise
+    except Exception as erreur:
+        message = str(erreur) if isinstance(erreur, ErreurRequete) else f"{type(erreur).__name__} : {erreur}"
+        _ecrire_morceau(ecrivain, (_texte_json({'erreur': message}) + "\n").encode('utf-8'))
+        complet = False
+    ecrivain.write(b"0\r\n\r\n")
+    await ecrivain.drain()
+    return complet
+
+
+def _ecrire_morceau(ecrivain, donnees):
+    ecrivain.write(f"{len(donnees):X}\r\n".encode('ascii') + donnees + b"\r\n")
+
+
+class ServeurAPI:
+    def __init__(self, service):
+        self.service = service
+        self.routes = {
+            ('GET', '/sante'): service.sante,
+            ('GET', '/defauts'): service.defauts,
+            ('POST', '/indicateurs'): service.indicateurs,
+            ('POST', '/balayage'): service.balayage,
+            ('POST', '/projection'): service.projection,
+        }
+
+    async def connexion(self, lecteur, ecrivain):
+        try:
+            while await self._requete(lecteur, ecrivain):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            ecrivain.close()
+
+    # Traitement d'une requête ; False quand la connexion doit être fermée
+    async def _requete(self, lecteur, ecrivain):
+        ligne = await lecteur.readline()
+        if not ligne.strip():
+            return False
+        try:
+            methode, cible, version = ligne.decode('latin-1').split()
+        except ValueError:
+            await _repondre_json(ecrivain, 400, {'erreur': "Requête HTTP invalide"}, False)
+            return False
+        entetes = {}
+        while (entete := await lecteur.readline()).strip():
+            nom, _, valeur = entete.decode('latin-1').partition(':')
+            entetes[nom.strip().lower()] = valeur.strip()
+        chemin = urlsplit(cible).path.rstrip('/') or '/'
+        garder = (entetes.get('connection', '').lower() != 'close') and version == 'HTTP/1.1'
+
+        if (methode, chemin) == ('POST', '/lot'):
+            complet = await _repondre_lot(ecrivain, self.service.lot(_scenarios_lot(lecteur, entetes)), garder)
+            return garder and complet
+        try:
+            corps = await _lire_corps(lecteur, entetes)
+        except (ErreurRequete, ValueError) as erreur:
+            # Corps illisible ou non lu en entier : la connexion ne peut pas être réutilisée
+            await _repondre_json(ecrivain, getattr(erreur, 'statut', 400), {'erreur': str(erreur)}, False)
+            return False
+        try:
+            traitement = self.routes.get((methode, chemin))
+            if traitement is None:
+                connu = any(route == chemin for _, route in self.routes) or chemin == '/lot'
+                raise ErreurRequete(f"{methode} {chemin} non disponible", 405 if connu else 404)
+            statut, reponse = 200, await traitement(corps)
+        except ErreurRequete as erreur:
+            statut, reponse = erreur.statut, {'erreur': str(erreur)}
+        except Exception as erreur:
+            statut, reponse = 500, {'erreur': f"{type(erreur).__name__} : {erreur}"}
+        await _repondre_json(ecrivain, statut, reponse, garder)
+        return garder
+
+
+async def servir(hote="127.0.0.1", port=8765, processus=None, taille_cache=TAILLE_CACHE, pret=None):
+    service = ServiceAPI(processus, taille_cache)
+    serveur = await asyncio.start_server(ServeurAPI(service).connexion, hote, port, limit=TAILLE_MAX_CORPS)
+    try:
+        async with serveur:
+            adresse = serveur.sockets[0].getsockname()
+            print(f"Service SimuProfit sur http://{adresse[0]}:{adresse[1]} "
+                  f"({service.processus} processus de calcul)", file=sys.stderr)
+            if pret is not None:
+                pret(adresse)
+            await serveur.serve_forever()
+    finally:
+        service.fermer()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON local du simulateur")
+    parser.add_argument("--hote", default="127.0.0.1", help="Adresse d'écoute (défaut : 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port d'écoute (défaut : 8765)")
+    parser.add_argument("--processus", type=int, default=None,
+                        help="Nombre de processus de calcul (défaut : nombre de cœurs)")
+    parser.add_argument("--taille-cache", type=int, default=TAILLE_CACHE,
+                        help="Nombre de résultats conservés en mémoire (défaut : %(default)s)")
+    args = parser.parse_args(arguments)
+    try:
+        asyncio.run(servir(args.hote, args.port, args.processus, args.taille_cache))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
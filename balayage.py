@@ -0,0 +1,44 @@
+# Balayage prix x volume : profit net sur une grille (multiplicateur de prix, clients/jour)
+# en conservant la répartition actuelle des commandes entre produits.
+import numpy as np
+
+from moteur import calculer_indicateurs_lot
+
+
+# Répartition des commandes entre produits (parts qui somment à 1)
+def repartition_commandes(commandes_jour):
+    commandes = np.asarray(commandes_jour, dtype=float)
+    total = commandes.sum()
+    if total > 0:
+        return commandes / total
+    # Sans commandes saisies, on suppose une répartition uniforme
+    return np.full(len(commandes), 1.0 / max(len(commandes), 1))
+
+
+# Profit net (et indicateurs associés) pour chaque cellule de la grille.
+# `financement` : charges_financieres, dotations et apport de calculer_indicateurs_lot.
+# Retourne des tableaux de forme (len(multiplicateurs), len(clients)).
+def grille_profit(prix_vente, cout_unitaire, commandes_jour, charges_mensuelles,
+                  charges_investissement, jours_activite, taux_impot, nb_associes,
+                  clients, multiplicateurs, **financement):
+    clients = np.asarray(clients, dtype=float)
+    multiplicateurs = np.asarray(multiplicateurs, dtype=float)
+    prix = np.asarray(prix_vente, dtype=float)
+    repartition = repartition_commandes(commandes_jour)
+    forme = (len(multiplicateurs), len(clients))
+
+    # Toute la grille est évaluée comme un seul lot de scénarios (une ligne par cellule)
+    prix_grille = np.broadcast_to(multiplicateurs[:, np.newaxis, np.newaxis] * prix,
+                                  forme + (len(prix),)).reshape(-1, len(prix))
+    commandes_grille = np.broadcast_to(clients[np.newaxis, :, np.newaxis] * repartition,
+                                       forme + (len(prix),)).reshape(-1, len(prix))
+    lot = calculer_indicateurs_lot(prix_grille, cout_unitaire, commandes_grille,
+                                   charges_mensuelles, charges_investissement,
+                                   jours_activite, taux_impot, nb_associes, **financement)
+
+    return {
+        'clients': clients,
+        'multiplicateurs': multiplicateurs,
+        'profit_net': lot['profit_net'].reshape(forme),
+        'profit_par_associe': lot['profit_par_associe'].reshape(forme),
+    }
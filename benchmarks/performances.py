@@ -0,0 +1,472 @@
+# Mesures de performance comparables d'un commit à l'autre :
+#   - débit du moteur (calculer_indicateurs_lot) de 1 à 1 000 000 scénarios ;
+#   - démarrage à froid et réexécution à chaud de la page complète, pilotée sans navigateur
+#     par le banc d'essai de Streamlit (AppTest), dans un interpréteur neuf ;
+#   - mémoire de pointe par session (tracemalloc) et mémoire propre de ses paramètres ;
+#   - démarrage d'un processus : import de Streamlit, imports du script et premier affichage
+#     (résumé financier), modules lourds chargés à ce stade ;
+#   - importation d'un an d'exports de caisse (ventes_pos.py), puis réimportation incrémentale ;
+#   - simulation de la capacité de service (capacite.py) : un mois pour des centaines de variantes ;
+#   - coûts unitaires et achats d'ingrédients (recettes.py) pour des milliers de scénarios de prix ;
+#   - échéanciers de financement (financement.py) d'une grille de structures d'emprunt ;
+#   - modifications de prix propagées par le graphe d'indicateurs (graphe_indicateurs.py).
+# Les résultats sont écrits en JSON avec le commit courant ; --reference compare à un
+# fichier précédent et retourne un code d'erreur en cas de régression.
+#
+# Exemple :
+#   python benchmarks/performances.py --sortie benchmarks/resultats/actuel.json
+#   python benchmarks/performances.py --reference benchmarks/resultats/main.json --seuil 0.2
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import numpy as np
+
+from moteur import calculer_indicateurs_lot
+
+PAGE = os.path.join(RACINE, "creptime_simulateur_final.py")
+
+# Tailles de lot mesurées pour le moteur
+TAILLES_LOT = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Sens d'amélioration de chaque mesure (pour la comparaison entre deux fichiers)
+PLUS_GRAND_MEILLEUR = ('scenarios_par_seconde', 'lignes_par_seconde', 'journees_par_seconde',
+                       'modifications_par_seconde')
+
+# Lignes de l'export de caisse synthétique (un an de tickets)
+LIGNES_VENTES = 2_000_000
+
+# Variantes d'effectif et d'équipement simulées sur un mois pour la capacité de service
+VARIANTES_CAPACITE = 300
+
+# Nomenclature synthétique (produits x ingrédients, ingrédients par recette) et scénarios de
+# prix d'ingrédients évalués en un lot
+TAILLE_RECETTES = (300, 500, 8)
+SCENARIOS_PRIX = 10_000
+
+# Structures de financement (part empruntée x durée du crédit) et horizon des échéanciers
+STRUCTURES_FINANCEMENT = (100, 100)
+MOIS_FINANCEMENT = 60
+
+# Portefeuille (sites, produits) et nombre de modifications de prix du graphe d'indicateurs
+TAILLE_GRAPHE = (200, 500)
+MODIFICATIONS_GRAPHE = 1_000
+
+
+# Lot aléatoire de n scénarios de la taille de la page (7 produits, 7 charges, 22 investissements)
+def lot_aleatoire(n, graine=0):
+    rng = np.random.default_rng(graine)
+    couts = rng.uniform(3, 15, (n, 7))
+    return (
+        couts * rng.uniform(1.5, 4, (n, 7)),
+        couts,
+        rng.integers(0, 60, (n, 7)).astype(float),
+        rng.uniform(300, 8000, (n, 7)),
+        rng.uniform(500, 30000, (n, 22)),
+        rng.integers(20, 31, n),
+        20.0,
+        6,
+    )
+
+
+# Débit du moteur : meilleur temps sur `repetitions` exécutions (au moins 0,2 s cumulées)
+def mesurer_moteur(tailles=TAILLES_LOT, repetitions=5):
+    resultats = []
+    for n in tailles:
+        lot = lot_aleatoire(n)
+        calculer_indicateurs_lot(*lot)
+        temps = []
+        while len(temps) < repetitions or sum(temps) < 0.2:
+            debut = time.perf_counter()
+            calculer_indicateurs_lot(*lot)
+            temps.append(time.perf_counter() - debut)
+        meilleur = min(temps)
+        resultats.append({
+            'scenarios': n,
+            'secondes': meilleur,
+            'scenarios_par_seconde': n / meilleur,
+        })
+    return resultats
+
+
+# Mesures de la page, exécutées dans un interpréteur neuf (spawn) : le démarrage à froid
+# inclut les imports et le remplissage des caches. Les temps et la mémoire sont mesurés
+# dans deux interpréteurs distincts, tracemalloc ralentissant fortement l'exécution.
+def _nouvelle_session():
+    os.environ.setdefault("CREPTIME_BIBLIOTHEQUE", ":memory:")
+    from streamlit.testing.v1 import AppTest
+    session = AppTest.from_file(PAGE, default_timeout=120)
+    session.run()
+    if session.exception:
+        raise RuntimeError(f"Exception dans la page : {session.exception[0].value}")
+    return session
+
+
+def _mesurer_temps_page(nb_reexecutions):
+    debut = time.perf_counter()
+    session = _nouvelle_session()
+    froid = time.perf_counter() - debut
+
+    chaud = []
+    for _ in range(nb_reexecutions):
+        debut = time.perf_counter()
+        session.run()
+        chaud.append(time.perf_counter() - debut)
+    return {
+        'demarrage_froid_s': froid,
+        'reexecution_chaude_s': statistics.median(chaud),
+        'reexecution_chaude_max_s': max(chaud),
+    }
+
+
+# Mémoire de pointe de la première session (caches partagés compris), puis mémoire retenue
+# et pointe des sessions suivantes, qui trouvent les caches partagés déjà remplis
+def _mesurer_memoire_page(nb_sessions):
+    import resource
+    import tracemalloc
+    tracemalloc.start()
+    sessions = [_nouvelle_session()]
+    _, pic_premiere = tracemalloc.get_traced_memory()
+
+    avant, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(nb_sessions):
+        sessions.append(_nouvelle_session())
+    apres, pic_suivantes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    from defauts import memoire_session
+    etat_session = sessions[-1].session_state
+    return {
+        'memoire_etat_session_ko': memoire_session(etat_session) / 2**10,
+        'memoire_pic_premiere_session_mo': pic_premiere / 2**20,
+        'memoire_retenue_par_session_mo': (apres - avant) / 2**20 / max(nb_sessions, 1),
+        'memoire_pic_session_suivante_mo': (pic_suivantes - avant) / 2**20,
+        'memoire_processus_max_mo': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10,
+    }
+
+
+def _dans_nouvel_interpreteur(fonction, *args):
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexte) as executeur:
+        return executeur.submit(fonction, *args).result()
+
+
+#   nb_reexecutions : réexécutions à chaud mesurées
+#   nb_sessions : sessions ouvertes après la première pour estimer la mémoire par session
+def mesurer_page(nb_reexecutions=10, nb_sessions=3):
+    resultats = _dans_nouvel_interpreteur(_mesurer_temps_page, nb_reexecutions)
+    resultats.update(_dans_nouvel_interpreteur(_mesurer_memoire_page, nb_sessions))
+    return resultats
+
+
+# Démarrage d'un processus neuf : import de Streamlit, puis première exécution de la page
+# profilée (CREPTIME_PROFILAGE=1), dont on lit les intervalles "imports" et "premier_affichage"
+def _mesurer_demarrage():
+    debut = time.perf_counter()
+    import streamlit  # noqa: F401
+    import_streamlit = time.perf_counter() - debut
+
+    os.environ["CREPTIME_PROFILAGE"] = "1"
+    session = _nouvelle_session()
+    profil = session.session_state["profilage_historique"][0]
+    durees = {e['nom']: e['duree'] / 1e9 for e in profil.evenements if e['categorie'] == 'demarrage'}
+    return {
+        'import_streamlit_s': import_streamlit,
+        'imports_script_s': durees['imports'],
+        'premier_affichage_s': durees['premier_affichage'],
+        'modules_lourds': [e['arguments']['modules_lourds'] for e in profil.evenements
+                           if e['nom'] == 'premier_affichage'][0],
+    }
+
+
+def mesurer_demarrage():
+    return _dans_nouvel_interpreteur(_mesurer_demarrage)
+
+
+# Importation d'un export de caisse synthétique d'un an (12 fichiers mensuels) dans un dossier
+# d'état, puis réimportation des mêmes fichiers (aucun ne doit être relu)
+def mesurer_ventes_pos(nb_lignes=LIGNES_VENTES, graine=0):
+    import pandas as pd
+
+    from ventes_pos import importer_fichiers
+
+    rng = np.random.default_rng(graine)
+    articles = np.array(["Crêpes", "Gaufres", "Pancakes", "Glaces", "Salades/Bowls", "Jus", "Boissons chaudes"])
+    with tempfile.TemporaryDirectory() as dossier:
+        chemins = []
+        for mois, lignes in enumerate(np.array_split(np.arange(nb_lignes), 12)):
+            debut = np.datetime64(f"2025-{mois + 1:02d}-01T08:00:00")
+            secondes = np.sort(rng.integers(0, 28 * 86_400, len(lignes)))
+            chemin = os.path.join(dossier, f"ventes_{mois + 1:02d}.csv")
+            pd.DataFrame({'date': np.datetime_as_string(debut + secondes.astype('timedelta64[s]')),
+                          'article': articles[rng.integers(0, len(articles), len(lignes))],
+                          'quantite': rng.integers(1, 3, len(lignes))}).to_csv(chemin, index=False)
+            chemins.append(chemin)
+
+        etat = os.path.join(dossier, "etat")
+        debut = time.perf_counter()
+        ventes, _ = importer_fichiers(chemins, etat)
+        importation = time.perf_counter() - debut
+        debut = time.perf_counter()
+        _, relus = importer_fichiers(chemins, etat)
+        reimportation = time.perf_counter() - debut
+    return {
+        'lignes': ventes.lignes,
+        'importation_s': importation,
+        'lignes_par_seconde': ventes.lignes / importation,
+        'reimportation_s': reimportation,
+        'fichiers_relus': len(relus),
+    }
+
+
+# Capacité de service : un mois de journées pour `nb_variantes` variantes d'effectif et
+# d'équipement des produits de la page, à quatre fois la demande par défaut (files chargées)
+def mesurer_capacite(nb_variantes=VARIANTES_CAPACITE, nb_jours=30):
+    import defauts
+    from capacite import parametres_defaut, simuler_capacite
+
+    rng = np.random.default_rng(0)
+    temps, postes, equipements = parametres_defaut(defauts.CATALOGUE.noms)
+    nb_equipements = rng.integers(1, 3, (nb_variantes, len(equipements)))
+    nb_employes = rng.integers(1, 6, nb_variantes)
+    debut = time.perf_counter()
+    simuler_capacite(defauts.CATALOGUE.commandes_jour * 4, temps, postes, nb_equipements, nb_employes,
+                     nb_jours=nb_jours, prix_vente=defauts.CATALOGUE.prix_vente, graine=0)
+    secondes = time.perf_counter() - debut
+    return {
+        'variantes': nb_variantes,
+        'secondes': secondes,
+        'journees_par_seconde': nb_variantes * nb_jours / secondes,
+    }
+
+
+# Recettes : coûts unitaires et achats d'ingrédients d'une nomenclature synthétique pour
+# `nb_scenarios` scénarios de prix et de volumes
+def mesurer_recettes(taille=TAILLE_RECETTES, nb_scenarios=SCENARIOS_PRIX, graine=0):
+    from recettes import Recettes
+
+    nb_produits, nb_ingredients, par_recette = taille
+    rng = np.random.default_rng(graine)
+    lignes = [(f"produit {p}", f"ingrédient {i}", q) for p in range(nb_produits)
+              for i, q in zip(rng.choice(nb_ingredients, par_recette, replace=False),
+                              rng.uniform(0.01, 1.0, par_recette))]
+    recettes = Recettes.depuis_lignes(lignes, [f"ingrédient {i}" for i in range(nb_ingredients)])
+    prix = rng.uniform(1.0, 100.0, nb_ingredients) * rng.lognormal(0.0, 0.1, (nb_scenarios, nb_ingredients))
+    pertes = rng.uniform(0.0, 0.2, nb_ingredients)
+    volumes = rng.uniform(0.0, 50.0, (nb_scenarios, nb_produits))
+    debut = time.perf_counter()
+    recettes.couts_unitaires(prix, pertes)
+    recettes.achats(volumes, pertes)
+    secondes = time.perf_counter() - debut
+    return {
+        'produits': nb_produits,
+        'ingredients': nb_ingredients,
+        'scenarios': nb_scenarios,
+        'secondes': secondes,
+        'scenarios_par_seconde': nb_scenarios / secondes,
+    }
+
+
+# Financement : échéanciers et indicateurs de la page pour une grille de structures d'emprunt
+# (part empruntée x durée) des investissements par défaut
+def mesurer_financement(grille=STRUCTURES_FINANCEMENT, nb_mois=MOIS_FINANCEMENT):
+    import defauts
+    from financement import DUREES_AMORTISSEMENT_USUELLES, PlanFinancement, deductions_mensuelles, echeanciers, \
+        structures_emprunt
+    from moteur import calculer_indicateurs_lot
+    from scenario import scenario_depuis_session, vecteurs_scenario
+
+    noms = list(defauts.CHARGES_INVESTISSEMENT)
+    plan = PlanFinancement(noms, [0] * len(noms), [1.0] * len(noms), [0.0] * len(noms), [0.0] * len(noms),
+                           [DUREES_AMORTISSEMENT_USUELLES.get(nom, 0) for nom in noms])
+    vecteurs = vecteurs_scenario(scenario_depuis_session(dict(defauts.ETAT_INITIAL)))
+    debut = time.perf_counter()
+    structures = structures_emprunt(plan.aligner(noms), 7.0, np.linspace(0.0, 1.0, grille[0]),
+                                    np.linspace(12, 120, grille[1]).round())
+    echeancier = echeanciers(defauts.CHARGES_INVESTISSEMENT.montants, structures['sources'], structures['parts'],
+                             structures['taux'], structures['durees'], structures['durees_amortissement'],
+                             nb_mois=nb_mois)
+    calculer_indicateurs_lot(*vecteurs, **deductions_mensuelles(echeancier))
+    secondes = time.perf_counter() - debut
+    return {
+        'structures': len(structures['part']),
+        'postes': len(noms),
+        'mois': nb_mois,
+        'secondes': secondes,
+        'scenarios_par_seconde': len(structures['part']) / secondes,
+    }
+
+
+# Graphe d'indicateurs : modifications de prix propagées une à une sur un portefeuille, comparées
+# au recalcul complet du lot
+def mesurer_graphe(taille=TAILLE_GRAPHE, nb_modifications=MODIFICATIONS_GRAPHE, graine=0):
+    from graphe_indicateurs import GrapheIndicateurs
+    from moteur import calculer_indicateurs_lot
+
+    nb_sites, nb_produits = taille
+    rng = np.random.default_rng(graine)
+    entrees = (rng.uniform(10.0, 60.0, nb_produits), rng.uniform(2.0, 20.0, nb_produits),
+               rng.uniform(0.0, 30.0, (nb_sites, nb_produits)), rng.uniform(0.0, 5_000.0, (nb_sites, 12)),
+               rng.uniform(0.0, 50_000.0, (nb_sites, 8)))
+    debut = time.perf_counter()
+    calculer_indicateurs_lot(*entrees)
+    recalcul = time.perf_counter() - debut
+    graphe = GrapheIndicateurs(*entrees)
+    produits = rng.integers(0, nb_produits, nb_modifications)
+    prix = rng.uniform(10.0, 60.0, nb_modifications)
+    debut = time.perf_counter()
+    for produit, valeur in zip(produits, prix):
+        graphe.modifier('prix_vente', valeur, produit)
+    secondes = time.perf_counter() - debut
+    return {
+        'sites': nb_sites,
+        'produits': nb_produits,
+        'modifications': nb_modifications,
+        'recalcul_complet_s': recalcul,
+        'secondes': secondes,
+        'modifications_par_seconde': nb_modifications / secondes,
+    }
+
+
+# Commit courant (suffixé de "+modifs" si l'arbre de travail n'est pas propre)
+def commit_courant():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=RACINE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        modifie = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=RACINE,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+modifs" if modifie else "")
+
+
+def environnement():
+    return {
+        'commit': commit_courant(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plateforme': platform.platform(),
+        'processeurs': os.cpu_count(),
+    }
+
+
+# Mesures comparables à plat : {"moteur.1000.scenarios_par_seconde": ..., "page.demarrage_froid_s": ...}
+def mesures_a_plat(resultats):
+    mesures = {}
+    for ligne in resultats.get('moteur', []):
+        mesures[f"moteur.{ligne['scenarios']}.scenarios_par_seconde"] = ligne['scenarios_par_seconde']
+    for cle, valeur in resultats.get('page', {}).items():
+        mesures[f"page.{cle}"] = valeur
+    for cle, valeur in resultats.get('demarrage', {}).items():
+        if isinstance(valeur, (int, float)):
+            mesures[f"demarrage.{cle}"] = valeur
+    for cle in ('importation_s', 'lignes_par_seconde', 'reimportation_s'):
+        if cle in resultats.get('ventes_pos', {}):
+            mesures[f"ventes_pos.{cle}"] = resultats['ventes_pos'][cle]
+    if 'capacite' in resultats:
+        mesures["capacite.journees_par_seconde"] = resultats['capacite']['journees_par_seconde']
+    if 'recettes' in resultats:
+        mesures["recettes.scenarios_par_seconde"] = resultats['recettes']['scenarios_par_seconde']
+    if 'financement' in resultats:
+        mesures["financement.scenarios_par_seconde"] = resultats['financement']['scenarios_par_seconde']
+    if 'graphe' in resultats:
+        mesures["graphe.modifications_par_seconde"] = resultats['graphe']['modifications_par_seconde']
+    return mesures
+
+
+# Régressions de `resultats` par rapport à `reference` au-delà de `seuil` (0.2 = 20 %) :
+# liste de (mesure, valeur de référence, valeur actuelle, variation relative)
+def regressions(resultats, reference, seuil=0.2):
+    actuelles, anciennes = mesures_a_plat(resultats), mesures_a_plat(reference)
+    trouvees = []
+    for mesure, ancienne in anciennes.items():
+        if mesure not in actuelles or not ancienne:
+            continue
+        variation = actuelles[mesure] / ancienne - 1
+        pire = -variation if mesure.endswith(PLUS_GRAND_MEILLEUR) else variation
+        if pire > seuil:
+            trouvees.append((mesure, ancienne, actuelles[mesure], variation))
+    return trouvees
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Mesures de performance du simulateur")
+    parser.add_argument("--sortie", default=None,
+                        help="Fichier JSON des résultats (défaut : benchmarks/resultats/<commit>.json)")
+    parser.add_argument("--reference", default=None,
+                        help="Résultats précédents à comparer (code de sortie 1 en cas de régression)")
+    parser.add_argument("--seuil", type=float, default=0.2,
+                        help="Dégradation relative tolérée avant de signaler une régression (défaut : 0.2)")
+    parser.add_argument("--taille-max", type=int, default=TAILLES_LOT[-1],
+                        help="Plus grand lot mesuré pour le moteur (défaut : 1000000)")
+    parser.add_argument("--sans-page", action="store_true",
+                        help="Ne pas mesurer la page ni le démarrage (mesures sans Streamlit)")
+    parser.add_argument("--reexecutions", type=int, default=10,
+                        help="Nombre de réexécutions à chaud de la page (défaut : 10)")
+    args = parser.parse_args(arguments)
+
+    resultats = {'environnement': environnement()}
+    resultats['moteur'] = mesurer_moteur([n for n in TAILLES_LOT if n <= args.taille_max])
+    for ligne in resultats['moteur']:
+        print(f"moteur {ligne['scenarios']:>9} scénarios : {ligne['secondes'] * 1e3:9.3f} ms "
+              f"({ligne['scenarios_par_seconde']:,.0f} scénarios/s)")
+    resultats['ventes_pos'] = mesurer_ventes_pos()
+    print(f"ventes de caisse : {resultats['ventes_pos']['lignes']:,} lignes en "
+          f"{resultats['ventes_pos']['importation_s']:.2f} s, réimportation "
+          f"{resultats['ventes_pos']['reimportation_s'] * 1e3:.1f} ms")
+    resultats['capacite'] = mesurer_capacite()
+    print(f"capacité de service : {resultats['capacite']['variantes']} variantes x 30 jours en "
+          f"{resultats['capacite']['secondes']:.2f} s")
+    resultats['recettes'] = mesurer_recettes()
+    print(f"recettes : {resultats['recettes']['scenarios']:,} scénarios de prix x "
+          f"{resultats['recettes']['produits']} produits x {resultats['recettes']['ingredients']} ingrédients en "
+          f"{resultats['recettes']['secondes']:.2f} s")
+    resultats['financement'] = mesurer_financement()
+    print(f"financement : {resultats['financement']['structures']:,} structures x "
+          f"{resultats['financement']['postes']} postes x {resultats['financement']['mois']} mois en "
+          f"{resultats['financement']['secondes']:.2f} s")
+    resultats['graphe'] = mesurer_graphe()
+    print(f"graphe d'indicateurs : {resultats['graphe']['modifications']:,} modifications de prix sur "
+          f"{resultats['graphe']['sites']} sites x {resultats['graphe']['produits']} produits en "
+          f"{resultats['graphe']['secondes']:.2f} s (recalcul complet : "
+          f"{resultats['graphe']['recalcul_complet_s'] * 1e3:.1f} ms)")
+    if not args.sans_page:
+        resultats['page'] = mesurer_page(args.reexecutions)
+        for cle, valeur in resultats['page'].items():
+            print(f"page {cle} : {valeur:.3f}")
+        resultats['demarrage'] = mesurer_demarrage()
+        for cle, valeur in resultats['demarrage'].items():
+            print(f"démarrage {cle} : {valeur:.3f}" if isinstance(valeur, float) else f"démarrage {cle} : {valeur}")
+
+    sortie = args.sortie or os.path.join(
+        RACINE, "benchmarks", "resultats", f"{resultats['environnement']['commit'] or 'inconnu'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(sortie)), exist_ok=True)
+    with open(sortie, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, ensure_ascii=False, indent=2)
+    print(f"Résultats -> {sortie}")
+
+    if args.reference:
+        with open(args.reference, encoding='utf-8') as f:
+            reference = json.load(f)
+        trouvees = regressions(resultats, reference, args.seuil)
+        for mesure, ancienne, actuelle, variation in trouvees:
+            print(f"RÉGRESSION {mesure} : {ancienne:.6g} -> {actuelle:.6g} ({variation:+.1%})", file=sys.stderr)
+        if trouvees:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# Bibliothèque persistante de scénarios nommés (SQLite).
+# Les indicateurs calculés sont stockés en colonnes indexées à côté des saisies : une
+# recherche du type "roi_annuel > 30 trié par temps_retour" ne recalcule rien.
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from moteur import INDICATEURS, calculer_indicateurs_lot
+from scenario import CLES_SCENARIO, hachage_scenario, vecteurs_scenario
+
+# Indicateurs indexés (critères de recherche et de tri les plus courants)
+INDICATEURS_INDEXES = (
+    'profit_net', 'profit_par_associe', 'roi_annuel', 'temps_retour',
+    'marge_nette', 'revenu_brut', 'seuil_rentabilite', 'total_investissement',
+)
+
+# Opérateurs autorisés dans les filtres de recherche
+OPERATEURS = ('<', '<=', '>', '>=', '=', '!=')
+
+
+# Indicateurs scalaires d'une liste de scénarios (format de scenario.scenario_depuis_session),
+# hors plan de financement : un scénario enregistré ne contient pas de plan.
+# Les scénarios de même structure (mêmes produits, charges et investissements) sont
+# évalués ensemble en un seul lot par le moteur.
+def indicateurs_scenarios(scenarios):
+    groupes = {}
+    for position, scenario in enumerate(scenarios):
+        structure = (tuple(scenario['produits']), tuple(scenario['charges_mensuelles']),
+                     tuple(scenario['charges_investissement']))
+        groupes.setdefault(structure, []).append(position)
+
+    resultats = [None] * len(scenarios)
+    for positions in groupes.values():
+        vecteurs = list(zip(*[vecteurs_scenario(scenarios[p]) for p in positions]))
+        lot = calculer_indicateurs_lot(*vecteurs)
+        colonnes = {cle: lot[cle].tolist() for cle in INDICATEURS}
+        for rang, position in enumerate(positions):
+            resultats[position] = {cle: colonnes[cle][rang] for cle in INDICATEURS}
+    return resultats
+
+
+class BibliothequeScenarios:
+    def __init__(self, chemin='scenarios.db'):
+        self.chemin = chemin
+        # Connexion partagée entre les threads des sessions, sérialisée par un verrou
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self._connexion.row_factory = sqlite3.Row
+        self._verrou = threading.Lock()
+        self._creer_schema()
+
+    def _creer_schema(self):
+        colonnes = ",\n".join(f"    {cle} REAL" for cle in INDICATEURS)
+        with self._verrou, self._connexion:
+            if self.chemin != ':memory:':
+                self._connexion.execute("PRAGMA journal_mode=WAL")
+                self._connexion.execute("PRAGMA synchronous=NORMAL")
+            self._connexion.execute("PRAGMA foreign_keys=ON")
+            self._connexion.execute(f"""
+                CREATE TABLE IF NOT EXISTS scenarios (
+                    id INTEGER PRIMARY KEY,
+                    nom TEXT NOT NULL UNIQUE,
+                    empreinte TEXT NOT NULL,
+                    donnees TEXT NOT NULL,
+                    cree_le TEXT NOT NULL,
+                    modifie_le TEXT NOT NULL,
+                {colonnes}
+                )""")
+            self._connexion.execute("""
+                CREATE TABLE IF NOT EXISTS etiquettes (
+                    etiquette TEXT NOT NULL,
+                    scenario_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+                    PRIMARY KEY (etiquette, scenario_id)
+                )""")
+            self._connexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_scenarios_empreinte ON scenarios(empreinte)")
+            for cle in INDICATEURS_INDEXES:
+                self._connexion.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_scenarios_{cle} ON scenarios({cle})")
+
+    def fermer(self):
+        self._connexion.close()
+
+    # Enregistrement (ou remplacement) d'un scénario nommé
+    def enregistrer(self, nom, scenario, etiquettes=(), indicateurs=None):
+        self.enregistrer_lot([(nom, scenario, etiquettes, indicateurs)])
+
+    # Enregistrement de plusieurs scénarios en une seule transaction.
+    # Chaque élément : (nom, scenario) ou (nom, scenario, etiquettes, indicateurs)
+    def enregistrer_lot(self, elements):
+        maintenant = datetime.now().isoformat(timespec='seconds')
+        colonnes = ", ".join(INDICATEURS)
+        marqueurs = ", ".join("?" for _ in INDICATEURS)
+        mises_a_jour = ", ".join(f"{cle}=excluded.{cle}" for cle in INDICATEURS)
+        elements = list(elements)
+        calcules = iter(indicateurs_scenarios(
+            [e[1] for e in elements if len(e) < 4 or not e[3]]))
+        lignes = []
+        etiquettes_par_nom = {}
+        for element in elements:
+            nom, scenario = element[0], element[1]
+            etiquettes = element[2] if len(element) > 2 else ()
+            indicateurs = element[3] if len(element) > 3 and element[3] else next(calcules)
+            lignes.append((nom, hachage_scenario(scenario), json.dumps(scenario, ensure_ascii=False),
+                           maintenant, maintenant, *[indicateurs[cle] for cle in INDICATEURS]))
+            etiquettes_par_nom[nom] = etiquettes
+
+        with self._verrou, self._connexion:
+            self._connexion.executemany(f"""
+                INSERT INTO scenarios (nom, empreinte, donnees, cree_le, modifie_le, {colonnes})
+                VALUES (?, ?, ?, ?, ?, {marqueurs})
+                ON CONFLICT(nom) DO UPDATE SET
+                    empreinte=excluded.empreinte, donnees=excluded.donnees,
+                    modifie_le=excluded.modifie_le, {mises_a_jour}""", lignes)
+            paires = [(etiquette, nom) for nom, etiquettes in etiquettes_par_nom.items()
+                      for etiquette in etiquettes]
+            if paires:
+                self._connexion.executemany("""
+                    INSERT OR IGNORE INTO etiquettes (etiquette, scenario_id)
+                    SELECT ?, id FROM scenarios WHERE nom = ?""", paires)
+
+    # Scénario enregistré sous `nom` (KeyError s'il n'existe pas)
+    def charger(self, nom):
+        with self._verrou:
+            ligne = self._connexion.execute(
+                "SELECT donnees FROM scenarios WHERE nom = ?", (nom,)).fetchone()
+        if ligne is None:
+            raise KeyError(f"Scénario inconnu : {nom}")
+        return json.loads(ligne['donnees'])
+
+    def supprimer(self, nom):
+        with self._verrou, self._connexion:
+            self._connexion.execute("DELETE FROM scenarios WHERE nom = ?", (nom,))
+
+    def noms(self):
+        with self._verrou:
+            return [l['nom'] for l in self._connexion.execute("SELECT nom FROM scenarios ORDER BY nom")]
+
+    def etiqueter(self, nom, *etiquettes):
+        with self._verrou, self._connexion:
+            self._connexion.executemany("""
+                INSERT OR IGNORE INTO etiquettes (etiquette, scenario_id)
+                SELECT ?, id FROM scenarios WHERE nom = ?""", [(e, nom) for e in etiquettes])
+
+    def retirer_etiquette(self, nom, etiquette):
+        with self._verrou, self._connexion:
+            self._connexion.execute("""
+                DELETE FROM etiquettes WHERE etiquette = ?
+                AND scenario_id = (SELECT id FROM scenarios WHERE nom = ?)""", (etiquette, nom))
+
+    def etiquettes(self, nom=None):
+        with self._verrou:
+            if nom is None:
+                lignes = self._connexion.execute(
+                    "SELECT DISTINCT etiquette FROM etiquettes ORDER BY etiquette")
+            else:
+                lignes = self._connexion.execute("""
+                    SELECT etiquette FROM etiquettes JOIN scenarios ON scenarios.id = scenario_id
+                    WHERE nom = ? ORDER BY etiquette""", (nom,))
+            return [l['etiquette'] for l in lignes]
+
+    # Recherche sur les indicateurs stockés, sans recalcul.
+    #   filtres : {'roi_annuel': ('>', 30), ...}   etiquette : ne garder que les scénarios marqués
+    #   tri : indicateur de tri (ou 'nom')        decroissant : sens du tri
+    def rechercher(self, filtres=None, etiquette=None, tri='nom', decroissant=False, limite=100):
+        conditions = []
+        parametres = []
+        for cle, (operateur, valeur) in (filtres or {}).items():
+            if cle not in INDICATEURS or operateur not in OPERATEURS:
+                raise ValueError(f"Filtre invalide : {cle} {operateur}")
+            conditions.append(f"{cle} {operateur} ?")
+            parametres.append(valeur)
+        if etiquette is not None:
+            conditions.append(
+                "id IN (SELECT scenario_id FROM etiquettes WHERE etiquette = ?)")
+            parametres.append(etiquette)
+        if tri != 'nom' and tri not in INDICATEURS:
+            raise ValueError(f"Critère de tri invalide : {tri}")
+
+        requete = f"SELECT nom, modifie_le, {', '.join(INDICATEURS)} FROM scenarios"
+        if conditions:
+            requete += " WHERE " + " AND ".join(conditions)
+        requete += f" ORDER BY {tri} {'DESC' if decroissant else 'ASC'} LIMIT ?"
+        parametres.append(limite)
+
+        with self._verrou:
+            return [dict(l) for l in self._connexion.execute(requete, parametres)]
+
+    # Différences entre deux scénarios enregistrés : liste de
+    # (paramètre, nom de ligne ou None, valeur dans a, valeur dans b), indicateurs compris
+    def differences(self, nom_a, nom_b):
+        a, b = self.charger(nom_a), self.charger(nom_b)
+        differences = []
+        for cle in CLES_SCENARIO:
+            valeur_a, valeur_b = a.get(cle), b.get(cle)
+            if isinstance(valeur_a, dict) or isinstance(valeur_b, dict):
+                valeur_a, valeur_b = valeur_a or {}, valeur_b or {}
+                for ligne in list(valeur_a) + [l for l in valeur_b if l not in valeur_a]:
+                    if valeur_a.get(ligne) != valeur_b.get(ligne):
+                        differences.append((cle, ligne, valeur_a.get(ligne), valeur_b.get(ligne)))
+            elif valeur_a != valeur_b:
+                differences.append((cle, None, valeur_a, valeur_b))
+
+        with self._verrou:
+            lignes = {l['nom']: l for l in self._connexion.execute(
+                f"SELECT nom, {', '.join(INDICATEURS)} FROM scenarios WHERE nom IN (?, ?)",
+                (nom_a, nom_b))}
+        for cle in INDICATEURS:
+            if lignes[nom_a][cle] != lignes[nom_b][cle]:
+                differences.append(('indicateurs', cle, lignes[nom_a][cle], lignes[nom_b][cle]))
+        return differences
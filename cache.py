@@ -0,0 +1,65 @@
+# Cache mémoire borné (éviction LRU), partagé entre les sessions et sûr entre threads.
+# Les clés sont en général des empreintes de scénario (voir scenario.hachage_scenario).
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    def __init__(self, taille_max=128):
+        self.taille_max = taille_max
+        self.succes = 0
+        self.echecs = 0
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def __len__(self):
+        return len(self._entrees)
+
+    def __contains__(self, cle):
+        with self._verrou:
+            return cle in self._entrees
+
+    # Valeur associée à la clé (et marquée comme récemment utilisée), ou `defaut`
+    def lire(self, cle, defaut=None):
+        with self._verrou:
+            if cle not in self._entrees:
+                self.echecs += 1
+                return defaut
+            self._entrees.move_to_end(cle)
+            self.succes += 1
+            return self._entrees[cle]
+
+    # Enregistrement d'une valeur ; l'entrée la moins récemment utilisée est évincée si besoin
+    def ecrire(self, cle, valeur):
+        with self._verrou:
+            self._entrees[cle] = valeur
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    # Valeur en cache, sinon calculée par `calcul()` puis mémorisée.
+    # Le calcul se fait hors verrou : deux sessions peuvent calculer la même clé en parallèle,
+    # le résultat étant identique la dernière écriture l'emporte sans conséquence.
+    def obtenir(self, cle, calcul):
+        manquant = object()
+        valeur = self.lire(cle, manquant)
+        if valeur is manquant:
+            valeur = calcul()
+            self.ecrire(cle, valeur)
+        return valeur
+
+    # Suppression d'une entrée (sans effet si la clé est absente)
+    def retirer(self, cle):
+        with self._verrou:
+            self._entrees.pop(cle, None)
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self.succes = 0
+            self.echecs = 0
+
+    def statistiques(self):
+        with self._verrou:
+            return {'entrees': len(self._entrees), 'taille_max': self.taille_max,
+                    'succes': self.succes, 'echecs': self.echecs}
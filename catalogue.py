@@ -0,0 +1,238 @@
+# Catalogue de produits stocké en colonnes : noms et emojis en listes, prix, coûts et
+# commandes en tableaux NumPy alignés. Les agrégats se calculent sur les colonnes entières,
+# sans boucle par produit, et le catalogue peut compter des centaines de références
+# (variantes et tailles de menu).
+from collections.abc import Mapping
+
+import numpy as np
+
+from imports_differes import ModuleDiffere
+
+pd = ModuleDiffere("pandas")
+
+# Colonnes numériques du catalogue (mêmes noms que les paramètres du scénario)
+COLONNES = ('prix_vente', 'cout_unitaire', 'commandes_jour')
+
+# Emoji des produits ajoutés ou importés sans emoji
+EMOJI_DEFAUT = "🍽️"
+
+
+class Catalogue:
+    def __init__(self, noms=(), prix_vente=(), cout_unitaire=(), commandes_jour=(), emojis=None):
+        self.noms = [str(nom) for nom in noms]
+        self.emojis = [EMOJI_DEFAUT] * len(self.noms) if emojis is None else [e or EMOJI_DEFAUT for e in emojis]
+        self.prix_vente = np.asarray(prix_vente, dtype=float).reshape(-1)
+        self.cout_unitaire = np.asarray(cout_unitaire, dtype=float).reshape(-1)
+        self.commandes_jour = np.asarray(commandes_jour, dtype=float).reshape(-1)
+        self._verifier()
+
+    def _verifier(self):
+        tailles = {len(self.noms), len(self.emojis), *(len(getattr(self, c)) for c in COLONNES)}
+        if len(tailles) != 1:
+            raise ValueError("Les colonnes du catalogue n'ont pas la même longueur")
+        if len(set(self.noms)) != len(self.noms):
+            raise ValueError("Noms de produits en double dans le catalogue")
+        self._positions = {nom: i for i, nom in enumerate(self.noms)}
+
+    # Catalogue à partir des dictionnaires {nom: valeur} d'un scénario ; `produits` est
+    # une liste de noms ou un dictionnaire {nom: emoji}
+    @classmethod
+    def depuis_dictionnaires(cls, produits, prix_vente, cout_unitaire, commandes_jour):
+        noms = list(produits)
+        emojis = [produits[nom] for nom in noms] if isinstance(produits, dict) else None
+        return cls(noms, [prix_vente[n] for n in noms], [cout_unitaire[n] for n in noms],
+                   [commandes_jour[n] for n in noms], emojis)
+
+    # Catalogue à partir d'un DataFrame de colonnes produit, prix_vente, cout_unitaire,
+    # commandes_jour et, optionnellement, emoji (lignes sans nom ignorées)
+    @classmethod
+    def depuis_dataframe(cls, tableau):
+        manquantes = [c for c in ('produit',) + COLONNES if c not in tableau.columns]
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes dans le catalogue : {', '.join(manquantes)}")
+        tableau = tableau[tableau['produit'].notna()].drop_duplicates('produit', keep='last')
+        valeurs = {c: pd.to_numeric(tableau[c], errors='coerce').fillna(0.0).to_numpy() for c in COLONNES}
+        emojis = tableau['emoji'].where(tableau['emoji'].notna(), None).tolist() if 'emoji' in tableau else None
+        return cls(tableau['produit'].astype(str).tolist(), emojis=emojis, **valeurs)
+
+    # Lecture d'un fichier CSV (chemin ou objet fichier) au format de depuis_dataframe
+    @classmethod
+    def importer(cls, fichier):
+        return cls.depuis_dataframe(pd.read_csv(fichier))
+
+    def __len__(self):
+        return len(self.noms)
+
+    def __contains__(self, nom):
+        return nom in self._positions
+
+    # Catalogue figé (modèle partagé entre sessions) : noms en tuples, colonnes en lecture
+    # seule ; toute modification passe par copie()
+    def figer(self):
+        self.noms = tuple(self.noms)
+        self.emojis = tuple(self.emojis)
+        for colonne in COLONNES:
+            getattr(self, colonne).flags.writeable = False
+        return self
+
+    def copie(self):
+        return Catalogue(self.noms, self.prix_vente.copy(), self.cout_unitaire.copy(),
+                         self.commandes_jour.copy(), list(self.emojis))
+
+    # Positions (tableau d'entiers) des produits nommés
+    def positions(self, noms):
+        return np.fromiter((self._positions[nom] for nom in noms), dtype=np.intp)
+
+    # Libellés d'affichage "emoji nom"
+    def libelles(self):
+        return [f"{emoji} {nom}" for emoji, nom in zip(self.emojis, self.noms)]
+
+    # Paramètres produits au format de scenario.py (liste de noms et dictionnaires {nom: valeur})
+    def parametres_scenario(self):
+        return {
+            'produits': list(self.noms),
+            'prix_vente': dict(zip(self.noms, self.prix_vente.tolist())),
+            'cout_unitaire': dict(zip(self.noms, self.cout_unitaire.tolist())),
+            'commandes_jour': dict(zip(self.noms, self.commandes_jour.tolist())),
+        }
+
+    def en_dataframe(self):
+        return pd.DataFrame({
+            'emoji': self.emojis,
+            'produit': self.noms,
+            **{c: getattr(self, c) for c in COLONNES},
+        })
+
+    # Ajout de produits, ou mise à jour de ceux qui existent déjà (fusion d'un import)
+    def fusionner(self, autre):
+        existants = [i for i, nom in enumerate(autre.noms) if nom in self._positions]
+        if existants:
+            cibles = self.positions([autre.noms[i] for i in existants])
+            for colonne in COLONNES:
+                getattr(self, colonne)[cibles] = getattr(autre, colonne)[existants]
+            for i, cible in zip(existants, cibles):
+                self.emojis[cible] = autre.emojis[i]
+        nouveaux = [i for i, nom in enumerate(autre.noms) if nom not in self._positions]
+        self.noms += [autre.noms[i] for i in nouveaux]
+        self.emojis += [autre.emojis[i] for i in nouveaux]
+        for colonne in COLONNES:
+            setattr(self, colonne, np.concatenate([getattr(self, colonne), getattr(autre, colonne)[nouveaux]]))
+        self._verifier()
+
+    def ajouter(self, nom, prix_vente=0.0, cout_unitaire=0.0, commandes_jour=0.0, emoji=None):
+        self.fusionner(Catalogue([nom], [prix_vente], [cout_unitaire], [commandes_jour], [emoji]))
+
+    # Retrait de produits par nom (les noms inconnus sont ignorés)
+    def retirer(self, noms):
+        self.retirer_positions([self._positions[nom] for nom in noms if nom in self._positions])
+
+    def retirer_positions(self, positions):
+        garder = np.ones(len(self), dtype=bool)
+        garder[list(positions)] = False
+        self.noms = [nom for nom, g in zip(self.noms, garder) if g]
+        self.emojis = [emoji for emoji, g in zip(self.emojis, garder) if g]
+        for colonne in COLONNES:
+            setattr(self, colonne, getattr(self, colonne)[garder])
+        self._verifier()
+
+    # Application de l'état d'un éditeur de tableau (st.data_editor) construit sur en_dataframe() :
+    # cellules modifiées, puis lignes supprimées, puis lignes ajoutées (celles sans nom ignorées)
+    def appliquer_edition(self, edition):
+        renommages = {}
+        for position, valeurs in edition.get('edited_rows', {}).items():
+            position = int(position)
+            for colonne, valeur in valeurs.items():
+                if valeur is None:
+                    continue
+                if colonne in COLONNES:
+                    getattr(self, colonne)[position] = float(valeur)
+                elif colonne == 'emoji':
+                    self.emojis[position] = valeur or EMOJI_DEFAUT
+                elif colonne == 'produit' and str(valeur).strip():
+                    renommages[position] = str(valeur).strip()
+        for position, nom in renommages.items():
+            self.noms[position] = nom
+        self._verifier()
+
+        if edition.get('deleted_rows'):
+            self.retirer_positions([int(p) for p in edition['deleted_rows']])
+
+        ajouts = [ligne for ligne in edition.get('added_rows', []) if str(ligne.get('produit') or '').strip()]
+        if ajouts:
+            tableau = pd.DataFrame(ajouts)
+            tableau['produit'] = tableau['produit'].astype(str).str.strip()
+            for colonne in COLONNES:
+                if colonne not in tableau:
+                    tableau[colonne] = 0.0
+            self.fusionner(Catalogue.depuis_dataframe(tableau))
+
+
+# Montants nommés (charges mensuelles, investissements), consultables comme un dictionnaire
+# {nom: montant} mais immuables : noms en tuple, montants en tableau float64 en lecture seule.
+# avec() retourne une nouvelle version qui partage les noms et leurs positions avec
+# l'ancienne et ne copie que le tableau des montants.
+class Postes(Mapping):
+    __slots__ = ('noms', 'montants', '_positions')
+
+    def __init__(self, noms=(), montants=(), _positions=None):
+        self.noms = tuple(noms)
+        self.montants = np.array(montants, dtype=float).reshape(-1)
+        self.montants.flags.writeable = False
+        if len(self.montants) != len(self.noms):
+            raise ValueError("Les noms et les montants des postes n'ont pas la même longueur")
+        self._positions = {nom: i for i, nom in enumerate(self.noms)} if _positions is None else _positions
+        if len(self._positions) != len(self.noms):
+            raise ValueError("Noms de postes en double")
+
+    # Postes à partir d'un dictionnaire {nom: montant} ; avec les mêmes noms que `modele`,
+    # ses noms sont partagés, et `modele` lui-même est retourné si les montants sont égaux
+    @classmethod
+    def depuis_dictionnaire(cls, montants, modele=None):
+        if modele is not None and tuple(montants) == modele.noms:
+            valeurs = np.array([float(v) for v in montants.values()])
+            if np.array_equal(valeurs, modele.montants):
+                return modele
+            return cls(modele.noms, valeurs, modele._positions)
+        return cls(list(montants), [float(v) for v in montants.values()])
+
+    def __getitem__(self, nom):
+        return float(self.montants[self._positions[nom]])
+
+    def __iter__(self):
+        return iter(self.noms)
+
+    def __len__(self):
+        return len(self.noms)
+
+    def __contains__(self, nom):
+        return nom in self._positions
+
+    def __repr__(self):
+        return f"Postes({dict(self)!r})"
+
+    # Nouvelle version avec les montants {nom: montant} modifiés (noms inconnus ajoutés à la fin)
+    def avec(self, modifications):
+        nouveaux = tuple(nom for nom in modifications if nom not in self._positions)
+        montants = np.concatenate([self.montants, np.zeros(len(nouveaux))])
+        positions = self._positions
+        if nouveaux:
+            positions = {**positions, **{nom: len(self.noms) + i for i, nom in enumerate(nouveaux)}}
+        for nom, montant in modifications.items():
+            montants[positions[nom]] = float(montant)
+        return Postes(self.noms + nouveaux, montants, positions)
+
+
+# Parts principales d'une répartition (camembert) : les `nb_parts` plus grandes valeurs
+# strictement positives, le reste regroupé sous `libelle_autres`. Retourne (libellés, valeurs).
+def parts_principales(libelles, valeurs, nb_parts=8, libelle_autres="Autres"):
+    valeurs = np.asarray(valeurs, dtype=float)
+    positives = np.flatnonzero(valeurs > 0)
+    if len(positives) <= nb_parts + 1:
+        ordre = positives[np.argsort(-valeurs[positives], kind='stable')]
+        return [libelles[i] for i in ordre], valeurs[ordre].tolist()
+
+    principales = positives[np.argpartition(-valeurs[positives], nb_parts)[:nb_parts]]
+    principales = principales[np.argsort(-valeurs[principales], kind='stable')]
+    autres = valeurs[positives].sum() - valeurs[principales].sum()
+    return ([libelles[i] for i in principales] + [f"{libelle_autres} ({len(positives) - nb_parts})"],
+            valeurs[principales].tolist() + [float(autres)])
@@ -1,7 +1,44 @@
+import time
+debut_script = time.perf_counter_ns()
+
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from graphe_indicateurs import GrapheIndicateurs
+from moteur import INDICATEURS_A_MINIMISER, calculer_indicateurs_lot, calculer_indicateurs_scenario
+from monte_carlo import simuler_et_resumer
+from franchise import consolider_simulations, evaluer_portefeuille, lancer_simulations
+from balayage import grille_profit
+from capacite import HEURE_OUVERTURE, PROFIL_HORAIRE, parametres_defaut, simuler_capacite, variantes_capacite
+from projection import MOIS, projeter_tresorerie
+from optimisation_prix import optimiser_prix
+from recherche_objectif import resoudre_objectif
+from scenario import CLES_SCENARIO, scenario_depuis_session, vecteurs_scenario, hachage_scenario
+from cache import CacheLRU
+from rapport import FORMATS_RAPPORT, formats_disponibles, generer_rapport
+from catalogue import Catalogue, Postes, parts_principales
+from ventes_pos import VentesAgregees, calibrer
+from recettes import Recettes, chocs_prix
+from financement import (DUREES_AMORTISSEMENT_USUELLES, SOURCES, PlanFinancement, deductions_mensuelles,
+                         echeanciers, structures_emprunt, tableau_annuel)
+import defauts
+from bibliotheque import INDICATEURS_INDEXES, BibliothequeScenarios
+from profilage import Profileur, activer, mesure, profileur_actif, trace_chrome
+from imports_differes import ModuleDiffere, modules_charges
+import graphiques_natifs
+
+# pandas n'est chargé que par la première section qui affiche un tableau ; matplotlib ne
+# l'est que pour les graphiques haute fidélité (graphiques.py) ou les rapports PDF
+pd = ModuleDiffere("pandas")
+fin_imports = time.perf_counter_ns()
 
 # Configuration de la page
 st.set_page_config(
@@ -10,6 +47,19 @@ st.set_page_config(
     layout="wide"
 )
 
+# Profilage optionnel de l'exécution (interrupteur de la barre latérale, activé par défaut
+# avec CREPTIME_PROFILAGE=1) ; sans profilage, aucun profileur n'est actif
+PROFILAGE_PAR_DEFAUT = os.environ.get("CREPTIME_PROFILAGE") == "1"
+profileur_page = Profileur("page", origine=debut_script) if st.session_state.get("profilage", PROFILAGE_PAR_DEFAUT) else None
+activer(profileur_page)
+if profileur_page is not None:
+    # Imports du script : coûteux au premier passage d'un processus, quasi nuls ensuite
+    profileur_page.enregistrer("imports", "demarrage", debut_script, fin_imports - debut_script, 0)
+
+# Graphiques natifs (Vega-Lite, dessinés par le navigateur) par défaut ; rendu matplotlib
+# haute fidélité sur demande (interrupteur de la barre latérale, CREPTIME_GRAPHIQUES=matplotlib)
+GRAPHIQUES_MATPLOTLIB_PAR_DEFAUT = os.environ.get("CREPTIME_GRAPHIQUES") == "matplotlib"
+
 # Fonction pour ajouter un style CSS personnalisé
 def local_css():
     st.markdown("""
@@ -68,97 +118,9 @@ local_css()
 st.markdown('<p class="main-header">🍽️ SimuProfit - Business Plan Mensuel</p>', unsafe_allow_html=True)
 st.markdown("### Simulez la rentabilité de votre commerce alimentaire en quelques clics")
 
-# Initialisation des variables de session si elles n'existent pas déjà
-if 'prix_vente' not in st.session_state:
-    # Liste des produits avec leurs emojis
-    produits = {
-        "Crêpes": "🥞",
-        "Gaufres": "🧇",
-        "Pancakes": "🥮",
-        "Glaces": "🍦",
-        "Salades/Bowls": "🥗",
-        "Jus": "🧃",
-        "Boissons chaudes": "☕"
-    }
-    
-    # Initialisation des dictionnaires dans la session
-    st.session_state.produits = produits
-    st.session_state.prix_vente = {
-        "Crêpes": 30.0,
-        "Gaufres": 25.0,
-        "Pancakes": 25.0,
-        "Glaces": 14.0,
-        "Salades/Bowls": 25.0,
-        "Jus": 18.0,
-        "Boissons chaudes": 14.0
-    }
-    
-    st.session_state.cout_unitaire = {
-        "Crêpes": 8.0,
-        "Gaufres": 8.0,
-        "Pancakes": 7.0,
-        "Glaces": 4.0,
-        "Salades/Bowls": 14.0,
-        "Jus": 8.0,
-        "Boissons chaudes": 5.0
-    }
-    
-    st.session_state.commandes_jour = {
-        "Crêpes": 25,
-        "Gaufres": 15,
-        "Pancakes": 12,
-        "Glaces": 20,
-        "Salades/Bowls": 10,
-        "Jus": 10,
-        "Boissons chaudes": 40
-    }
-    
-    # Initialisation des paramètres d'activité
-    st.session_state.jours_activite = 30
-    st.session_state.taux_impot = 20.0
-    st.session_state.nb_associes = 6
-    
-    # Initialisation des charges mensuelles
-    st.session_state.charges_mensuelles = {
-        "Loyer": 7000.0,
-        "Salaires": 6000.0,
-        "Électricité": 3000.0,
-        "Ménage": 500.0,
-        "Publicité": 2000.0,
-        "Internet": 400.0,
-        "Divers": 1000.0
-    }
-    
-    # Initialisation des charges d'investissement
-    st.session_state.charges_investissement = {
-        # Équipements
-        "Crépier": 7000.0,
-        "Gauffrel": 3750.0,
-        "Plaque & Pancakes": 650.0,
-        "Blender": 1500.0,
-        "Extracteur de jus": 2250.0,
-        "Machine café": 30000.0,
-        "Vitrine 2 glaces": 17500.0,
-        "Réfrigérateur": 5000.0,
-        "Congélateur": 3000.0,
-        "Presse agrume": 1750.0,
-        "Ustensiles": 4000.0,
-        "Produits initiales": 20000.0,
-
-        # Aménagement / Design Intérieur
-        "Peinture & Travaux": 10000.0,
-        "Décoration & Lumières": 20000.0,
-        "Étagères": 3500.0,
-        "Comptoir": 5000.0,
-        "Tables + Chaises": 2500.0,
-        "Panneaux extérieurs": 10000.0,
-        "TV + Caisse enregistreuse": 10000.0,
-        "Caméras de surveillance": 3000.0,
-
-        # Divers
-        "Loyer avance": 18000.0,
-        "Publicités": 15000.0
-    }
+# Initialisation des variables de session si elles n'existent pas déjà : références aux
+# valeurs par défaut partagées (defauts.py), copiées seulement à la première modification
+defauts.initialiser_session(st.session_state)
 
 # Dictionnaire des emojis pour les charges
 charges_emojis = {
@@ -176,594 +138,1751 @@ charges_emojis = {
 with st.sidebar:
     st.markdown("### ⚙️ Paramètres supplémentaires")
     st.markdown("Utilisez directement les tableaux principaux pour modifier les valeurs")
+    st.toggle("🛠️ Profilage des exécutions", value=PROFILAGE_PAR_DEFAUT, key="profilage")
+    st.toggle("🖼️ Graphiques haute fidélité (matplotlib)", value=GRAPHIQUES_MATPLOTLIB_PAR_DEFAUT,
+              key="graphiques_matplotlib")
+
+# Paramètres dont dépendent les tableaux et graphiques par produit
+CLES_PRODUITS = ('produits', 'prix_vente', 'cout_unitaire', 'commandes_jour', 'jours_activite')
+
+# Longueur maximale des listes de produits du rapport, et taille de catalogue au-delà de
+# laquelle la matrice des élasticités croisées n'est plus proposée
+MAX_PRODUITS_LISTES = 10
+MAX_PRODUITS_CROISES = 30
 
-# Fonction pour calculer les indicateurs financiers
+# Caches partagés entre toutes les sessions du serveur, indexés par empreinte de scénario
+@st.cache_resource
+def caches():
+    return {
+        'indicateurs': CacheLRU(256),
+        'tableaux': CacheLRU(512),
+    }
+
+# Rendu des graphiques partagé entre les sessions (images en cache par empreinte)
+@st.cache_resource
+def rendu_graphiques():
+    from graphiques import RenduGraphiques
+    return RenduGraphiques(taille_max=256)
+
+# Empreinte du scénario courant, limitée aux paramètres `cles`
+def empreinte(cles=CLES_SCENARIO):
+    return hachage_scenario(scenario_depuis_session(st.session_state), cles)
+
+# Échéanciers du plan de financement de la session pour les investissements du scénario
+# (None si le plan est neutre : ni crédit ni amortissement)
+def echeanciers_session(scenario, nb_mois=12):
+    plan = st.session_state.financement
+    if plan.neutre():
+        return None
+    investissements = scenario['charges_investissement']
+    with mesure("echeanciers", "moteur"):
+        return echeanciers(list(investissements.values()), **plan.aligner(list(investissements)), nb_mois=nb_mois)
+
+# Déductions mensuelles du plan de financement de la session (charges financières, dotations,
+# apport) à passer au moteur et aux outils qui l'appellent ; vide si le plan est neutre
+def financement_session(scenario):
+    echeancier = echeanciers_session(scenario)
+    return {} if echeancier is None else deductions_mensuelles(echeancier)
+
+# Suffixe des clés de cache des calculs qui dépendent du plan de financement ("" si neutre)
+def cle_financement():
+    plan = st.session_state.financement
+    if plan.neutre():
+        return ""
+    return ":" + hachage_scenario({'financement': plan.parametres()}, ('financement',))
+
+# Fonction pour calculer les indicateurs financiers. Chaque session garde le graphe des
+# indicateurs de son dernier scénario calculé : une saisie n'y recalcule que les produits
+# modifiés et les indicateurs qui en dépendent (graphe_indicateurs.py).
+# Les intérêts et amortissements du plan de financement sont déduits du bénéfice imposable.
 def calculer_indicateurs():
-    # Calcul des revenus et coûts par produit
-    revenus_produits = {}
-    couts_produits = {}
-    marges_produits = {}
-
-    for produit in st.session_state.produits:
-        revenus_produits[produit] = st.session_state.prix_vente[produit] * st.session_state.commandes_jour[produit] * st.session_state.jours_activite
-        couts_produits[produit] = st.session_state.cout_unitaire[produit] * st.session_state.commandes_jour[produit] * st.session_state.jours_activite
-        marges_produits[produit] = revenus_produits[produit] - couts_produits[produit]
-
-    # Calcul des totaux
-    revenu_brut = sum(revenus_produits.values())
-    cout_variable = sum(couts_produits.values())
-    cout_fixe = sum(st.session_state.charges_mensuelles.values())
-    cout_total = cout_variable + cout_fixe
-    benefice_brut = revenu_brut - cout_total
-    impot = benefice_brut * (st.session_state.taux_impot / 100) if benefice_brut > 0 else 0
-    profit_net = benefice_brut - impot
-    profit_par_associe = profit_net / st.session_state.nb_associes if st.session_state.nb_associes > 0 else 0
-    marge_nette = (profit_net / revenu_brut * 100) if revenu_brut > 0 else 0
-    
-    # Total des investissements
-    total_investissement = sum(st.session_state.charges_investissement.values())
-    
-    # Calcul du seuil de rentabilité
-    if revenu_brut > 0:
-        seuil_rentabilite = cout_fixe / (1 - (cout_variable / revenu_brut))
-        marge_cout_variable = (1 - (cout_variable / revenu_brut)) * 100
-    else:
-        seuil_rentabilite = 0
-        marge_cout_variable = 0
-    
-    # Calcul du ROI
-    if total_investissement > 0 and profit_net > 0:
-        roi_mensuel = profit_net / total_investissement * 100
-        roi_annuel = roi_mensuel * 12
-        temps_retour = total_investissement / profit_net
+    scenario = scenario_depuis_session(st.session_state)
+    def calcul():
+        financement = financement_session(scenario)
+        with mesure("graphe_indicateurs", "moteur"):
+            graphe = st.session_state.get('graphe_indicateurs')
+            if graphe is None:
+                graphe = st.session_state['graphe_indicateurs'] = GrapheIndicateurs.depuis_scenario(
+                    scenario, **financement)
+            else:
+                graphe.synchroniser_scenario(scenario, **financement)
+            return graphe.resultat()
+
+    with mesure("calculer_indicateurs", "indicateurs"):
+        return caches()['indicateurs'].obtenir(hachage_scenario(scenario) + cle_financement(), calcul)
+
+# Tableau (DataFrame) mis en cache sous le nom `nom` et l'empreinte des paramètres `cles`
+def tableau_en_cache(nom, cles, construction):
+    def construction_mesuree():
+        with mesure(f"tableau:{nom}", "dataframe"):
+            return construction()
+
+    return caches()['tableaux'].obtenir(f"{nom}:{empreinte(cles)}", construction_mesuree)
+
+# Image PNG d'un graphique mise en cache ; `dessin()` retourne la figure matplotlib
+# (durée du rendu mesurée à part : dessin de la figure puis encodage de l'image)
+def graphique_en_cache(nom, cle, dessin):
+    def dessin_mesure():
+        with mesure(f"dessin:{nom}", "matplotlib"):
+            return dessin()
+
+    with mesure(f"graphique:{nom}", "graphique"):
+        return rendu_graphiques().rendre(nom, cle, dessin_mesure)
+
+# Affichage d'un graphique : `fonction` est le nom d'une fonction de dessin, présente avec les
+# mêmes arguments dans graphiques_natifs (spécification Vega-Lite, par défaut) et dans
+# graphiques (image matplotlib mise en cache sous `nom` et `cle`, chargée à la demande)
+def afficher_graphique(nom, cle, fonction, *args):
+    if st.session_state.get("graphiques_matplotlib", GRAPHIQUES_MATPLOTLIB_PAR_DEFAUT):
+        import graphiques
+        st.image(graphique_en_cache(nom, cle, lambda: getattr(graphiques, fonction)(*args)))
     else:
-        roi_mensuel = 0
-        roi_annuel = 0
-        temps_retour = float('inf')
-    
+        with mesure(f"vega:{nom}", "graphique"):
+            st.vega_lite_chart(getattr(graphiques_natifs, fonction)(*args), use_container_width=True)
+
+# Pool de processus partagé entre les sessions pour les simulations longues (un processus
+# par cœur : les simulations d'un portefeuille de sites y sont réparties par blocs)
+@st.cache_resource
+def executeur_simulations():
+    return ProcessPoolExecutor(max_workers=max(2, os.cpu_count() or 1),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+# Rapports PDF / Excel partagés entre les sessions : générés dans un processus dédié (la
+# génération ne ralentit ni les réexécutions ni les simulations), indexés par format et
+# empreinte de scénario. Le cache contient les tâches : un rapport déjà demandé pour le
+# même scénario est servi immédiatement, y compris à une autre session.
+@st.cache_resource
+def service_rapports():
     return {
-        'revenus_produits': revenus_produits,
-        'couts_produits': couts_produits,
-        'marges_produits': marges_produits,
-        'revenu_brut': revenu_brut,
-        'cout_variable': cout_variable,
-        'cout_fixe': cout_fixe,
-        'cout_total': cout_total,
-        'benefice_brut': benefice_brut,
-        'impot': impot,
-        'profit_net': profit_net,
-        'profit_par_associe': profit_par_associe,
-        'total_investissement': total_investissement,
-        'seuil_rentabilite': seuil_rentabilite,
-        'marge_cout_variable': marge_cout_variable,
-        'roi_mensuel': roi_mensuel,
-        'roi_annuel': roi_annuel,
-        'temps_retour': temps_retour,
-        'marge_nette': marge_nette
+        'executeur': ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")),
+        'taches': CacheLRU(taille_max=32),
     }
 
-# Calculer les indicateurs financiers
-indicateurs = calculer_indicateurs()
+# Contenu d'un rapport pour le bouton de téléchargement : fonction appelée par Streamlit au
+# clic, hors de l'exécution du script, qui attend la tâche de génération (lancée si besoin)
+def rapport_differe(scenario, format):
+    service = service_rapports()
+    cle = f"{format}:{hachage_scenario(scenario)}{cle_financement()}"
+    financement = financement_session(scenario)
+
+    def contenu():
+        tache = service['taches'].obtenir(
+            cle, lambda: service['executeur'].submit(generer_rapport, scenario, format, financement))
+        try:
+            return tache.result()
+        except Exception:
+            # Échec non mis en cache : le prochain clic relance la génération
+            service['taches'].retirer(cle)
+            raise
+    return contenu
+
+# Grille de profit prix x volume, mise en cache sur l'empreinte du scénario et du plan de
+# financement : seule la clé est hachée par Streamlit, le scénario lui-même (_scenario) et
+# les déductions du plan (_financement) ne le sont pas.
+@st.cache_data(max_entries=32, show_spinner=False)
+def grille_profit_cachee(cle_scenario, _scenario, _financement, clients_max, multiplicateur_min,
+                         multiplicateur_max):
+    return grille_profit(
+        *vecteurs_scenario(_scenario),
+        clients=np.arange(0, clients_max + 1),
+        multiplicateurs=np.linspace(multiplicateur_min, multiplicateur_max, 151),
+        **_financement
+    )
+
+# Simulation de la capacité de service, mise en cache sur l'empreinte des produits et les
+# paramètres de capacité (tuples) : la configuration actuelle et ses variantes d'effectif et
+# d'équipement sont simulées ensemble, la première ligne étant la configuration actuelle.
+@st.cache_data(max_entries=32, show_spinner=False)
+def capacite_cachee(cle_produits, _commandes_jour, _prix_vente, temps, postes, nb_equipements, nb_employes,
+                    patience, effectifs):
+    equipements, employes, ajoutes = variantes_capacite(nb_equipements, effectifs)
+    equipements = np.vstack([nb_equipements, equipements])
+    employes = np.concatenate([[nb_employes], employes])
+    resultats = simuler_capacite(_commandes_jour, temps, postes, equipements, employes, patience=patience,
+                                 prix_vente=_prix_vente, graine=0)
+    resultats.update(nb_equipements=equipements, nb_employes=employes,
+                     equipement_ajoute=np.concatenate([[-1], ajoutes]))
+    return resultats
+
+# Bibliothèque de scénarios partagée par toutes les sessions (fichier SQLite)
+@st.cache_resource
+def bibliotheque():
+    return BibliothequeScenarios(os.environ.get("CREPTIME_BIBLIOTHEQUE", "scenarios.db"))
+
+# Widgets dont la valeur doit être réinitialisée quand un scénario est chargé
+CLES_WIDGETS_SCENARIO = re.compile(r"^(editeur_(produits_\d+|charges|investissements)|(jours_activite|taux_impot|nb_associes)_input)$")
+
+# Chargement d'un scénario dans la session (les widgets reprennent les valeurs chargées)
+def appliquer_scenario(scenario):
+    emojis = dict(zip(st.session_state.catalogue.noms, st.session_state.catalogue.emojis))
+    st.session_state.catalogue = Catalogue.depuis_dictionnaires(
+        {p: emojis.get(p) for p in scenario['produits']},
+        scenario['prix_vente'], scenario['cout_unitaire'], scenario['commandes_jour'])
+    st.session_state.charges_mensuelles = Postes.depuis_dictionnaire(
+        scenario['charges_mensuelles'], modele=defauts.CHARGES_MENSUELLES)
+    st.session_state.charges_investissement = Postes.depuis_dictionnaire(
+        scenario['charges_investissement'], modele=defauts.CHARGES_INVESTISSEMENT)
+    st.session_state.jours_activite = scenario['jours_activite']
+    st.session_state.taux_impot = scenario['taux_impot']
+    st.session_state.nb_associes = scenario['nb_associes']
+    for cle in [c for c in st.session_state if CLES_WIDGETS_SCENARIO.match(c)]:
+        del st.session_state[cle]
+
+# Paramètres du scénario lus par chaque section de la page.
+# Chaque section est un fragment : une saisie ne réexécute que le fragment qui la contient,
+# puis toute la page uniquement si une autre section dépend d'un paramètre modifié. Lors
+# de cette relance, les sections non concernées retrouvent leurs résultats en cache.
+DEPENDANCES_SECTIONS = {
+    'bibliotheque': (),
+    'resume': CLES_SCENARIO,
+    'parametres': ('jours_activite', 'taux_impot', 'nb_associes'),
+    'tableau_de_bord': CLES_SCENARIO,
+    'produits': CLES_PRODUITS,
+    'charges': ('charges_mensuelles',),
+    'investissements': ('charges_investissement',),
+    'repartition': CLES_PRODUITS + ('charges_mensuelles',),
+    'rentabilite': CLES_SCENARIO,
+    'rapport': CLES_PRODUITS + ('charges_mensuelles', 'taux_impot'),
+    'monte_carlo': (),
+    'carte': CLES_SCENARIO,
+    'projection': CLES_PRODUITS + ('charges_mensuelles', 'charges_investissement', 'taux_impot'),
+    'optimisation': CLES_SCENARIO,
+    'objectif': CLES_SCENARIO,
+    'franchise': CLES_SCENARIO,
+    'capacite': CLES_PRODUITS + ('charges_mensuelles', 'charges_investissement'),
+    'recettes': CLES_SCENARIO,
+    'financement': CLES_SCENARIO,
+}
+
+# Empreinte des paramètres affichés par une section (mémorisée à chaque exécution)
+def marquer_section(section):
+    empreintes = st.session_state.setdefault('empreintes_sections', {})
+    empreintes[section] = empreinte(DEPENDANCES_SECTIONS[section])
+
+# Après une saisie dans `section` : relance de toute la page si une autre section affiche
+# un paramètre modifié ; sinon la réexécution du seul fragment courant suffit
+def propager_modifications(section):
+    scenario = scenario_depuis_session(st.session_state)
+    for autre, empreinte_affichee in st.session_state.get('empreintes_sections', {}).items():
+        if autre != section and empreinte_affichee != hachage_scenario(scenario, DEPENDANCES_SECTIONS[autre]):
+            st.rerun()
+
+# Exécutions profilées récemment (les plus anciennes sont oubliées)
+def publier_profil(profileur):
+    profileur.terminer()
+    historique = st.session_state.setdefault('profilage_historique', [])
+    historique.append(profileur)
+    del historique[:-20]
+
+# Section de la page : fragment Streamlit qui mémorise les paramètres lus et dont la durée
+# est mesurée quand le profilage est actif. Réexécuté seul (sans le reste du script), le
+# fragment est profilé comme une exécution à part entière.
+def section(nom):
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def executer():
+            marquer_section(nom)
+            profileur = None
+            if profileur_actif() is None and st.session_state.get("profilage", PROFILAGE_PAR_DEFAUT):
+                profileur = Profileur(f"fragment:{nom}")
+                activer(profileur)
+            try:
+                with mesure(f"section:{nom}", "section"):
+                    fonction()
+            finally:
+                if profileur is not None:
+                    activer(None)
+                    publier_profil(profileur)
+        return st.fragment(executer)
+    return decorateur
+
+# Application en un lot des cellules modifiées dans un éditeur de tableau (st.data_editor) :
+#   lignes : nom, dans les postes de l'état, de chaque ligne de l'éditeur
+#   colonnes : {colonne de l'éditeur: (clé des postes dans l'état, conversion de la valeur)}
+# Les postes étant immuables, l'état reçoit une nouvelle version (copie à l'écriture).
+def appliquer_modifications(cle_editeur, lignes, colonnes):
+    modifications = {}
+    for position, valeurs in st.session_state.get(cle_editeur, {}).get('edited_rows', {}).items():
+        for colonne, valeur in valeurs.items():
+            if colonne in colonnes and valeur is not None:
+                cle_etat, conversion = colonnes[colonne]
+                modifications.setdefault(cle_etat, {})[lignes[int(position)]] = conversion(valeur)
+    for cle_etat, montants in modifications.items():
+        if any(st.session_state[cle_etat].get(nom) != montant for nom, montant in montants.items()):
+            st.session_state[cle_etat] = st.session_state[cle_etat].avec(montants)
+
+# Message de confirmation conservé jusqu'au prochain affichage de la section (il survit
+# à la relance de la page)
+def confirmer(section, message):
+    st.session_state[f"confirmation_{section}"] = message
+
+def afficher_confirmation(section):
+    message = st.session_state.pop(f"confirmation_{section}", None)
+    if message:
+        st.success(message)
+
+# Modification du catalogue de produits : `modifier` reçoit une copie, qui ne remplace le
+# catalogue de la session que si elle est valide (noms uniques...). L'éditeur repart alors
+# d'un état vierge (nouvelle clé) et les sections dépendantes sont relancées.
+def remplacer_catalogue(modifier, message):
+    nouveau = st.session_state.catalogue.copie()
+    try:
+        modifier(nouveau)
+    except (ValueError, KeyError, pd.errors.ParserError) as erreur:
+        st.error(f"Catalogue non modifié : {erreur}")
+        return
+    st.session_state.catalogue = nouveau
+    st.session_state.version_catalogue = st.session_state.get('version_catalogue', 0) + 1
+    confirmer('produits', message)
+    propager_modifications('produits')
+    st.rerun()
+
+# Calibrage des ventes de caisse importées dans la session (ventes_pos.py) pour le catalogue
+# courant ; None si aucune vente n'a été importée
+def calibrage_ventes():
+    ventes = st.session_state.get('ventes_pos')
+    if ventes is None or not ventes.lignes:
+        return None
+    return calibrer(ventes, st.session_state.catalogue.noms)
+
+# Bibliothèque de scénarios (barre latérale) : ses widgets ne relancent que ce fragment
+@section('bibliotheque')
+def section_bibliotheque():
+    st.markdown("### 💾 Bibliothèque de scénarios")
+
+    with st.form(key="bibliotheque_enregistrer_form", clear_on_submit=True):
+        nom_scenario = st.text_input("Nom du scénario")
+        etiquettes_saisies = st.text_input("Étiquettes (séparées par des virgules)")
+        if st.form_submit_button("Enregistrer le scénario actuel"):
+            if nom_scenario.strip():
+                # Le plan de financement n'est pas enregistré avec le scénario : les indicateurs
+                # stockés sont ceux du scénario hors financement (recalculés si le plan s'applique)
+                bibliotheque().enregistrer(
+                    nom_scenario.strip(),
+                    scenario_depuis_session(st.session_state),
+                    [e.strip() for e in etiquettes_saisies.split(",") if e.strip()],
+                    indicateurs=calculer_indicateurs() if st.session_state.financement.neutre() else None
+                )
+                st.success(f"Scénario « {nom_scenario.strip()} » enregistré.")
+            else:
+                st.warning("Veuillez donner un nom au scénario.")
+
+    # Recherche sur les indicateurs stockés (aucun recalcul)
+    etiquette_recherche = st.selectbox("Étiquette", ["Toutes"] + bibliotheque().etiquettes())
+    roi_minimum = st.number_input("ROI annuel minimum (%)", value=0.0, step=5.0)
+    tri_recherche = st.selectbox("Trier par", INDICATEURS_INDEXES, index=INDICATEURS_INDEXES.index('temps_retour'))
+    trouves = bibliotheque().rechercher(
+        {'roi_annuel': ('>=', roi_minimum)},
+        etiquette=None if etiquette_recherche == "Toutes" else etiquette_recherche,
+        tri=tri_recherche,
+        decroissant=tri_recherche not in INDICATEURS_A_MINIMISER,
+        limite=50
+    )
+
+    if trouves:
+        st.dataframe(pd.DataFrame(trouves)[['nom', 'profit_net', 'roi_annuel', 'temps_retour']],
+                     use_container_width=True, hide_index=True)
+        noms_trouves = [t['nom'] for t in trouves]
+        scenario_choisi = st.selectbox("Scénario", noms_trouves)
+        if st.button("Charger ce scénario"):
+            appliquer_scenario(bibliotheque().charger(scenario_choisi))
+            st.rerun()
+
+        # Comparaison de deux scénarios enregistrés
+        scenario_compare = st.selectbox("Comparer avec", noms_trouves, index=min(1, len(noms_trouves) - 1))
+        if scenario_compare != scenario_choisi:
+            differences = bibliotheque().differences(scenario_choisi, scenario_compare)
+            st.dataframe(pd.DataFrame(differences, columns=["Paramètre", "Ligne", scenario_choisi, scenario_compare]),
+                         use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucun scénario enregistré ne correspond à la recherche.")
+
+with st.sidebar:
+    section_bibliotheque()
 
 # Contenu principal
 # 1. Affichage du résumé financier
-st.markdown("## 💰 Résumé financier")
-col_profit1, col_profit2, col_profit3, col_profit4 = st.columns(4)
-with col_profit1:
-    st.metric(label="Profit Net Total", value=f"{indicateurs['profit_net']:.2f} Dh",
-            delta=f"{indicateurs['profit_net']:.1f} Dh" if indicateurs['profit_net'] > 0 else f"-{abs(indicateurs['profit_net']):.1f} Dh")
-with col_profit2:
-    st.metric(label="Par Associé", value=f"{indicateurs['profit_par_associe']:.2f} Dh")
-with col_profit3:
-    st.metric(label="ROI annuel", value=f"{indicateurs['roi_annuel']:.2f}%")
-with col_profit4:
-    st.metric(label="Marge nette (%)", value=f"{indicateurs['marge_nette']:.2f}%")
+@section('resume')
+def section_resume():
+    indicateurs = calculer_indicateurs()
+    st.markdown("## 💰 Résumé financier")
+    col_profit1, col_profit2, col_profit3, col_profit4 = st.columns(4)
+    with col_profit1:
+        st.metric(label="Profit Net Total", value=f"{indicateurs['profit_net']:.2f} Dh",
+                delta=f"{indicateurs['profit_net']:.1f} Dh" if indicateurs['profit_net'] > 0 else f"-{abs(indicateurs['profit_net']):.1f} Dh")
+    with col_profit2:
+        st.metric(label="Par Associé", value=f"{indicateurs['profit_par_associe']:.2f} Dh")
+    with col_profit3:
+        st.metric(label="ROI annuel", value=f"{indicateurs['roi_annuel']:.2f}%")
+    with col_profit4:
+        st.metric(label="Marge nette (%)", value=f"{indicateurs['marge_nette']:.2f}%")
+
+section_resume()
+
+# Premier affichage : résumé financier envoyé au navigateur, depuis le début du script
+if profileur_page is not None:
+    profileur_page.enregistrer("premier_affichage", "demarrage", debut_script,
+                               time.perf_counter_ns() - debut_script, 0, {'modules_lourds': modules_charges()})
 
 # 2. Paramètres d'activité généraux (dans un formulaire éditable)
-st.markdown('<p class="sub-header">📆 Paramètres d\'activité</p>', unsafe_allow_html=True)
-params_col1, params_col2, params_col3 = st.columns(3)
-
-with params_col1:
-    jours_activite = st.number_input(
-        "Nombre de jours d'activité par mois",
-        min_value=1,
-        max_value=31,
-        value=st.session_state.jours_activite,
-        step=1,
-        key="jours_activite_input"
-    )
-    st.session_state.jours_activite = jours_activite
-
-with params_col2:
-    taux_impot = st.number_input(
-        "Taux d'impôt (%)",
-        min_value=0.0,
-        max_value=50.0,
-        value=st.session_state.taux_impot,
-        step=0.5,
-        key="taux_impot_input"
-    )
-    st.session_state.taux_impot = taux_impot
-
-with params_col3:
-    nb_associes = st.number_input(
-        "Nombre d'associés",
-        min_value=1,
-        value=st.session_state.nb_associes,
-        step=1,
-        key="nb_associes_input"
-    )
-    st.session_state.nb_associes = nb_associes
+@section('parametres')
+def section_parametres():
+    st.markdown('<p class="sub-header">📆 Paramètres d\'activité</p>', unsafe_allow_html=True)
+    params_col1, params_col2, params_col3 = st.columns(3)
+    avant = (st.session_state.jours_activite, st.session_state.taux_impot, st.session_state.nb_associes)
+
+    with params_col1:
+        jours_activite = st.number_input(
+            "Nombre de jours d'activité par mois",
+            min_value=1,
+            max_value=31,
+            value=st.session_state.jours_activite,
+            step=1,
+            key="jours_activite_input"
+        )
+        st.session_state.jours_activite = jours_activite
+
+    with params_col2:
+        taux_impot = st.number_input(
+            "Taux d'impôt (%)",
+            min_value=0.0,
+            max_value=50.0,
+            value=st.session_state.taux_impot,
+            step=0.5,
+            key="taux_impot_input"
+        )
+        st.session_state.taux_impot = taux_impot
+
+    with params_col3:
+        nb_associes = st.number_input(
+            "Nombre d'associés",
+            min_value=1,
+            value=st.session_state.nb_associes,
+            step=1,
+            key="nb_associes_input"
+        )
+        st.session_state.nb_associes = nb_associes
+
+    if (jours_activite, taux_impot, nb_associes) != avant:
+        propager_modifications('parametres')
+
+section_parametres()
 
 # 3. Tableau de bord financier
-st.markdown('<p class="sub-header">📊 Tableau de bord financier</p>', unsafe_allow_html=True)
-
-# Visualisation du profit net
-fig, ax = plt.subplots(figsize=(10, 6))
-labels = ['Revenu brut', 'Coût total', 'Bénéfice brut', 'Impôt', 'Profit net']
-values = [
-    indicateurs['revenu_brut'],
-    indicateurs['cout_total'],
-    indicateurs['benefice_brut'],
-    indicateurs['impot'],
-    indicateurs['profit_net']
-]
-
-bars = ax.bar(labels, values)
-
-# Coloriser les barres selon les valeurs positives/négatives
-for i, bar in enumerate(bars):
-    if values[i] < 0:
-        bar.set_color('#dc3545')  # Rouge pour valeurs négatives
-    else:
-        bar.set_color('#28a745')  # Vert pour valeurs positives
-
-plt.ylabel('Montant (Dh)')
-plt.title('Répartition financière mensuelle')
-
-# Ajouter les valeurs au-dessus des barres
-for bar in bars:
-    height = bar.get_height()
-    ax.text(bar.get_x() + bar.get_width()/2., height + 50,
-            f'{height:.2f} Dh', ha='center', va='bottom')
-
-ax.spines['top'].set_visible(False)
-ax.spines['right'].set_visible(False)
-
-# Affichage du graphique dans un container stylisé
-with st.container():
-    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-    st.pyplot(fig)
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Tableau résumé des indicateurs financiers
-data_resume = {
-    "Indicateur": ["Revenu brut mensuel", "Coût variable (produits)", "Coût fixe (charges)",
-                     "Coût total mensuel", "Bénéfice avant impôt", f"Impôt ({st.session_state.taux_impot}%)",
-                     "Profit net mensuel", f"Profit par associé ({st.session_state.nb_associes})"],
-    "Montant (Dh)": [
-        indicateurs['revenu_brut'],
-        indicateurs['cout_variable'],
-        indicateurs['cout_fixe'],
-        indicateurs['cout_total'],
-        indicateurs['benefice_brut'],
-        indicateurs['impot'],
-        indicateurs['profit_net'],
-        indicateurs['profit_par_associe']
-    ]
-}
+@section('tableau_de_bord')
+def section_tableau_de_bord():
+    indicateurs = calculer_indicateurs()
+    financement = financement_session(scenario_depuis_session(st.session_state))
+    st.markdown('<p class="sub-header">📊 Tableau de bord financier</p>', unsafe_allow_html=True)
 
-df_resume = pd.DataFrame(data_resume)
-df_resume["Montant (Dh)"] = df_resume["Montant (Dh)"].apply(lambda x: f"{x:.2f} Dh")
+    # Affichage du graphique dans un container stylisé
+    with st.container():
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        afficher_graphique("repartition", empreinte() + cle_financement(), "dessiner_repartition_financiere",
+                           indicateurs, financement)
+        st.markdown('</div>', unsafe_allow_html=True)
 
-st.dataframe(df_resume, use_container_width=True)
+    # Tableau résumé des indicateurs financiers
+    def construire_resume():
+        data_resume = {
+            "Indicateur": ["Revenu brut mensuel", "Coût variable (produits)", "Coût fixe (charges)",
+                             "Coût total mensuel", "Bénéfice avant impôt", f"Impôt ({st.session_state.taux_impot}%)",
+                             "Profit net mensuel", f"Profit par associé ({st.session_state.nb_associes})"],
+            "Montant (Dh)": [
+                indicateurs['revenu_brut'],
+                indicateurs['cout_variable'],
+                indicateurs['cout_fixe'],
+                indicateurs['cout_total'],
+                indicateurs['benefice_brut'],
+                indicateurs['impot'],
+                indicateurs['profit_net'],
+                indicateurs['profit_par_associe']
+            ]
+        }
+
+        df_resume = pd.DataFrame(data_resume)
+        if financement:
+            # Charges du plan de financement, entre le bénéfice avant impôt et l'impôt
+            deductions = pd.DataFrame({
+                "Indicateur": ["Charges financières", "Dotations aux amortissements"],
+                "Montant (Dh)": [float(np.sum(financement.get('charges_financieres', 0.0))),
+                                 float(np.sum(financement.get('dotations', 0.0)))],
+            })
+            df_resume = pd.concat([df_resume.iloc[:5], deductions, df_resume.iloc[5:]], ignore_index=True)
+        df_resume["Montant (Dh)"] = df_resume["Montant (Dh)"].apply(lambda x: f"{x:.2f} Dh")
+        return df_resume
+
+    df_resume = tableau_en_cache("resume" + cle_financement(), CLES_SCENARIO, construire_resume)
+    st.dataframe(df_resume, use_container_width=True)
+
+section_tableau_de_bord()
 
 # 4. Tableau détaillé des produits (éditable)
-st.markdown('<p class="sub-header">🍽️ Détails par produit</p>', unsafe_allow_html=True)
-
-# Créer un DataFrame pour les produits avec les colonnes éditables
-produits_data = []
-for produit in st.session_state.produits:
-    emoji = st.session_state.produits[produit]
-    produits_data.append({
-        "Produit": f"{emoji} {produit}",
-        "Produit_key": produit,  # Clé pour référence
-        "Prix unitaire (Dh)": st.session_state.prix_vente[produit],
-        "Coût unitaire (Dh)": st.session_state.cout_unitaire[produit],
-        "Commandes/jour": st.session_state.commandes_jour[produit],
-        "Revenu mensuel (Dh)": indicateurs['revenus_produits'][produit],
-        "Coût mensuel (Dh)": indicateurs['couts_produits'][produit],
-        "Marge mensuelle (Dh)": indicateurs['marges_produits'][produit],
-    })
+@section('produits')
+def section_produits():
+    indicateurs = calculer_indicateurs()
+    st.markdown('<p class="sub-header">🍽️ Détails par produit</p>', unsafe_allow_html=True)
 
-df_produits = pd.DataFrame(produits_data)
-
-# Utiliser un formulaire pour la modification
-with st.form(key="produits_form"):
-    # Table éditable pour les produits
-    for i, row in enumerate(produits_data):
-        st.markdown(f"#### {row['Produit']}")
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            prix = st.number_input(
-                "Prix unitaire (Dh)",
-                min_value=0.0,
-                value=float(row['Prix unitaire (Dh)']),
-                step=0.5,
-                key=f"prix_{i}"
-            )
-        
-        with col2:
-            cout = st.number_input(
-                "Coût unitaire (Dh)",
-                min_value=0.0,
-                value=float(row['Coût unitaire (Dh)']),
-                step=0.1,
-                key=f"cout_{i}"
-            )
-        
-        with col3:
-            commandes = st.number_input(
-                "Commandes/jour",
-                min_value=0,
-                value=int(row['Commandes/jour']),
-                step=1,
-                key=f"commandes_{i}"
-            )
-        
-        # Mise à jour des valeurs
-        produit_key = row['Produit_key']
-        st.session_state.prix_vente[produit_key] = prix
-        st.session_state.cout_unitaire[produit_key] = cout
-        st.session_state.commandes_jour[produit_key] = commandes
-        
-        st.markdown("---")
-    
-    # Bouton pour soumettre les modifications
-    submitted = st.form_submit_button("Mettre à jour les calculs")
-    if submitted:
-        st.success("Valeurs mises à jour! Les calculs ont été recalculés.")
-        indicateurs = calculer_indicateurs()  # Recalculer les indicateurs
-
-# Affichage des résultats calculés pour les produits
-# Recréer le DataFrame avec les valeurs mises à jour
-produits_data_updated = []
-for produit in st.session_state.produits:
-    emoji = st.session_state.produits[produit]
-    marge_unitaire = st.session_state.prix_vente[produit] - st.session_state.cout_unitaire[produit]
-    revenu_mensuel = st.session_state.prix_vente[produit] * st.session_state.commandes_jour[produit] * st.session_state.jours_activite
-    cout_mensuel = st.session_state.cout_unitaire[produit] * st.session_state.commandes_jour[produit] * st.session_state.jours_activite
-    marge_mensuelle = revenu_mensuel - cout_mensuel
-    
-    produits_data_updated.append({
-        "Produit": f"{emoji} {produit}",
-        "Prix unitaire (Dh)": f"{st.session_state.prix_vente[produit]:.2f} Dh",
-        "Coût unitaire (Dh)": f"{st.session_state.cout_unitaire[produit]:.2f} Dh",
-        "Marge unitaire (Dh)": f"{marge_unitaire:.2f} Dh",
-        "Commandes/jour": st.session_state.commandes_jour[produit],
-        "Revenu mensuel (Dh)": f"{revenu_mensuel:.2f} Dh",
-        "Coût mensuel (Dh)": f"{cout_mensuel:.2f} Dh",
-        "Marge mensuelle (Dh)": f"{marge_mensuelle:.2f} Dh"
-    })
+    # Un seul éditeur de tableau pour tout le catalogue : les cellules modifiées, les lignes
+    # ajoutées et supprimées sont envoyées ensemble à la validation du formulaire. La clé de
+    # l'éditeur change avec la version du catalogue, son état se rapportant aux lignes affichées.
+    catalogue = st.session_state.catalogue
+    cle_editeur = f"editeur_produits_{st.session_state.get('version_catalogue', 0)}"
+
+    with st.form(key="produits_form"):
+        st.data_editor(
+            catalogue.en_dataframe(),
+            use_container_width=True,
+            hide_index=True,
+            num_rows="dynamic",
+            column_config={
+                "emoji": st.column_config.TextColumn("", width="small"),
+                "produit": st.column_config.TextColumn("Produit", required=True),
+                "prix_vente": st.column_config.NumberColumn("Prix unitaire (Dh)", min_value=0.0, step=0.5, format="%.2f"),
+                "cout_unitaire": st.column_config.NumberColumn("Coût unitaire (Dh)", min_value=0.0, step=0.1, format="%.2f"),
+                "commandes_jour": st.column_config.NumberColumn("Commandes/jour", min_value=0.0, step=0.1, format="%.1f"),
+            },
+            key=cle_editeur
+        )
 
-# Ajouter une ligne de total
-total_commands = sum(st.session_state.commandes_jour.values())
-total_revenue = sum(indicateurs['revenus_produits'].values())
-total_costs = sum(indicateurs['couts_produits'].values())
-total_margins = sum(indicateurs['marges_produits'].values())
-
-produits_data_updated.append({
-    "Produit": "📊 TOTAL",
-    "Prix unitaire (Dh)": "-",
-    "Coût unitaire (Dh)": "-",
-    "Marge unitaire (Dh)": "-",
-    "Commandes/jour": total_commands,
-    "Revenu mensuel (Dh)": f"{total_revenue:.2f} Dh",
-    "Coût mensuel (Dh)": f"{total_costs:.2f} Dh",
-    "Marge mensuelle (Dh)": f"{total_margins:.2f} Dh"
-})
-
-df_produits_updated = pd.DataFrame(produits_data_updated)
-st.dataframe(df_produits_updated, use_container_width=True)
+        # Bouton pour soumettre les modifications
+        submitted = st.form_submit_button("Mettre à jour les calculs")
+        if submitted:
+            remplacer_catalogue(lambda nouveau: nouveau.appliquer_edition(st.session_state.get(cle_editeur, {})),
+                                "Valeurs mises à jour! Les calculs ont été recalculés.")
+        afficher_confirmation('produits')
+
+    # Import d'un catalogue complet (variantes, tailles de menu...) depuis un fichier CSV
+    with st.expander("📥 Importer un catalogue (CSV)"):
+        st.caption("Colonnes attendues : produit, prix_vente, cout_unitaire, commandes_jour et, "
+                   "optionnellement, emoji.")
+        with st.form(key="import_catalogue_form", clear_on_submit=True):
+            fichier = st.file_uploader("Fichier CSV", type=["csv"], key="fichier_catalogue")
+            mode = st.radio("Mode d'import", ["Fusionner avec le catalogue", "Remplacer le catalogue"],
+                            horizontal=True, key="mode_import_catalogue")
+            if st.form_submit_button("Importer") and fichier is not None:
+                def importer(nouveau):
+                    importe = Catalogue.importer(fichier)
+                    if mode.startswith("Remplacer"):
+                        nouveau.retirer(list(nouveau.noms))
+                    nouveau.fusionner(importe)
+                remplacer_catalogue(importer, f"Catalogue importé depuis {fichier.name}.")
+
+    # Calibrage de la demande à partir des exports de caisse : les fichiers déjà analysés dans
+    # la session (même nom, même taille et même contenu) ne sont pas relus, les nouveaux
+    # s'ajoutent aux ventes cumulées
+    with st.expander("🧾 Calibrer la demande à partir des ventes de caisse"):
+        st.caption("Exports CSV, JSON Lines ou Parquet, une ligne par article vendu : date, article et, "
+                   "optionnellement, quantité. Les articles sont associés aux produits de même nom.")
+        with st.form(key="ventes_pos_form", clear_on_submit=True):
+            fichiers = st.file_uploader("Exports de caisse", type=["csv", "jsonl", "ndjson", "parquet"],
+                                        accept_multiple_files=True, key="fichiers_ventes")
+            format_date = st.text_input("Format des dates (vide pour ISO 8601, par exemple %d/%m/%Y %H:%M)",
+                                        key="format_date_ventes")
+            if st.form_submit_button("Analyser les ventes") and fichiers:
+                ventes = st.session_state.get('ventes_pos') or VentesAgregees()
+                ventes = ventes.copie()
+                try:
+                    for fichier in fichiers:
+                        signature = {'taille': fichier.size,
+                                     'blake2b': hashlib.blake2b(fichier.getvalue(), digest_size=16).hexdigest()}
+                        if not ventes.deja_importe(fichier.name, signature):
+                            ventes.importer(fichier, fichier.name, signature, format_date=format_date or None)
+                except (ValueError, KeyError, ImportError, pd.errors.ParserError) as erreur:
+                    st.error(f"Ventes non importées : {erreur}")
+                else:
+                    # Relance de la page : Monte Carlo et projection reprennent le calibrage
+                    st.session_state.ventes_pos = ventes
+                    st.rerun()
+
+        calibrage = calibrage_ventes()
+        if calibrage is not None:
+            ventes = st.session_state.ventes_pos
+            st.write(f"{ventes.lignes:,} lignes".replace(",", " ")
+                     + f" ({ventes.lignes_ignorees} ignorées) dans {len(ventes.fichiers)} fichier(s), "
+                     f"{calibrage['jours_observes']} jours d'ouverture du {calibrage['premier_jour']} "
+                     f"au {calibrage['dernier_jour']}.")
+            st.dataframe(pd.DataFrame({
+                "Produit": catalogue.libelles(),
+                "Commandes/jour actuelles": catalogue.commandes_jour,
+                "Commandes/jour calibrées": calibrage['commandes_jour'],
+                "Dispersion (variance / moyenne)": calibrage['dispersion'],
+                "Ventes/jour (10 %)": calibrage['quantiles_jour'][0],
+                "Ventes/jour (90 %)": calibrage['quantiles_jour'][-1],
+                "Ventes/semaine (médiane)": calibrage['quantiles_semaine'][1],
+            }).round(2), use_container_width=True, hide_index=True)
+            if calibrage['non_reconnus']:
+                principaux = sorted(calibrage['non_reconnus'].items(), key=lambda e: -e[1])[:MAX_PRODUITS_LISTES]
+                st.warning("Articles sans produit correspondant : "
+                           + ", ".join(f"{libelle} ({quantite:g})" for libelle, quantite in principaux))
+            st.caption("La dispersion et la saisonnalité calibrées sont proposées dans la simulation "
+                       "Monte Carlo et la projection de trésorerie. Les produits sans vente gardent "
+                       "leurs commandes actuelles.")
+            if st.button("Appliquer les commandes calibrées", key="appliquer_calibrage"):
+                vendus = np.flatnonzero(calibrage['commandes_jour'] > 0)
+
+                def appliquer(nouveau):
+                    nouveau.commandes_jour[vendus] = np.round(calibrage['commandes_jour'][vendus], 1)
+                remplacer_catalogue(appliquer, "Commandes par jour calibrées sur les ventes de caisse.")
+
+    # Affichage des résultats calculés pour les produits, calculés sur les colonnes du catalogue
+    def construire_tableau_produits():
+        jours = st.session_state.jours_activite
+        marges_unitaires = catalogue.prix_vente - catalogue.cout_unitaire
+        revenus = catalogue.prix_vente * catalogue.commandes_jour * jours
+        couts = catalogue.cout_unitaire * catalogue.commandes_jour * jours
+        en_dh = lambda valeurs: [f"{v:.2f} Dh" for v in valeurs]
+
+        tableau = pd.DataFrame({
+            "Produit": catalogue.libelles(),
+            "Prix unitaire (Dh)": en_dh(catalogue.prix_vente),
+            "Coût unitaire (Dh)": en_dh(catalogue.cout_unitaire),
+            "Marge unitaire (Dh)": en_dh(marges_unitaires),
+            "Commandes/jour": catalogue.commandes_jour.round(1),
+            "Revenu mensuel (Dh)": en_dh(revenus),
+            "Coût mensuel (Dh)": en_dh(couts),
+            "Marge mensuelle (Dh)": en_dh(revenus - couts),
+        })
+
+        # Ajouter une ligne de total
+        total = pd.DataFrame([{
+            "Produit": "📊 TOTAL",
+            "Prix unitaire (Dh)": "-",
+            "Coût unitaire (Dh)": "-",
+            "Marge unitaire (Dh)": "-",
+            "Commandes/jour": round(float(catalogue.commandes_jour.sum()), 1),
+            "Revenu mensuel (Dh)": f"{indicateurs['revenu_brut']:.2f} Dh",
+            "Coût mensuel (Dh)": f"{indicateurs['cout_variable']:.2f} Dh",
+            "Marge mensuelle (Dh)": f"{indicateurs['revenu_brut'] - indicateurs['cout_variable']:.2f} Dh"
+        }])
+        return pd.concat([tableau, total], ignore_index=True)
+
+    df_produits_updated = tableau_en_cache("produits", CLES_PRODUITS, construire_tableau_produits)
+    st.dataframe(df_produits_updated, use_container_width=True)
+
+section_produits()
 
 # 5. Tableau des charges mensuelles (éditable)
-st.markdown('<p class="sub-header">💸 Détail des charges mensuelles</p>', unsafe_allow_html=True)
+@section('charges')
+def section_charges():
+    st.markdown('<p class="sub-header">💸 Détail des charges mensuelles</p>', unsafe_allow_html=True)
 
-with st.form(key="charges_form"):
-    # Table éditable pour les charges
-    charges_data = []
-    
-    # Utiliser des colonnes pour organiser les champs de formulaire
-    col1, col2 = st.columns(2)
-    charges_keys = list(st.session_state.charges_mensuelles.keys())
-    
-    half = len(charges_keys) // 2 + len(charges_keys) % 2
-    
-    with col1:
-        for i, charge in enumerate(charges_keys[:half]):
-            emoji = charges_emojis.get(charge, "📝")
-            montant = st.number_input(
-                f"{emoji} {charge} (Dh)",
-                min_value=0.0,
-                value=st.session_state.charges_mensuelles[charge],
-                step=10.0,
-                format="%.2f",
-                key=f"charge_{i}"
-            )
-            st.session_state.charges_mensuelles[charge] = montant
-            charges_data.append({
-                "Charge": f"{emoji} {charge}",
-                "Montant (Dh)": f"{montant:.2f} Dh"
-            })
-    
-    with col2:
-        for i, charge in enumerate(charges_keys[half:]):
-            emoji = charges_emojis.get(charge, "📝")
-            montant = st.number_input(
-                f"{emoji} {charge} (Dh)",
-                min_value=0.0,
-                value=st.session_state.charges_mensuelles[charge],
-                step=10.0,
-                format="%.2f",
-                key=f"charge_{i + half}"
-            )
-            st.session_state.charges_mensuelles[charge] = montant
+    charges = list(st.session_state.charges_mensuelles)
+    df_saisie_charges = pd.DataFrame(
+        {"Montant (Dh)": list(st.session_state.charges_mensuelles.values())},
+        index=[f"{charges_emojis.get(charge, '📝')} {charge}" for charge in charges]
+    )
+
+    with st.form(key="charges_form"):
+        # Éditeur de tableau des charges (une seule saisie pour toutes les lignes)
+        st.data_editor(
+            df_saisie_charges,
+            use_container_width=True,
+            column_config={
+                "Montant (Dh)": st.column_config.NumberColumn(min_value=0.0, step=10.0, format="%.2f"),
+            },
+            key="editeur_charges"
+        )
+
+        # Bouton pour soumettre les modifications
+        charges_submitted = st.form_submit_button("Mettre à jour les charges")
+        appliquer_modifications("editeur_charges", charges, {
+            "Montant (Dh)": ('charges_mensuelles', float),
+        })
+        if charges_submitted:
+            confirmer('charges', "Charges mises à jour! Les calculs ont été recalculés.")
+            propager_modifications('charges')
+        afficher_confirmation('charges')
+
+    def construire_tableau_charges():
+        charges_data = []
+        for charge, montant in st.session_state.charges_mensuelles.items():
             charges_data.append({
-                "Charge": f"{emoji} {charge}",
+                "Charge": f"{charges_emojis.get(charge, '📝')} {charge}",
                 "Montant (Dh)": f"{montant:.2f} Dh"
             })
-    
-    # Bouton pour soumettre les modifications
-    charges_submitted = st.form_submit_button("Mettre à jour les charges")
-    if charges_submitted:
-        st.success("Charges mises à jour! Les calculs ont été recalculés.")
-        indicateurs = calculer_indicateurs()  # Recalculer les indicateurs
-
-# Ajouter une ligne de total pour les charges
-total_charges = sum(st.session_state.charges_mensuelles.values())
-charges_data.append({
-    "Charge": "📊 TOTAL",
-    "Montant (Dh)": f"{total_charges:.2f} Dh"
-})
-
-df_charges = pd.DataFrame(charges_data)
-st.dataframe(df_charges, use_container_width=True)
+
+        # Ajouter une ligne de total pour les charges
+        total_charges = sum(st.session_state.charges_mensuelles.values())
+        charges_data.append({
+            "Charge": "📊 TOTAL",
+            "Montant (Dh)": f"{total_charges:.2f} Dh"
+        })
+
+        return pd.DataFrame(charges_data)
+
+    df_charges = tableau_en_cache("charges", ('charges_mensuelles',), construire_tableau_charges)
+    st.dataframe(df_charges, use_container_width=True)
+
+section_charges()
 
 # 6. Tableau des charges d'investissement (éditable)
-st.markdown('<p class="sub-header">🏗️ Charges d\'investissement</p>', unsafe_allow_html=True)
-
-# Regroupement des investissements par catégorie pour une meilleure organisation
-investissements_categories = {
-    "Équipements": [
-        "Crépier", "Gauffrel", "Plaque & Pancakes", "Blender", "Extracteur de jus",
-        "Machine café", "Vitrine 2 glaces", "Réfrigérateur", "Congélateur",
-        "Presse agrume", "Ustensiles", "Produits initiales"
-    ],
-    "Aménagement": [
-        "Peinture & Travaux", "Décoration & Lumières", "Étagères", "Comptoir",
-        "Tables + Chaises", "Panneaux extérieurs", "TV + Caisse enregistreuse",
-        "Caméras de surveillance"
-    ],
-    "Divers": ["Loyer avance", "Publicités"]
-}
+@section('investissements')
+def section_investissements():
+    st.markdown('<p class="sub-header">🏗️ Charges d\'investissement</p>', unsafe_allow_html=True)
 
-with st.form(key="investissements_form"):
-    for categorie, items in investissements_categories.items():
-        st.markdown(f"#### {categorie}")
-        
-        # Utiliser des colonnes pour organiser les champs
-        cols = st.columns(2)
-        half = len(items) // 2 + len(items) % 2
-        
-        for i, item in enumerate(items[:half]):
-            with cols[0]:
-                montant = st.number_input(
-                    f"{item}",
-                    min_value=0.0,
-                    value=st.session_state.charges_investissement.get(item, 0.0),
-                    step=100.0,
-                    format="%.2f",
-                    key=f"inv_{categorie}_{i}"
-                )
-                st.session_state.charges_investissement[item] = montant
-        
-        for i, item in enumerate(items[half:]):
-            with cols[1]:
-                montant = st.number_input(
-                    f"{item}",
-                    min_value=0.0,
-                    value=st.session_state.charges_investissement.get(item, 0.0),
-                    step=100.0,
-                    format="%.2f",
-                    key=f"inv_{categorie}_{i + half}"
-                )
-                st.session_state.charges_investissement[item] = montant
-        
-        st.markdown("---")
-    
-    # Bouton pour soumettre les modifications
-    inv_submitted = st.form_submit_button("Mettre à jour les investissements")
-    if inv_submitted:
-        st.success("Investissements mis à jour! Les calculs ont été recalculés.")
-        indicateurs = calculer_indicateurs()  # Recalculer les indicateurs
-
-# Afficher le tableau des investissements
-inv_data = []
-for categorie, items in investissements_categories.items():
-    for item in items:
+    # Regroupement des investissements par catégorie pour une meilleure organisation
+    investissements_categories = {
+        "Équipements": [
+            "Crépier", "Gauffrel", "Plaque & Pancakes", "Blender", "Extracteur de jus",
+            "Machine café", "Vitrine 2 glaces", "Réfrigérateur", "Congélateur",
+            "Presse agrume", "Ustensiles", "Produits initiales"
+        ],
+        "Aménagement": [
+            "Peinture & Travaux", "Décoration & Lumières", "Étagères", "Comptoir",
+            "Tables + Chaises", "Panneaux extérieurs", "TV + Caisse enregistreuse",
+            "Caméras de surveillance"
+        ],
+        "Divers": ["Loyer avance", "Publicités"]
+    }
+
+    # Lignes de l'éditeur : investissements par catégorie, puis ceux hors catégorie
+    lignes_investissements = [(categorie, item) for categorie, items in investissements_categories.items()
+                              for item in items]
+    categorises = {item for _, item in lignes_investissements}
+    lignes_investissements += [("Divers", item) for item in st.session_state.charges_investissement
+                               if item not in categorises]
+    df_saisie_investissements = pd.DataFrame({
+        "Catégorie": [categorie for categorie, _ in lignes_investissements],
+        "Investissement": [item for _, item in lignes_investissements],
+        "Montant (Dh)": [st.session_state.charges_investissement.get(item, 0.0)
+                         for _, item in lignes_investissements],
+    })
+
+    with st.form(key="investissements_form"):
+        st.data_editor(
+            df_saisie_investissements,
+            use_container_width=True,
+            hide_index=True,
+            disabled=["Catégorie", "Investissement"],
+            column_config={
+                "Montant (Dh)": st.column_config.NumberColumn(min_value=0.0, step=100.0, format="%.2f"),
+            },
+            key="editeur_investissements"
+        )
+
+        # Bouton pour soumettre les modifications
+        inv_submitted = st.form_submit_button("Mettre à jour les investissements")
+        appliquer_modifications("editeur_investissements", [item for _, item in lignes_investissements], {
+            "Montant (Dh)": ('charges_investissement', float),
+        })
+        if inv_submitted:
+            confirmer('investissements', "Investissements mis à jour! Les calculs ont été recalculés.")
+            propager_modifications('investissements')
+        afficher_confirmation('investissements')
+
+    # Afficher le tableau des investissements
+    def construire_tableau_investissements():
+        inv_data = []
+        for categorie, items in investissements_categories.items():
+            for item in items:
+                inv_data.append({
+                    "Catégorie": categorie,
+                    "Investissement": item,
+                    "Montant (Dh)": f"{st.session_state.charges_investissement.get(item, 0.0):.2f} Dh"
+                })
+
+        # Ajouter une ligne de total pour les investissements
+        total_inv = sum(st.session_state.charges_investissement.values())
         inv_data.append({
-            "Catégorie": categorie,
-            "Investissement": item,
-            "Montant (Dh)": f"{st.session_state.charges_investissement.get(item, 0.0):.2f} Dh"
+            "Catégorie": "",
+            "Investissement": "📊 TOTAL",
+            "Montant (Dh)": f"{total_inv:.2f} Dh"
         })
 
-# Ajouter une ligne de total pour les investissements
-total_inv = sum(st.session_state.charges_investissement.values())
-inv_data.append({
-    "Catégorie": "",
-    "Investissement": "📊 TOTAL",
-    "Montant (Dh)": f"{total_inv:.2f} Dh"
-})
+        return pd.DataFrame(inv_data)
 
-df_inv = pd.DataFrame(inv_data)
-st.dataframe(df_inv, use_container_width=True)
+    df_inv = tableau_en_cache("investissements", ('charges_investissement',), construire_tableau_investissements)
+    st.dataframe(df_inv, use_container_width=True)
+
+section_investissements()
 
 # 7. Graphiques en camembert pour la répartition des coûts
-st.markdown('<p class="sub-header">📉 Répartition des coûts</p>', unsafe_allow_html=True)
+@section('repartition')
+def section_repartition():
+    indicateurs = calculer_indicateurs()
+    st.markdown('<p class="sub-header">📉 Répartition des coûts</p>', unsafe_allow_html=True)
 
-col1, col2 = st.columns(2)
+    col1, col2 = st.columns(2)
 
-with col1:
-    # Camembert des coûts variables par produit
-    fig1, ax1 = plt.subplots(figsize=(8, 8))
-    labels_produits = [f"{st.session_state.produits[produit]} {produit}" for produit in st.session_state.produits]
-    valeurs = [indicateurs['couts_produits'][produit] for produit in st.session_state.produits]
-    
-    # Filtrer les produits sans coûts pour une meilleure lisibilité
-    filtered_labels = []
-    filtered_values = []
-    for label, value in zip(labels_produits, valeurs):
-        if value > 0:
-            filtered_labels.append(label)
-            filtered_values.append(value)
-    
-    if sum(filtered_values) > 0:
-        ax1.pie(filtered_values, labels=filtered_labels, autopct='%1.1f%%', startangle=90)
-        ax1.axis('equal')
-        plt.title('Répartition des coûts variables par produit')
-        st.pyplot(fig1)
-    else:
-        st.warning("Aucun coût variable à afficher. Veuillez définir des produits avec des coûts.")
+    with col1:
+        # Camembert des coûts variables par produit : les produits sans coûts sont écartés et,
+        # pour un grand catalogue, seuls les principaux sont affichés, le reste regroupé
+        filtered_labels, filtered_values = parts_principales(
+            st.session_state.catalogue.libelles(), list(indicateurs['couts_produits'].values()))
 
-with col2:
-    # Camembert des charges fixes
-    fig2, ax2 = plt.subplots(figsize=(8, 8))
-    labels_charges = [f"{charges_emojis.get(charge, '📝')} {charge}" for charge in st.session_state.charges_mensuelles]
-    valeurs_charges = [st.session_state.charges_mensuelles[charge] for charge in st.session_state.charges_mensuelles]
-    
-    # Filtrer les charges sans montants pour une meilleure lisibilité
-    filtered_labels_charges = []
-    filtered_values_charges = []
-    for label, value in zip(labels_charges, valeurs_charges):
-        if value > 0:
-            filtered_labels_charges.append(label)
-            filtered_values_charges.append(value)
-    
-    if sum(filtered_values_charges) > 0:
-        ax2.pie(filtered_values_charges, labels=filtered_labels_charges, autopct='%1.1f%%', startangle=90)
-        ax2.axis('equal')
-        plt.title('Répartition des charges fixes mensuelles')
-        st.pyplot(fig2)
-    else:
-        st.warning("Aucune charge fixe à afficher. Veuillez définir des charges avec des montants.")
+        if sum(filtered_values) > 0:
+            cle_couts = empreinte(('produits', 'cout_unitaire', 'commandes_jour', 'jours_activite'))
+            afficher_graphique("couts_variables", cle_couts, "dessiner_camembert", filtered_labels,
+                               filtered_values, 'Répartition des coûts variables par produit')
+        else:
+            st.warning("Aucun coût variable à afficher. Veuillez définir des produits avec des coûts.")
+
+    with col2:
+        # Camembert des charges fixes
+        labels_charges = [f"{charges_emojis.get(charge, '📝')} {charge}" for charge in st.session_state.charges_mensuelles]
+        valeurs_charges = [st.session_state.charges_mensuelles[charge] for charge in st.session_state.charges_mensuelles]
+
+        # Filtrer les charges sans montants pour une meilleure lisibilité
+        filtered_labels_charges = []
+        filtered_values_charges = []
+        for label, value in zip(labels_charges, valeurs_charges):
+            if value > 0:
+                filtered_labels_charges.append(label)
+                filtered_values_charges.append(value)
+
+        if sum(filtered_values_charges) > 0:
+            afficher_graphique("charges_fixes", empreinte(('charges_mensuelles',)), "dessiner_camembert",
+                               filtered_labels_charges, filtered_values_charges,
+                               'Répartition des charges fixes mensuelles')
+        else:
+            st.warning("Aucune charge fixe à afficher. Veuillez définir des charges avec des montants.")
+
+section_repartition()
 
 # 8. Analyse de rentabilité
-st.markdown('<p class="sub-header">📈 Analyse de rentabilité</p>', unsafe_allow_html=True)
+@section('rentabilite')
+def section_rentabilite():
+    indicateurs = calculer_indicateurs()
+    st.markdown('<p class="sub-header">📈 Analyse de rentabilité</p>', unsafe_allow_html=True)
 
-# Utilisation de colonnes pour une meilleure organisation
-col1, col2 = st.columns(2)
+    # Utilisation de colonnes pour une meilleure organisation
+    col1, col2 = st.columns(2)
 
-with col1:
-    # Calcul du point mort (seuil de rentabilité)
-    if indicateurs['revenu_brut'] > 0:
-        st.metric(label="Seuil de rentabilité mensuel", value=f"{indicateurs['seuil_rentabilite']:.2f} Dh")
-        st.metric(label="Marge sur coût variable", value=f"{indicateurs['marge_cout_variable']:.2f}%")
+    with col1:
+        # Calcul du point mort (seuil de rentabilité)
+        if indicateurs['revenu_brut'] > 0:
+            st.metric(label="Seuil de rentabilité mensuel", value=f"{indicateurs['seuil_rentabilite']:.2f} Dh")
+            st.metric(label="Marge sur coût variable", value=f"{indicateurs['marge_cout_variable']:.2f}%")
 
-with col2:
-    # Calcul du ROI
-    if indicateurs['total_investissement'] > 0:
-        st.metric(label="ROI mensuel", value=f"{indicateurs['roi_mensuel']:.2f}%")
-        st.metric(label="ROI annuel", value=f"{indicateurs['roi_annuel']:.2f}%")
-        
-        if indicateurs['profit_net'] > 0:
-            st.metric(label="Temps de retour sur investissement",
-                     value=f"{indicateurs['temps_retour']:.1f} mois ({indicateurs['temps_retour']/12:.1f} ans)")
+    with col2:
+        # Calcul du ROI
+        if indicateurs['total_investissement'] > 0:
+            st.metric(label="ROI mensuel", value=f"{indicateurs['roi_mensuel']:.2f}%")
+            st.metric(label="ROI annuel", value=f"{indicateurs['roi_annuel']:.2f}%")
+
+            if indicateurs['profit_net'] > 0:
+                st.metric(label="Temps de retour sur investissement",
+                         value=f"{indicateurs['temps_retour']:.1f} mois ({indicateurs['temps_retour']/12:.1f} ans)")
+            else:
+                st.warning("Le profit net est négatif ou nul, impossible de calculer le temps de retour sur investissement.")
         else:
-            st.warning("Le profit net est négatif ou nul, impossible de calculer le temps de retour sur investissement.")
-    else:
-        st.warning("Veuillez définir des charges d'investissement pour calculer le ROI.")
+            st.warning("Veuillez définir des charges d'investissement pour calculer le ROI.")
+
+section_rentabilite()
 
 # 9. Affichage d'un rapport final et des recommandations
-st.markdown('<p class="sub-header">🔍 Rapport final et recommandations</p>', unsafe_allow_html=True)
+@section('rapport')
+def section_rapport():
+    indicateurs = calculer_indicateurs()
+    st.markdown('<p class="sub-header">🔍 Rapport final et recommandations</p>', unsafe_allow_html=True)
+    catalogue = st.session_state.catalogue
+    marges = np.array(list(indicateurs['marges_produits'].values()), dtype=float)
 
-if indicateurs['profit_net'] > 0:
-    st.success("✅ **Votre projet est rentable!**")
-    
-    # Calcul des produits les plus rentables
-    marges_produits_list = [(p, indicateurs['marges_produits'][p]) for p in st.session_state.produits]
-    marges_produits_list.sort(key=lambda x: x[1], reverse=True)
-    
-    st.markdown("### 🏆 Produits les plus rentables:")
-    for i, (produit, marge) in enumerate(marges_produits_list[:3]):
-        if marge > 0:
-            st.markdown(f"{i+1}. **{st.session_state.produits[produit]} {produit}** - Marge mensuelle: {marge:.2f} Dh")
-    
-    # Recommendations plus détaillées
-    st.markdown("### 💡 Recommandations:")
-    
-    # Colonnes pour une présentation plus attrayante
-    rec_col1, rec_col2 = st.columns(2)
-    
-    with rec_col1:
-        st.markdown("""
-        #### Pour augmenter votre rentabilité:
-        - Augmentez les prix des produits à forte demande
-        - Concentrez vos efforts sur les produits les plus rentables
-        - Optimisez votre approvisionnement pour réduire les coûts variables
-        - Envisagez d'ajouter des produits complémentaires à forte marge
-        """)
-    
-    with rec_col2:
+    if indicateurs['profit_net'] > 0:
+        st.success("✅ **Votre projet est rentable!**")
+
+        # Calcul des produits les plus rentables
+        libelles = catalogue.libelles()
+        st.markdown("### 🏆 Produits les plus rentables:")
+        for i, position in enumerate(np.argsort(-marges, kind='stable')[:3]):
+            if marges[position] > 0:
+                st.markdown(f"{i+1}. **{libelles[position]}** - Marge mensuelle: {marges[position]:.2f} Dh")
+
+        # Recommendations plus détaillées
+        st.markdown("### 💡 Recommandations:")
+
+        # Colonnes pour une présentation plus attrayante
+        rec_col1, rec_col2 = st.columns(2)
+
+        with rec_col1:
+            st.markdown("""
+            #### Pour augmenter votre rentabilité:
+            - Augmentez les prix des produits à forte demande
+            - Concentrez vos efforts sur les produits les plus rentables
+            - Optimisez votre approvisionnement pour réduire les coûts variables
+            - Envisagez d'ajouter des produits complémentaires à forte marge
+            """)
+
+        with rec_col2:
+            st.markdown("""
+            #### Pour une croissance durable:
+            - Mettez en place un système de suivi des coûts et des ventes
+            - Envisagez une expansion progressive après la période de retour sur investissement
+            - Développez des stratégies marketing pour augmenter le volume des ventes
+            - Surveillez régulièrement les indicateurs de performance
+            """)
+
+        # Calculer les produits qui pourraient bénéficier d'une augmentation de prix
+        prix_augmentation = np.flatnonzero(catalogue.prix_vente < 3 * catalogue.cout_unitaire)
+
+        if len(prix_augmentation):
+            st.markdown("#### Produits dont vous pourriez augmenter les prix:")
+            for position in prix_augmentation[:MAX_PRODUITS_LISTES]:
+                st.markdown(f"- {catalogue.emojis[position]} **{catalogue.noms[position]}**: Prix actuel {catalogue.prix_vente[position]:.2f} Dh, prix suggéré: {catalogue.cout_unitaire[position] * 3:.2f} Dh")
+            if len(prix_augmentation) > MAX_PRODUITS_LISTES:
+                st.markdown(f"- ... et {len(prix_augmentation) - MAX_PRODUITS_LISTES} autres produits")
+    else:
+        st.error("⚠️ **Votre projet n'est pas rentable dans sa configuration actuelle.**")
+
+        # Analyser les causes possibles
+        problemes = []
+        if indicateurs['revenu_brut'] < indicateurs['cout_fixe']:
+            problemes.append("Les revenus sont insuffisants pour couvrir les charges fixes")
+
+        if indicateurs['marge_cout_variable'] < 40:
+            problemes.append("La marge sur coût variable est trop faible")
+
+        produits_non_rentables = [catalogue.noms[position] for position in np.flatnonzero(marges < 0)]
+
+        if produits_non_rentables:
+            liste = ', '.join(produits_non_rentables[:MAX_PRODUITS_LISTES])
+            if len(produits_non_rentables) > MAX_PRODUITS_LISTES:
+                liste += f" et {len(produits_non_rentables) - MAX_PRODUITS_LISTES} autres"
+            problemes.append(f"Certains produits ne sont pas rentables: {liste}")
+
+        st.markdown("### 🔍 Analyse des problèmes:")
+        for i, probleme in enumerate(problemes):
+            st.markdown(f"{i+1}. **{probleme}**")
+
+        st.markdown("### 💡 Recommandations:")
         st.markdown("""
-        #### Pour une croissance durable:
-        - Mettez en place un système de suivi des coûts et des ventes
-        - Envisagez une expansion progressive après la période de retour sur investissement
-        - Développez des stratégies marketing pour augmenter le volume des ventes
-        - Surveillez régulièrement les indicateurs de performance
+        - Augmentez les prix de vente ou le volume des ventes
+        - Réduisez les coûts fixes ou les coûts variables
+        - Concentrez-vous sur les produits à plus forte marge
+        - Réévaluez les investissements initiaux
+        - Envisagez de retirer ou de reformuler les produits non rentables
         """)
-    
-    # Calculer les produits qui pourraient bénéficier d'une augmentation de prix
-    prix_augmentation = []
-    for produit in st.session_state.produits:
-        if st.session_state.prix_vente[produit] < 3 * st.session_state.cout_unitaire[produit]:
-            prix_augmentation.append(produit)
-    
-    if prix_augmentation:
-        st.markdown("#### Produits dont vous pourriez augmenter les prix:")
-        for produit in prix_augmentation:
-            st.markdown(f"- {st.session_state.produits[produit]} **{produit}**: Prix actuel {st.session_state.prix_vente[produit]:.2f} Dh, prix suggéré: {st.session_state.cout_unitaire[produit] * 3:.2f} Dh")
-else:
-    st.error("⚠️ **Votre projet n'est pas rentable dans sa configuration actuelle.**")
-    
-    # Analyser les causes possibles
-    problemes = []
-    if indicateurs['revenu_brut'] < indicateurs['cout_fixe']:
-        problemes.append("Les revenus sont insuffisants pour couvrir les charges fixes")
-    
-    if indicateurs['marge_cout_variable'] < 40:
-        problemes.append("La marge sur coût variable est trop faible")
-    
-    produits_non_rentables = []
-    for produit in st.session_state.produits:
-        if indicateurs['marges_produits'][produit] < 0:
-            produits_non_rentables.append(produit)
-    
-    if produits_non_rentables:
-        problemes.append(f"Certains produits ne sont pas rentables: {', '.join(produits_non_rentables)}")
-    
-    st.markdown("### 🔍 Analyse des problèmes:")
-    for i, probleme in enumerate(problemes):
-        st.markdown(f"{i+1}. **{probleme}**")
-    
-    st.markdown("### 💡 Recommandations:")
-    st.markdown("""
-    - Augmentez les prix de vente ou le volume des ventes
-    - Réduisez les coûts fixes ou les coûts variables
-    - Concentrez-vous sur les produits à plus forte marge
-    - Réévaluez les investissements initiaux
-    - Envisagez de retirer ou de reformuler les produits non rentables
-    """)
+
+section_rapport()
+
+# 10. Simulation Monte Carlo de l'incertitude sur la demande
+@section('monte_carlo')
+def section_monte_carlo():
+    st.markdown('<p class="sub-header">🎲 Incertitude sur la demande (Monte Carlo)</p>', unsafe_allow_html=True)
+
+    with st.form(key="monte_carlo_form"):
+        mc_col1, mc_col2, mc_col3 = st.columns(3)
+
+        with mc_col1:
+            nb_mois_simules = st.selectbox(
+                "Nombre de mois simulés",
+                [10_000, 100_000, 1_000_000, 5_000_000],
+                index=2,
+                format_func=lambda n: f"{n:,}".replace(",", " "),
+                key="mc_nb_mois"
+            )
+
+        calibrage = calibrage_ventes()
+        with mc_col2:
+            loi_demande = st.selectbox(
+                "Loi des commandes journalières",
+                ["Poisson", "Binomiale négative"] + (["Calibrée sur les ventes de caisse"] if calibrage else []),
+                help="Calibrée : dispersion de chaque produit mesurée sur les ventes de caisse importées",
+                key="mc_loi"
+            )
+            dispersion = st.number_input(
+                "Dispersion (variance / moyenne)",
+                min_value=1.0,
+                value=2.0,
+                step=0.5,
+                help="Utilisée uniquement pour la binomiale négative",
+                key="mc_dispersion"
+            )
+
+        with mc_col3:
+            variabilite_commune = st.slider(
+                "Variabilité journalière commune aux produits (%)",
+                min_value=0,
+                max_value=100,
+                value=0,
+                step=5,
+                help="Corrèle la demande des produits (météo, affluence...). 0 = produits indépendants",
+                key="mc_variabilite"
+            )
+
+        mc_submitted = st.form_submit_button("Lancer la simulation")
+        if mc_submitted:
+            # La simulation tourne dans un processus séparé pour garder la page réactive
+            st.session_state.monte_carlo = executeur_simulations().submit(
+                simuler_et_resumer,
+                st.session_state.catalogue.prix_vente,
+                st.session_state.catalogue.cout_unitaire,
+                st.session_state.catalogue.commandes_jour,
+                list(st.session_state.charges_mensuelles.values()),
+                list(st.session_state.charges_investissement.values()),
+                st.session_state.jours_activite,
+                st.session_state.taux_impot,
+                st.session_state.nb_associes,
+                nb_mois=nb_mois_simules,
+                dispersion=(dispersion if loi_demande == "Binomiale négative"
+                            else calibrage['dispersion'] if loi_demande.startswith("Calibrée") else 1.0),
+                variabilite_commune=variabilite_commune / 100,
+                **financement_session(scenario_depuis_session(st.session_state))
+            )
+            # Relance de la page : le fragment des résultats se rafraîchit pendant le calcul
+            st.rerun()
+
+section_monte_carlo()
+
+# Affichage des résultats : le fragment se rafraîchit seul tant que la simulation tourne
+def afficher_monte_carlo():
+    simulation = st.session_state.get('monte_carlo')
+    if simulation is None:
+        st.info("Lancez une simulation pour obtenir la distribution du profit net.")
+        return
+    if not simulation.done():
+        st.info("⏳ Simulation en cours en arrière-plan...")
+        return
+    if st.session_state.get('monte_carlo_en_attente'):
+        # Simulation terminée : une dernière exécution complète arrête le rafraîchissement
+        st.session_state.monte_carlo_en_attente = False
+        st.rerun()
+
+    resume = simulation.result()
+    mc_res1, mc_res2, mc_res3, mc_res4 = st.columns(4)
+    with mc_res1:
+        st.metric(label="Profit net P5", value=f"{resume['profit_p5']:.2f} Dh")
+    with mc_res2:
+        st.metric(label="Profit net P50", value=f"{resume['profit_p50']:.2f} Dh")
+    with mc_res3:
+        st.metric(label="Profit net P95", value=f"{resume['profit_p95']:.2f} Dh")
+    with mc_res4:
+        st.metric(label="Probabilité d'un mois en perte", value=f"{resume['proba_perte'] * 100:.2f}%")
+
+    st.markdown(
+        f"**Temps de retour** (mois) - P5: {resume['retour_p5']:.1f}, "
+        f"P50: {resume['retour_p50']:.1f}, P95: {resume['retour_p95']:.1f} "
+        f"({resume['proba_sans_retour'] * 100:.2f}% des mois simulés sans retour possible)"
+    )
+
+    histogramme = resume['histogramme_retour']
+    if histogramme['effectifs']:
+        bornes = np.asarray(histogramme['bornes'])
+        df_retour = pd.DataFrame({
+            "Temps de retour (mois)": np.round((bornes[:-1] + bornes[1:]) / 2, 2),
+            "Mois simulés": histogramme['effectifs']
+        })
+        st.bar_chart(df_retour, x="Temps de retour (mois)", y="Mois simulés")
+
+simulation_en_cours = 'monte_carlo' in st.session_state and not st.session_state.monte_carlo.done()
+if simulation_en_cours:
+    st.session_state.monte_carlo_en_attente = True
+st.fragment(run_every=1.0 if simulation_en_cours else None)(afficher_monte_carlo)()
+
+# 11. Carte de rentabilité prix x volume
+@section('carte')
+def section_carte():
+    st.markdown('<p class="sub-header">🗺️ Rentabilité selon le prix et le nombre de clients</p>', unsafe_allow_html=True)
+
+    carte_col1, carte_col2 = st.columns(2)
+    with carte_col1:
+        clients_max = st.slider("Clients par jour (maximum affiché)", min_value=50, max_value=500,
+                                value=250, step=10, key="carte_clients_max")
+    with carte_col2:
+        multiplicateur_min, multiplicateur_max = st.slider(
+            "Multiplicateur des prix de vente", min_value=0.25, max_value=3.0,
+            value=(0.5, 2.0), step=0.05, key="carte_multiplicateurs"
+        )
+
+    scenario_courant = scenario_depuis_session(st.session_state)
+    cle_scenario = hachage_scenario(scenario_courant) + cle_financement()
+    cle_carte = f"{cle_scenario}:{clients_max}:{multiplicateur_min}:{multiplicateur_max}"
+
+    grille = grille_profit_cachee(cle_scenario, scenario_courant, financement_session(scenario_courant),
+                                  clients_max, multiplicateur_min, multiplicateur_max)
+
+    with st.container():
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        afficher_graphique("carte_rentabilite", cle_carte, "dessiner_carte_rentabilite", grille,
+                           sum(scenario_courant['commandes_jour'].values()))
+        st.markdown('</div>', unsafe_allow_html=True)
+
+section_carte()
+
+# 12. Projection de trésorerie pluriannuelle
+@section('projection')
+def section_projection():
+    st.markdown('<p class="sub-header">📅 Projection de trésorerie sur plusieurs années</p>', unsafe_allow_html=True)
+
+    proj_col1, proj_col2, proj_col3 = st.columns(3)
+    with proj_col1:
+        nb_mois_projection = st.selectbox("Horizon (mois)", [36, 48, 60], index=2, key="proj_horizon")
+        mois_ouverture = st.selectbox("Mois d'ouverture", list(range(1, 13)), format_func=lambda m: MOIS[m - 1],
+                                      key="proj_mois_ouverture")
+    with proj_col2:
+        niveau_initial = st.slider("Demande au premier mois (% de la demande nominale)", 0, 100, 50, step=5,
+                                   key="proj_niveau_initial")
+        duree_montee = st.slider("Durée de montée en charge (mois)", 0, 24, 6, key="proj_duree_montee")
+    with proj_col3:
+        inflation_couts = st.number_input("Inflation des coûts unitaires (%/an)", value=3.0, step=0.5,
+                                          key="proj_inflation_couts")
+        inflation_charges = st.number_input("Inflation des charges fixes (%/an)", value=2.0, step=0.5,
+                                            key="proj_inflation_charges")
+        inflation_prix = st.number_input("Hausse des prix de vente (%/an)", value=0.0, step=0.5,
+                                         key="proj_inflation_prix")
+
+    # Coefficients mesurés sur les ventes de caisse importées, sinon demande constante
+    calibrage = calibrage_ventes()
+    with st.expander("Saisonnalité par produit (coefficient de la demande par mois)"):
+        saisonnalite_defaut = pd.DataFrame(1.0 if calibrage is None else calibrage['saisonnalite'].round(2),
+                                           index=list(st.session_state.catalogue.noms), columns=list(MOIS))
+        if calibrage is not None:
+            st.caption("Coefficients calibrés sur les ventes de caisse importées.")
+        saisonnalite = st.data_editor(saisonnalite_defaut, use_container_width=True, key="proj_saisonnalite")
+
+    produits_projection = list(st.session_state.catalogue.noms)
+    scenario = scenario_depuis_session(st.session_state)
+    echeancier = echeanciers_session(scenario, nb_mois_projection)
+    with mesure("projeter_tresorerie", "moteur"):
+        projection = projeter_tresorerie(
+            *vecteurs_scenario(scenario)[:7],
+            nb_mois=nb_mois_projection,
+            niveau_initial=niveau_initial / 100,
+            duree_montee=duree_montee,
+            saisonnalite=saisonnalite.reindex(produits_projection).fillna(1.0).to_numpy(),
+            mois_depart=mois_ouverture,
+            inflation_prix=inflation_prix,
+            inflation_couts=inflation_couts,
+            inflation_charges=inflation_charges,
+            financement=echeancier
+        )
+
+    proj_res1, proj_res2, proj_res3 = st.columns(3)
+    with proj_res1:
+        retour_courbe = projection['temps_retour'][0]
+        st.metric(label="Retour sur investissement (trésorerie cumulée)",
+                  value=f"{retour_courbe:.1f} mois" if np.isfinite(retour_courbe) else f"> {nb_mois_projection} mois")
+    with proj_res2:
+        st.metric(label="Besoin de trésorerie maximal", value=f"{projection['besoin_tresorerie'][0]:.2f} Dh")
+    with proj_res3:
+        st.metric(label=f"Trésorerie cumulée à {nb_mois_projection} mois", value=f"{projection['cumul'][0, -1]:.2f} Dh")
+
+    df_projection = pd.DataFrame({
+        "Mois": np.arange(nb_mois_projection + 1),
+        "Trésorerie cumulée (Dh)": projection['cumul'][0],
+        "Flux mensuel (Dh)": projection['flux'][0],
+    })
+    st.line_chart(df_projection, x="Mois", y=["Trésorerie cumulée (Dh)", "Flux mensuel (Dh)"])
+
+section_projection()
+
+# 13. Optimisation des prix de vente selon l'élasticité de la demande
+@section('optimisation')
+def section_optimisation():
+    indicateurs = calculer_indicateurs()
+    st.markdown('<p class="sub-header">🏷️ Optimisation des prix de vente</p>', unsafe_allow_html=True)
+    st.write("Élasticité propre : variation en % de la demande d'un produit pour +1 % de son prix "
+             "(négative). Les prix optimaux sont cherchés entre le prix minimal et le prix maximal.")
+
+    catalogue = st.session_state.catalogue
+    produits_optimisation = list(catalogue.noms)
+    elasticites_defaut = pd.DataFrame({
+        "Élasticité": -1.5,
+        "Prix minimal (Dh)": catalogue.cout_unitaire,
+        "Prix maximal (Dh)": 3 * catalogue.prix_vente,
+    }, index=produits_optimisation)
+    elasticites = st.data_editor(elasticites_defaut, use_container_width=True, key="optim_elasticites")
+
+    # La matrice des élasticités croisées n'est saisissable que pour un petit catalogue
+    # (au-delà, produits supposés indépendants)
+    matrice_croisees = np.zeros((len(catalogue), len(catalogue)))
+    if len(catalogue) <= MAX_PRODUITS_CROISES:
+        with st.expander("Élasticités croisées (effet du prix de la colonne sur la demande de la ligne)"):
+            croisees_defaut = pd.DataFrame(0.0, index=produits_optimisation, columns=produits_optimisation)
+            croisees = st.data_editor(croisees_defaut, use_container_width=True, key="optim_croisees")
+        matrice_croisees = croisees.reindex(index=produits_optimisation, columns=produits_optimisation).fillna(0.0).to_numpy()
+
+    elasticites = elasticites.reindex(produits_optimisation).fillna(elasticites_defaut)
+    scenario = scenario_depuis_session(st.session_state)
+    with mesure("optimiser_prix", "moteur"):
+        optimisation = optimiser_prix(
+            *vecteurs_scenario(scenario),
+            **financement_session(scenario),
+            elasticites=elasticites["Élasticité"].to_numpy(),
+            elasticites_croisees=matrice_croisees if matrice_croisees.any() else None,
+            prix_min=elasticites["Prix minimal (Dh)"].to_numpy(),
+            prix_max=elasticites["Prix maximal (Dh)"].to_numpy()
+        )
+
+    profit_optimal = optimisation['indicateurs']['profit_net'][0]
+    optim_col1, optim_col2 = st.columns(2)
+    with optim_col1:
+        st.metric(label="Profit net mensuel aux prix optimaux", value=f"{profit_optimal:.2f} Dh",
+                  delta=f"{profit_optimal - indicateurs['profit_net']:.2f} Dh")
+    with optim_col2:
+        st.metric(label="Profit par associé aux prix optimaux",
+                  value=f"{optimisation['indicateurs']['profit_par_associe'][0]:.2f} Dh")
+
+    st.dataframe(pd.DataFrame({
+        "Prix actuel (Dh)": catalogue.prix_vente,
+        "Prix optimal (Dh)": optimisation['prix'][0],
+        "Commandes/jour actuelles": catalogue.commandes_jour,
+        "Commandes/jour estimées": optimisation['commandes_jour'][0],
+    }, index=produits_optimisation).style.format("{:.2f}"), use_container_width=True)
+
+section_optimisation()
+
+# 14. Recherche de valeur cible
+@section('objectif')
+def section_objectif():
+    st.markdown('<p class="sub-header">🎯 Recherche de valeur cible</p>', unsafe_allow_html=True)
+    st.write("Quelle valeur d'une saisie permet d'atteindre un objectif ? Plusieurs cibles sont résolues ensemble.")
+
+    libelles_objectifs = {
+        'profit_par_associe': "Profit par associé (Dh)",
+        'profit_net': "Profit net mensuel (Dh)",
+        'temps_retour': "Temps de retour (mois)",
+    }
+    variables_objectif = [("commandes", 0, "Commandes par jour (répartition actuelle)")]
+    variables_objectif += [("prix", i, f"Prix de vente : {p}") for i, p in enumerate(st.session_state.catalogue.noms)]
+    variables_objectif += [("charge", i, f"Charge mensuelle : {c}")
+                           for i, c in enumerate(st.session_state.charges_mensuelles)]
+    variables_objectif.append(("jours", 0, "Jours d'activité par mois"))
+
+    cible_col1, cible_col2 = st.columns(2)
+    with cible_col1:
+        objectif = st.selectbox("Objectif", list(libelles_objectifs), format_func=libelles_objectifs.get,
+                                key="cible_objectif")
+        variable_choisie = st.selectbox("Saisie à ajuster", range(len(variables_objectif)),
+                                        format_func=lambda i: variables_objectif[i][2], key="cible_variable")
+    with cible_col2:
+        cibles_defaut = {
+            'profit_par_associe': [5000.0, 7500.0, 10000.0],
+            'profit_net': [30000.0, 45000.0, 60000.0],
+            'temps_retour': [6.0, 12.0, 24.0],
+        }
+        cibles = st.data_editor(pd.DataFrame({"Cible": cibles_defaut[objectif]}), num_rows="dynamic",
+                                use_container_width=True, key=f"cible_valeurs_{objectif}")
+
+    cibles = cibles["Cible"].dropna().to_numpy(dtype=float)
+    if len(cibles):
+        variable, indice, libelle_variable = variables_objectif[variable_choisie]
+        scenario = scenario_depuis_session(st.session_state)
+        with mesure("resoudre_objectif", "moteur"):
+            solution = resoudre_objectif(*vecteurs_scenario(scenario), **financement_session(scenario),
+                                         objectif=objectif, cible=cibles, variable=variable, indice=indice)
+        if variable == 'commandes':
+            total_commandes = st.session_state.catalogue.commandes_jour.sum()
+            valeurs, actuelle = solution['valeur'] * total_commandes, total_commandes
+        else:
+            valeurs, actuelle = solution['valeur'], solution['actuelle'][0]
+        st.dataframe(pd.DataFrame({
+            libelles_objectifs[objectif]: cibles,
+            libelle_variable: valeurs,
+            "Variation (%)": (valeurs / actuelle - 1) * 100 if actuelle else np.nan,
+        }).style.format("{:.2f}", na_rep="hors d'atteinte"), use_container_width=True, hide_index=True)
+
+section_objectif()
+
+# 15. Portefeuille de sites (franchise)
+@section('franchise')
+def section_franchise():
+    st.markdown('<p class="sub-header">🏬 Franchise multi-sites</p>', unsafe_allow_html=True)
+    st.write("Chaque site reprend le catalogue avec sa propre fréquentation (multiplicateur des "
+             "commandes par jour), ses charges mensuelles et ses investissements (multiplicateur). "
+             "Les charges centrales sont réparties au prorata du chiffre d'affaires des sites. "
+             "Les sites sont évalués hors plan de financement (investissements en fonds propres).")
+
+    charges = list(st.session_state.charges_mensuelles)
+    sites_defaut = pd.DataFrame({
+        "Site": [f"Site {i + 1}" for i in range(3)],
+        "Fréquentation (x)": [1.0, 0.8, 1.2],
+        **{charge: float(montant) for charge, montant in st.session_state.charges_mensuelles.items()},
+        "Investissement (x)": 1.0,
+    })
+
+    with st.form(key="franchise_form"):
+        sites = st.data_editor(
+            sites_defaut,
+            use_container_width=True,
+            hide_index=True,
+            num_rows="dynamic",
+            column_config={
+                "Fréquentation (x)": st.column_config.NumberColumn(min_value=0.0, step=0.05, format="%.2f"),
+                "Investissement (x)": st.column_config.NumberColumn(min_value=0.0, step=0.05, format="%.2f"),
+                **{charge: st.column_config.NumberColumn(min_value=0.0, step=100.0, format="%.0f")
+                   for charge in charges},
+            },
+            key="franchise_sites"
+        )
+        central_col1, central_col2 = st.columns(2)
+        with central_col1:
+            charges_centrales = st.number_input("Charges centrales mensuelles (Dh)", min_value=0.0,
+                                                value=10000.0, step=1000.0, key="franchise_charges_centrales")
+        with central_col2:
+            investissement_central = st.number_input("Investissement central (Dh)", min_value=0.0,
+                                                     value=50000.0, step=5000.0, key="franchise_investissement")
+        st.form_submit_button("Évaluer le portefeuille")
+
+    sites = sites.dropna(subset=["Site"]).fillna(sites_defaut.iloc[0])
+    if sites.empty:
+        st.info("Ajoutez au moins un site.")
+        return
+
+    prix, couts, commandes, _, investissements, jours, taux, associes = vecteurs_scenario(
+        scenario_depuis_session(st.session_state))
+    entrees_sites = (
+        commandes * sites["Fréquentation (x)"].to_numpy(dtype=float)[:, np.newaxis],
+        sites[charges].to_numpy(dtype=float),
+        investissements * sites["Investissement (x)"].to_numpy(dtype=float)[:, np.newaxis],
+    )
+    with mesure("evaluer_portefeuille", "moteur", sites=len(sites)):
+        portefeuille = evaluer_portefeuille(prix, couts, *entrees_sites, jours, taux, associes,
+                                            charges_centrales, investissement_central)
+
+    consolide = portefeuille['consolide']
+    fr_col1, fr_col2, fr_col3 = st.columns(3)
+    with fr_col1:
+        st.metric(label="Profit net consolidé", value=f"{consolide['profit_net'][0]:.2f} Dh")
+    with fr_col2:
+        st.metric(label="Investissement total", value=f"{consolide['total_investissement'][0]:.2f} Dh")
+    with fr_col3:
+        retour = consolide['temps_retour'][0]
+        st.metric(label="Temps de retour consolidé",
+                  value=f"{retour:.1f} mois" if np.isfinite(retour) else "Non rentable")
+
+    par_site = portefeuille['sites']
+    st.dataframe(pd.DataFrame({
+        "Site": sites["Site"].to_numpy(),
+        "Revenu mensuel (Dh)": par_site['revenu_brut'],
+        "Contribution (Dh)": portefeuille['contribution'],
+        "Quote-part centrale (Dh)": portefeuille['quote_part_centrale'],
+        "Profit net (Dh)": par_site['profit_net'],
+        "Temps de retour (mois)": par_site['temps_retour'],
+    }).style.format({
+        "Revenu mensuel (Dh)": "{:.2f}",
+        "Contribution (Dh)": "{:.2f}",
+        "Quote-part centrale (Dh)": "{:.2f}",
+        "Profit net (Dh)": "{:.2f}",
+        "Temps de retour (mois)": "{:.1f}",
+    }), use_container_width=True, hide_index=True)
+
+    # Simulation Monte Carlo de chaque site, répartie par blocs de sites sur les processus
+    # du pool partagé : la page reste réactive pendant le calcul
+    with st.form(key="franchise_mc_form"):
+        nb_mois_sites = st.selectbox("Mois simulés par site", [1_000, 10_000, 100_000], index=1,
+                                     format_func=lambda n: f"{n:,}".replace(",", " "), key="franchise_mc_nb_mois")
+        if st.form_submit_button("Simuler le portefeuille"):
+            st.session_state.franchise_mc = {
+                'taches': lancer_simulations(executeur_simulations(), prix, couts, *entrees_sites, jours,
+                                             taux, associes, charges_centrales, investissement_central,
+                                             nb_mois=nb_mois_sites),
+                'sites': sites["Site"].tolist(),
+                'investissement_total': consolide['total_investissement'][0],
+                'taux_impot': taux,
+            }
+            st.rerun()
+
+section_franchise()
+
+# Résultats de la simulation du portefeuille : le fragment se rafraîchit seul tant que des
+# blocs de sites sont en cours de calcul
+def afficher_franchise_mc():
+    simulation = st.session_state.get('franchise_mc')
+    if simulation is None:
+        return
+    termines = sum(tache.done() for tache in simulation['taches'])
+    if termines < len(simulation['taches']):
+        st.progress(termines / len(simulation['taches']),
+                    text=f"⏳ Simulation des sites en arrière-plan ({termines}/{len(simulation['taches'])} blocs)")
+        return
+    if st.session_state.get('franchise_mc_en_attente'):
+        st.session_state.franchise_mc_en_attente = False
+        st.rerun()
+
+    if 'resultat' not in simulation:
+        simulation['resultat'] = consolider_simulations(
+            [tache.result() for tache in simulation['taches']], simulation['investissement_total'],
+            simulation['taux_impot'])
+    resultat = simulation['resultat']
+    consolide = resultat['consolide']
+    st.markdown(
+        f"**Profit net consolidé** - P5: {consolide['profit_p5']:.2f} Dh, P50: {consolide['profit_p50']:.2f} Dh, "
+        f"P95: {consolide['profit_p95']:.2f} Dh ({consolide['proba_perte'] * 100:.2f}% des mois en perte)"
+    )
+    st.dataframe(pd.DataFrame({
+        "Site": simulation['sites'],
+        "Profit net P5 (Dh)": [r['profit_p5'] for r in resultat['sites']],
+        "Profit net P50 (Dh)": [r['profit_p50'] for r in resultat['sites']],
+        "Profit net P95 (Dh)": [r['profit_p95'] for r in resultat['sites']],
+        "Mois en perte (%)": [r['proba_perte'] * 100 for r in resultat['sites']],
+    }).style.format("{:.2f}", subset=pd.IndexSlice[:, ["Profit net P5 (Dh)", "Profit net P50 (Dh)",
+                                                         "Profit net P95 (Dh)", "Mois en perte (%)"]]),
+        use_container_width=True, hide_index=True)
+
+franchise_en_cours = ('franchise_mc' in st.session_state
+                      and not all(tache.done() for tache in st.session_state.franchise_mc['taches']))
+if franchise_en_cours:
+    st.session_state.franchise_mc_en_attente = True
+st.fragment(run_every=1.0 if franchise_en_cours else None)(afficher_franchise_mc)()
+
+# 16. Capacité de service aux heures de pointe
+@section('capacite')
+def section_capacite():
+    st.markdown('<p class="sub-header">⏱️ Capacité de service aux heures de pointe</p>', unsafe_allow_html=True)
+    st.write("Les commandes par jour sont réparties sur les heures d'ouverture, puis préparées minute par "
+             "minute sur leur équipement par les employés disponibles. Les clients qui jugent l'attente "
+             "trop longue repartent sans commander.")
+
+    catalogue = st.session_state.catalogue
+    temps_defaut, postes_defaut, equipements = parametres_defaut(catalogue.noms)
+
+    with st.form(key="capacite_form"):
+        cap_col1, cap_col2 = st.columns([3, 2])
+        with cap_col1:
+            produits_capacite = st.data_editor(
+                pd.DataFrame({"Produit": list(catalogue.noms),
+                              "Équipement": [equipements[i] for i in postes_defaut],
+                              "Préparation (min)": temps_defaut}),
+                use_container_width=True,
+                hide_index=True,
+                disabled=["Produit"],
+                column_config={
+                    "Équipement": st.column_config.SelectboxColumn(options=equipements, required=True),
+                    "Préparation (min)": st.column_config.NumberColumn(min_value=0.1, step=0.5, format="%.1f"),
+                },
+                key="capacite_produits"
+            )
+        with cap_col2:
+            equipements_capacite = st.data_editor(
+                pd.DataFrame({"Équipement": equipements, "Exemplaires": 1}),
+                use_container_width=True,
+                hide_index=True,
+                disabled=["Équipement"],
+                column_config={"Exemplaires": st.column_config.NumberColumn(min_value=0, step=1, format="%d")},
+                key="capacite_equipements"
+            )
+            nb_employes = st.number_input("Employés en service", min_value=0, value=2, step=1,
+                                          key="capacite_employes")
+            patience = st.number_input("Patience moyenne d'un client (min)", min_value=0.5, value=8.0, step=0.5,
+                                       key="capacite_patience")
+            salaire_employe = st.number_input("Salaire mensuel d'un employé supplémentaire (Dh)", min_value=0.0,
+                                              value=3000.0, step=250.0, key="capacite_salaire")
+        st.form_submit_button("Simuler la capacité")
+
+    postes = np.array([equipements.index(poste) for poste in produits_capacite["Équipement"]], dtype=np.intp)
+    parametres = (tuple(produits_capacite["Préparation (min)"].fillna(0.1).to_numpy(dtype=float)), tuple(postes),
+                  tuple(equipements_capacite["Exemplaires"].fillna(0).to_numpy(dtype=float)),
+                  float(nb_employes), float(patience), tuple(range(1, max(nb_employes, 1) + 4)))
+    with mesure("simuler_capacite", "moteur"):
+        resultats = capacite_cachee(empreinte(CLES_PRODUITS), catalogue.commandes_jour, catalogue.prix_vente,
+                                    *parametres)
+
+    jours = st.session_state.jours_activite
+    cap_res1, cap_res2, cap_res3, cap_res4 = st.columns(4)
+    with cap_res1:
+        st.metric("Ventes effectives par jour", f"{resultats['ventes'][0].sum():.1f}",
+                  delta=f"{-resultats['abandons'][0].sum():.1f} clients perdus", delta_color="off")
+    with cap_res2:
+        st.metric("Revenu perdu par mois", f"{resultats['revenu_perdu'][0] * jours:.2f} Dh")
+    with cap_res3:
+        st.metric("Taux de service", f"{resultats['taux_service'][0] * 100:.1f}%")
+    with cap_res4:
+        st.metric("Attente moyenne (préparation comprise)", f"{resultats['attente_moyenne'][0]:.1f} min")
+
+    heures = list(range(HEURE_OUVERTURE, HEURE_OUVERTURE + len(PROFIL_HORAIRE)))
+    afficher_graphique("charge_horaire", f"{empreinte(CLES_PRODUITS)}:{hash(parametres)}",
+                       "dessiner_charge_horaire", heures, resultats['ventes_heure'][0], resultats['abandons_heure'][0])
+
+    occupation = resultats['occupation_equipements'][0]
+    st.dataframe(pd.DataFrame({
+        "Produit": catalogue.libelles(),
+        "Demande/jour": resultats['demande'][0],
+        "Ventes effectives/jour": resultats['ventes'][0],
+        "Clients perdus/jour": resultats['abandons'][0],
+        "Revenu perdu/mois (Dh)": resultats['abandons'][0] * catalogue.prix_vente * jours,
+        "Occupation de l'équipement (%)": occupation[postes] * 100,
+    }).round(2), use_container_width=True, hide_index=True)
+
+    # Variantes : marge récupérée sur les clients perdus, moins les salaires supplémentaires ;
+    # l'investissement d'un équipement ajouté est repris du tableau des investissements
+    marges = catalogue.prix_vente - catalogue.cout_unitaire
+    marge_mensuelle = resultats['ventes'] @ marges * jours
+    prix_equipements = np.array([st.session_state.charges_investissement.get(nom, 0.0) for nom in equipements])
+    ajoutes = resultats['equipement_ajoute'][1:]
+    gain = (marge_mensuelle[1:] - marge_mensuelle[0]
+            - (resultats['nb_employes'][1:] - nb_employes) * salaire_employe)
+    investissement = np.where(ajoutes >= 0, prix_equipements[np.maximum(ajoutes, 0)], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retour = np.where(gain > 0, investissement / gain, np.inf)
+    variantes = pd.DataFrame({
+        "Employés": resultats['nb_employes'][1:].astype(int),
+        "Équipement ajouté": [equipements[i] if i >= 0 else "-" for i in ajoutes],
+        "Ventes/jour": resultats['ventes'][1:].sum(axis=1),
+        "Revenu perdu/mois (Dh)": resultats['revenu_perdu'][1:] * jours,
+        "Gain mensuel net (Dh)": gain,
+        "Investissement (Dh)": investissement,
+        "Retour (mois)": retour,
+    }).sort_values("Gain mensuel net (Dh)", ascending=False)
+    st.write("**Variantes d'effectif et d'équipement** (gain de marge par rapport à la configuration actuelle, "
+             "salaires supplémentaires déduits)")
+    st.dataframe(variantes.head(10).round(2), use_container_width=True, hide_index=True)
+
+    # Les ventes effectives, resimulées sur une demande déjà limitée, perdraient encore quelques
+    # clients : le remplacement n'est proposé qu'une fois par jeu de paramètres de capacité
+    deja_appliquee = st.session_state.get('capacite_appliquee') == (parametres, tuple(catalogue.commandes_jour))
+    if st.button("Remplacer les commandes par jour par les ventes effectives", key="capacite_appliquer",
+                 disabled=deja_appliquee,
+                 help="Déjà appliqué pour ces paramètres de capacité" if deja_appliquee else None):
+        def limiter(nouveau):
+            nouveau.commandes_jour[:] = np.round(resultats['ventes'][0], 1)
+            st.session_state.capacite_appliquee = (parametres, tuple(nouveau.commandes_jour))
+        remplacer_catalogue(limiter, "Commandes par jour limitées à la capacité de service.")
+
+section_capacite()
+
+# 17. Recettes et coûts des ingrédients
+@section('recettes')
+def section_recettes():
+    st.markdown('<p class="sub-header">🧂 Recettes et coûts des ingrédients</p>', unsafe_allow_html=True)
+    st.write("Le coût unitaire d'un produit est dérivé de sa recette : quantité de chaque ingrédient, "
+             "au prix d'achat majoré des pertes. Les achats mensuels d'ingrédients en découlent.")
+    afficher_confirmation('recettes')
+
+    catalogue = st.session_state.catalogue
+    prix_ingredients = st.session_state.prix_ingredients
+    pertes_ingredients = st.session_state.pertes_ingredients
+    recettes = st.session_state.recettes
+
+    with st.form(key="recettes_form"):
+        rec_col1, rec_col2 = st.columns([2, 3])
+        with rec_col1:
+            ingredients = st.data_editor(
+                pd.DataFrame({"Ingrédient": list(prix_ingredients),
+                              "Unité": [defauts.UNITES_INGREDIENTS.get(nom, "") for nom in prix_ingredients],
+                              "Prix (Dh/unité)": prix_ingredients.montants,
+                              "Pertes (%)": [pertes_ingredients.get(nom, 0.0) * 100 for nom in prix_ingredients]}),
+                use_container_width=True,
+                hide_index=True,
+                num_rows="dynamic",
+                disabled=["Unité"],
+                column_config={
+                    "Prix (Dh/unité)": st.column_config.NumberColumn(min_value=0.0, format="%.2f"),
+                    "Pertes (%)": st.column_config.NumberColumn(min_value=0.0, max_value=95.0, format="%.1f"),
+                },
+                key="recettes_ingredients"
+            )
+        with rec_col2:
+            lignes_recettes = st.data_editor(
+                recettes.en_dataframe(),
+                use_container_width=True,
+                hide_index=True,
+                num_rows="dynamic",
+                column_config={
+                    "produit": st.column_config.SelectboxColumn("Produit", options=list(catalogue.noms),
+                                                                required=True),
+                    "ingredient": st.column_config.TextColumn("Ingrédient", required=True),
+                    "quantite": st.column_config.NumberColumn("Quantité par unité", min_value=0.0,
+                                                              format="%.3f"),
+                },
+                key="recettes_lignes"
+            )
+        enregistrer = st.form_submit_button("Enregistrer les recettes")
+
+    if enregistrer:
+        ingredients = ingredients[ingredients["Ingrédient"].notna()
+                                  & (ingredients["Ingrédient"].astype(str).str.strip() != "")]
+        noms_ingredients = ingredients["Ingrédient"].astype(str).str.strip().tolist()
+        try:
+            nouveaux_prix = Postes.depuis_dictionnaire(
+                dict(zip(noms_ingredients, ingredients["Prix (Dh/unité)"].fillna(0.0))),
+                modele=defauts.PRIX_INGREDIENTS)
+            nouvelles_pertes = Postes.depuis_dictionnaire(
+                dict(zip(noms_ingredients, ingredients["Pertes (%)"].fillna(0.0).clip(0.0, 95.0) / 100)),
+                modele=defauts.PERTES_INGREDIENTS)
+            nouvelles_recettes = Recettes.depuis_dataframe(lignes_recettes, noms_ingredients)
+            # Un ingrédient absent du tableau des prix (faute de frappe, majuscules) serait compté à 0 Dh
+            sans_prix = [nom for nom in nouvelles_recettes.ingredients if nom not in noms_ingredients]
+            if sans_prix:
+                raise ValueError("ingrédients absents du tableau des prix : " + ", ".join(sans_prix))
+        except ValueError as erreur:
+            st.error(f"Recettes non modifiées : {erreur}")
+        else:
+            st.session_state.prix_ingredients = nouveaux_prix
+            st.session_state.pertes_ingredients = nouvelles_pertes
+            st.session_state.recettes = nouvelles_recettes
+            for cle in ("recettes_ingredients", "recettes_lignes"):
+                st.session_state.pop(cle, None)
+            confirmer('recettes', "Recettes et prix des ingrédients enregistrés.")
+            st.rerun()
+
+    if not len(recettes):
+        st.info("Aucune recette : ajoutez des lignes produit / ingrédient / quantité.")
+        return
+
+    # Lot de prix : référence, puis chaque ingrédient renchéri seul, puis des variations communes
+    # de tous les prix ; coûts unitaires et indicateurs de tous les scénarios en une passe
+    sens_col1, sens_col2, sens_col3 = st.columns(3)
+    with sens_col1:
+        variation = st.number_input("Hausse d'un ingrédient (%)", min_value=1.0, max_value=200.0, value=10.0,
+                                    step=1.0, key="recettes_variation")
+    with sens_col2:
+        volatilite = st.number_input("Volatilité des prix d'achat (%)", min_value=0.0, max_value=100.0,
+                                     value=10.0, step=1.0, key="recettes_volatilite")
+    with sens_col3:
+        nb_aleatoires = st.number_input("Scénarios de prix aléatoires", min_value=0, max_value=100_000,
+                                        value=2_000, step=500, key="recettes_aleatoires")
+
+    prix = recettes.vecteur(prix_ingredients)
+    pertes = recettes.vecteur(pertes_ingredients)
+    scenario = scenario_depuis_session(st.session_state)
+    prix_vente, _, commandes, *autres = vecteurs_scenario(scenario)
+    with mesure("couts_recettes", "moteur"):
+        lot_prix = chocs_prix(prix, variation / 100, int(nb_aleatoires), volatilite / 100, graine=0)
+        couts, avec_recette = recettes.couts_catalogue(catalogue.noms, catalogue.cout_unitaire, lot_prix, pertes)
+        lot = calculer_indicateurs_lot(prix_vente, couts, commandes, *autres,
+                                       **financement_session(scenario))
+    jours = st.session_state.jours_activite
+    achats = recettes.achats(recettes.volumes_catalogue(catalogue.noms, catalogue.commandes_jour * jours),
+                             pertes)[0]
+
+    profit_actuel = calculer_indicateurs()['profit_net']
+    profit_recettes = lot['profit_net'][0]
+    aleatoires = lot['profit_net'][1 + len(prix):]
+    res_col1, res_col2, res_col3 = st.columns(3)
+    with res_col1:
+        st.metric("Profit net avec les coûts dérivés", f"{profit_recettes:.2f} Dh",
+                  delta=f"{profit_recettes - profit_actuel:.2f} Dh")
+    with res_col2:
+        st.metric("Achats d'ingrédients par mois", f"{achats @ prix:.2f} Dh")
+    with res_col3:
+        if len(aleatoires):
+            st.metric("Profit net défavorable (5 % des scénarios de prix)", f"{np.quantile(aleatoires, 0.05):.2f} Dh")
+
+    st.dataframe(pd.DataFrame({
+        "Produit": catalogue.libelles(),
+        "Coût saisi (Dh)": catalogue.cout_unitaire,
+        "Coût de la recette (Dh)": np.where(avec_recette, couts[0], np.nan),
+        "Écart (Dh)": np.where(avec_recette, couts[0] - catalogue.cout_unitaire, np.nan),
+    }).round(2), use_container_width=True, hide_index=True)
+
+    ach_col1, ach_col2 = st.columns(2)
+    with ach_col1:
+        st.write("**Achats mensuels d'ingrédients** (pertes comprises)")
+        st.dataframe(pd.DataFrame({
+            "Ingrédient": recettes.ingredients,
+            "Quantité": achats,
+            "Unité": [defauts.UNITES_INGREDIENTS.get(nom, "") for nom in recettes.ingredients],
+            "Montant (Dh)": achats * prix,
+        }).sort_values("Montant (Dh)", ascending=False).round(2), use_container_width=True, hide_index=True)
+    with ach_col2:
+        st.write(f"**Sensibilité du profit** à une hausse de {variation:.0f} % de chaque ingrédient")
+        impact = lot['profit_net'][1:1 + len(prix)] - profit_recettes
+        st.dataframe(pd.DataFrame({
+            "Ingrédient": recettes.ingredients,
+            "Impact sur le profit net (Dh)": impact,
+        }).sort_values("Impact sur le profit net (Dh)").head(10).round(2),
+            use_container_width=True, hide_index=True)
+
+    if st.button("Remplacer les coûts unitaires par les coûts des recettes", key="recettes_appliquer"):
+        def appliquer(nouveau):
+            nouveau.cout_unitaire[:] = np.round(couts[0], 2)
+        remplacer_catalogue(appliquer, "Coûts unitaires dérivés des recettes.")
+
+section_recettes()
+
+# 18. Financement des investissements et amortissements
+@section('financement')
+def section_financement():
+    st.markdown('<p class="sub-header">🏦 Financement et amortissements</p>', unsafe_allow_html=True)
+    st.write("Chaque investissement est payé en fonds propres, par un emprunt bancaire ou en crédit-bail, "
+             "et amorti sur sa durée d'utilisation. Les intérêts, loyers de crédit-bail et dotations sont "
+             "déduits du bénéfice imposable dans les indicateurs, la carte de rentabilité, l'optimisation, "
+             "la recherche de valeur cible, les simulations Monte Carlo, les recettes et les rapports ; "
+             "la franchise et la bibliothèque de scénarios restent hors financement.")
+    afficher_confirmation('financement')
+
+    plan = st.session_state.financement
+    investissements = st.session_state.charges_investissement
+    noms = list(investissements)
+
+    with st.form(key="financement_form"):
+        lignes_plan = st.data_editor(
+            plan.en_dataframe(noms, investissements.montants),
+            use_container_width=True,
+            hide_index=True,
+            disabled=["poste", "montant"],
+            column_config={
+                "poste": st.column_config.TextColumn("Poste"),
+                "montant": st.column_config.NumberColumn("Montant (Dh)", format="%.2f"),
+                "source": st.column_config.SelectboxColumn("Financement", options=list(SOURCES), required=True),
+                "part": st.column_config.NumberColumn("Part financée (%)", min_value=0.0, max_value=100.0,
+                                                      format="%.0f"),
+                "taux": st.column_config.NumberColumn("Taux (%/an)", min_value=0.0, max_value=50.0, format="%.2f"),
+                "duree": st.column_config.NumberColumn("Durée du crédit (mois)", min_value=0, step=6, format="%d"),
+                "amortissement": st.column_config.NumberColumn("Amortissement (mois)", min_value=0, step=12,
+                                                               format="%d"),
+            },
+            key="financement_plan"
+        )
+        enregistrer = st.form_submit_button("Enregistrer le plan de financement")
+    durees_usuelles = st.button("Appliquer les durées d'amortissement usuelles", key="financement_durees")
+
+    if enregistrer or durees_usuelles:
+        try:
+            nouveau = PlanFinancement.depuis_dataframe(lignes_plan)
+        except ValueError as erreur:
+            st.error(f"Plan de financement non modifié : {erreur}")
+        else:
+            if durees_usuelles:
+                nouveau.durees_amortissement = np.array(
+                    [DUREES_AMORTISSEMENT_USUELLES.get(nom, 0.0) for nom in nouveau.noms], dtype=float)
+            st.session_state.financement = nouveau
+            st.session_state.pop("financement_plan", None)
+            confirmer('financement', "Plan de financement enregistré.")
+            st.rerun()
+
+    scenario = scenario_depuis_session(st.session_state)
+    echeancier = echeanciers_session(scenario, 120)
+    if echeancier is None:
+        st.info("Tous les investissements sont payés en fonds propres et aucun n'est amorti.")
+        return
+
+    indicateurs = calculer_indicateurs()
+    sans_financement = calculer_indicateurs_scenario(*[scenario[cle] for cle in CLES_SCENARIO])
+    service = echeancier['interets'] + echeancier['principal'] + echeancier['loyers']
+    fin_col1, fin_col2, fin_col3, fin_col4 = st.columns(4)
+    with fin_col1:
+        st.metric("Apport des associés", f"{echeancier['apport'][0]:.2f} Dh",
+                  delta=f"{echeancier['emprunte'][0] + echeancier['credit_bail'][0]:.2f} Dh financés",
+                  delta_color="off")
+    with fin_col2:
+        st.metric("Service de la dette et loyers (1re année)", f"{service[0, :12].mean():.2f} Dh/mois")
+    with fin_col3:
+        st.metric("Coût total du crédit", f"{echeancier['cout_credit'][0]:.2f} Dh")
+    with fin_col4:
+        st.metric("Impôt mensuel (1re année)", f"{indicateurs['impot']:.2f} Dh",
+                  delta=f"{indicateurs['impot'] - sans_financement['impot']:.2f} Dh", delta_color="inverse")
+
+    st.write("**Échéancier annuel**")
+    st.dataframe(tableau_annuel(echeancier).round(2), use_container_width=True, hide_index=True)
+
+    # Balayage : part des investissements empruntée x durée du crédit, toutes les structures
+    # évaluées en un lot (échéanciers puis indicateurs)
+    st.write("**Structures d'emprunt** (postes hors crédit-bail empruntés à la part et sur la durée indiquées)")
+    taux_emprunt = st.number_input("Taux de l'emprunt bancaire (%/an)", min_value=0.0, max_value=50.0, value=7.0,
+                                   step=0.25, key="financement_taux_balayage")
+    parts, durees = np.linspace(0.0, 1.0, 11), np.arange(12, 121, 12)
+    with mesure("balayage_financement", "moteur"):
+        structures = structures_emprunt(plan.aligner(noms), taux_emprunt, parts, durees)
+        balayage = echeanciers(investissements.montants, structures['sources'], structures['parts'],
+                               structures['taux'], structures['durees'], structures['durees_amortissement'])
+        lot = calculer_indicateurs_lot(*vecteurs_scenario(scenario), **deductions_mensuelles(balayage))
+    service_balayage = (balayage['interets'] + balayage['principal'] + balayage['loyers'])[:, :12].mean(axis=1)
+    index = pd.Index((parts * 100).round().astype(int), name="Part empruntée (%)")
+    colonnes = pd.Index(durees, name="Durée (mois)")
+    bal_col1, bal_col2 = st.columns(2)
+    with bal_col1:
+        st.caption("ROI annuel sur fonds propres (%)")
+        st.dataframe(pd.DataFrame(lot['roi_annuel'].reshape(len(parts), len(durees)), index=index,
+                                  columns=colonnes).round(1), use_container_width=True)
+    with bal_col2:
+        st.caption("Service de la dette et loyers, 1re année (Dh/mois)")
+        st.dataframe(pd.DataFrame(service_balayage.reshape(len(parts), len(durees)), index=index,
+                                  columns=colonnes).round(0), use_container_width=True)
+
+section_financement()
 
 # Footer
 st.markdown("---")
@@ -773,15 +1892,21 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Bouton pour télécharger un rapport PDF (simulation)
+# Boutons de téléchargement des rapports : générés au clic, en arrière-plan
+libelles_rapports = {'pdf': "📊 Télécharger le rapport PDF", 'xlsx': "📗 Télécharger le rapport Excel"}
+scenario_rapport = scenario_depuis_session(st.session_state)
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
-    st.download_button(
-        label="📊 Télécharger le rapport PDF",
-        data="Cette fonctionnalité n'est pas encore disponible dans cette version.",
-        file_name="simulateur_rapport.txt",
-        mime="text/plain",
-    )
+    for format_rapport in formats_disponibles():
+        st.download_button(
+            label=libelles_rapports[format_rapport],
+            data=rapport_differe(scenario_rapport, format_rapport),
+            file_name=f"simuprofit_rapport_{date.today():%Y%m%d}.{format_rapport}",
+            mime=FORMATS_RAPPORT[format_rapport],
+            key=f"telecharger_{format_rapport}",
+        )
+    if 'xlsx' not in formats_disponibles():
+        st.caption("Rapport Excel indisponible : installez openpyxl.")
 
 # Ajout de conseils supplémentaires (optionnel)
 with st.expander("Conseils pour améliorer votre rentabilité"):
@@ -798,3 +1923,26 @@ with st.expander("Conseils pour améliorer votre rentabilité"):
     3. **Réduisez le gaspillage**: Améliorez la gestion des stocks et la conservation des produits.
     4. **Optimisez la consommation d'énergie**: Utilisez des appareils économes en énergie.
     """)
+
+# Panneau de profilage : répartition du temps par section, calcul et graphique pour les
+# dernières exécutions (page complète ou fragment seul), export au format Chrome trace
+if profileur_page is not None:
+    activer(None)
+    publier_profil(profileur_page)
+    with st.sidebar:
+        st.markdown("### 🛠️ Profilage")
+        historique = st.session_state.profilage_historique
+        execution = st.selectbox(
+            "Exécution",
+            range(len(historique) - 1, -1, -1),
+            format_func=lambda i: f"{historique[i].nom} - {historique[i].duree_totale():.1f} ms"
+        )
+        st.dataframe(pd.DataFrame(historique[execution].resume()).round(2), hide_index=True)
+        st.caption(f"Mémoire propre des paramètres de la session : "
+                   f"{defauts.memoire_session(st.session_state) / 1024:.1f} Ko")
+        st.download_button(
+            label="Exporter la trace (Chrome / Perfetto)",
+            data=json.dumps(trace_chrome(historique)),
+            file_name="trace_simuprofit.json",
+            mime="application/json",
+        )
@@ -0,0 +1,243 @@
+# Valeurs par défaut de la page, créées une seule fois par processus et partagées par toutes
+# les sessions : une session nouvelle ne reçoit que des références vers ces modèles immuables
+# (catalogue figé, postes en lecture seule). Une modification remplace dans la session le seul
+# paramètre modifié par une nouvelle version (copie à l'écriture, voir Catalogue.copie et
+# Postes.avec), les autres restant partagés.
+import sys
+
+import numpy as np
+
+from catalogue import Catalogue, Postes
+from financement import PlanFinancement
+from recettes import Recettes
+
+# Liste des produits avec leurs emojis
+PRODUITS = {
+    "Crêpes": "🥞",
+    "Gaufres": "🧇",
+    "Pancakes": "🥮",
+    "Glaces": "🍦",
+    "Salades/Bowls": "🥗",
+    "Jus": "🧃",
+    "Boissons chaudes": "☕"
+}
+
+PRIX_VENTE = {
+    "Crêpes": 30.0,
+    "Gaufres": 25.0,
+    "Pancakes": 25.0,
+    "Glaces": 14.0,
+    "Salades/Bowls": 25.0,
+    "Jus": 18.0,
+    "Boissons chaudes": 14.0
+}
+
+COUT_UNITAIRE = {
+    "Crêpes": 8.0,
+    "Gaufres": 8.0,
+    "Pancakes": 7.0,
+    "Glaces": 4.0,
+    "Salades/Bowls": 14.0,
+    "Jus": 8.0,
+    "Boissons chaudes": 5.0
+}
+
+COMMANDES_JOUR = {
+    "Crêpes": 25,
+    "Gaufres": 15,
+    "Pancakes": 12,
+    "Glaces": 20,
+    "Salades/Bowls": 10,
+    "Jus": 10,
+    "Boissons chaudes": 40
+}
+
+CATALOGUE = Catalogue.depuis_dictionnaires(PRODUITS, PRIX_VENTE, COUT_UNITAIRE, COMMANDES_JOUR).figer()
+
+# Charges mensuelles
+CHARGES_MENSUELLES = Postes.depuis_dictionnaire({
+    "Loyer": 7000.0,
+    "Salaires": 6000.0,
+    "Électricité": 3000.0,
+    "Ménage": 500.0,
+    "Publicité": 2000.0,
+    "Internet": 400.0,
+    "Divers": 1000.0
+})
+
+# Charges d'investissement
+CHARGES_INVESTISSEMENT = Postes.depuis_dictionnaire({
+    # Équipements
+    "Crépier": 7000.0,
+    "Gauffrel": 3750.0,
+    "Plaque & Pancakes": 650.0,
+    "Blender": 1500.0,
+    "Extracteur de jus": 2250.0,
+    "Machine café": 30000.0,
+    "Vitrine 2 glaces": 17500.0,
+    "Réfrigérateur": 5000.0,
+    "Congélateur": 3000.0,
+    "Presse agrume": 1750.0,
+    "Ustensiles": 4000.0,
+    "Produits initiales": 20000.0,
+
+    # Aménagement / Design Intérieur
+    "Peinture & Travaux": 10000.0,
+    "Décoration & Lumières": 20000.0,
+    "Étagères": 3500.0,
+    "Comptoir": 5000.0,
+    "Tables + Chaises": 2500.0,
+    "Panneaux extérieurs": 10000.0,
+    "TV + Caisse enregistreuse": 10000.0,
+    "Caméras de surveillance": 3000.0,
+
+    # Divers
+    "Loyer avance": 18000.0,
+    "Publicités": 15000.0
+})
+
+# Ingrédients : unité d'achat, prix (Dh par unité) et taux de perte (part jetée à la
+# préparation ou périmée : 0.1 = 10 %)
+UNITES_INGREDIENTS = {
+    "Farine": "kg",
+    "Lait": "L",
+    "Œufs": "u",
+    "Sucre": "kg",
+    "Beurre": "kg",
+    "Chocolat": "kg",
+    "Fruits frais": "kg",
+    "Glace": "L",
+    "Légumes": "kg",
+    "Poulet": "kg",
+    "Agrumes": "kg",
+    "Café": "kg",
+    "Thé": "kg",
+    "Emballages": "u"
+}
+
+PRIX_INGREDIENTS = Postes.depuis_dictionnaire({
+    "Farine": 8.0,
+    "Lait": 8.0,
+    "Œufs": 1.5,
+    "Sucre": 7.0,
+    "Beurre": 90.0,
+    "Chocolat": 120.0,
+    "Fruits frais": 25.0,
+    "Glace": 60.0,
+    "Légumes": 15.0,
+    "Poulet": 70.0,
+    "Agrumes": 8.0,
+    "Café": 200.0,
+    "Thé": 120.0,
+    "Emballages": 1.0
+})
+
+PERTES_INGREDIENTS = Postes.depuis_dictionnaire({
+    "Farine": 0.02,
+    "Lait": 0.03,
+    "Œufs": 0.05,
+    "Sucre": 0.01,
+    "Beurre": 0.02,
+    "Chocolat": 0.02,
+    "Fruits frais": 0.15,
+    "Glace": 0.05,
+    "Légumes": 0.15,
+    "Poulet": 0.05,
+    "Agrumes": 0.10,
+    "Café": 0.02,
+    "Thé": 0.02,
+    "Emballages": 0.0
+})
+
+# Recettes : quantité de chaque ingrédient par unité vendue (proches des coûts unitaires
+# saisis ci-dessus, qui restent ceux du scénario tant que les coûts dérivés ne sont pas appliqués)
+RECETTES = Recettes.depuis_lignes([
+    ("Crêpes", "Farine", 0.06), ("Crêpes", "Lait", 0.12), ("Crêpes", "Œufs", 1),
+    ("Crêpes", "Sucre", 0.01), ("Crêpes", "Beurre", 0.01), ("Crêpes", "Chocolat", 0.025),
+    ("Crêpes", "Emballages", 1),
+    ("Gaufres", "Farine", 0.08), ("Gaufres", "Lait", 0.08), ("Gaufres", "Œufs", 1),
+    ("Gaufres", "Sucre", 0.015), ("Gaufres", "Beurre", 0.02), ("Gaufres", "Chocolat", 0.02),
+    ("Gaufres", "Emballages", 1),
+    ("Pancakes", "Farine", 0.07), ("Pancakes", "Lait", 0.1), ("Pancakes", "Œufs", 1),
+    ("Pancakes", "Sucre", 0.01), ("Pancakes", "Beurre", 0.015), ("Pancakes", "Fruits frais", 0.06),
+    ("Pancakes", "Emballages", 1),
+    ("Glaces", "Glace", 0.05), ("Glaces", "Emballages", 1),
+    ("Salades/Bowls", "Légumes", 0.25), ("Salades/Bowls", "Poulet", 0.1),
+    ("Salades/Bowls", "Fruits frais", 0.03), ("Salades/Bowls", "Emballages", 1),
+    ("Jus", "Agrumes", 0.45), ("Jus", "Fruits frais", 0.1), ("Jus", "Emballages", 1),
+    ("Boissons chaudes", "Café", 0.015), ("Boissons chaudes", "Lait", 0.1),
+    ("Boissons chaudes", "Sucre", 0.01), ("Boissons chaudes", "Emballages", 1),
+], ingredients=list(UNITES_INGREDIENTS)).figer()
+
+# Plan de financement : sans ligne, tout est payé en fonds propres et rien n'est amorti (les
+# indicateurs sont ceux du calcul sans financement)
+FINANCEMENT = PlanFinancement().figer()
+
+# Paramètres d'activité et état initial complet d'une session
+ETAT_INITIAL = {
+    'catalogue': CATALOGUE,
+    'charges_mensuelles': CHARGES_MENSUELLES,
+    'charges_investissement': CHARGES_INVESTISSEMENT,
+    'jours_activite': 30,
+    'taux_impot': 20.0,
+    'nb_associes': 6,
+    'prix_ingredients': PRIX_INGREDIENTS,
+    'pertes_ingredients': PERTES_INGREDIENTS,
+    'recettes': RECETTES,
+    'financement': FINANCEMENT,
+}
+
+
+# Initialisation d'une session (ou de tout dictionnaire équivalent) : références aux modèles
+def initialiser_session(etat):
+    for cle, valeur in ETAT_INITIAL.items():
+        if cle not in etat:
+            etat[cle] = valeur
+
+
+# Identifiants des objets partagés par les modèles (ils ne comptent pas dans la mémoire propre
+# d'une session)
+def _objets_partages():
+    partages = set()
+    a_parcourir = list(ETAT_INITIAL.values())
+    while a_parcourir:
+        objet = a_parcourir.pop()
+        if id(objet) in partages:
+            continue
+        partages.add(id(objet))
+        a_parcourir.extend(_composants(objet))
+    return partages
+
+
+# Objets référencés par un paramètre de session
+def _composants(objet):
+    if isinstance(objet, dict):
+        return [*objet.keys(), *objet.values()]
+    if isinstance(objet, (list, tuple)):
+        return list(objet)
+    if isinstance(objet, Postes):
+        return [objet.noms, objet.montants, objet._positions]
+    if isinstance(objet, (Catalogue, Recettes, PlanFinancement)):
+        return list(vars(objet).values())
+    return []
+
+
+_PARTAGES = _objets_partages()
+
+
+# Mémoire propre (octets) des paramètres de scénario d'une session : objets copiés à
+# l'écriture ou chargés, hors objets partagés avec les modèles par défaut
+def memoire_session(etat):
+    vus = set(_PARTAGES)
+    total = 0
+    a_parcourir = [etat[cle] for cle in ETAT_INITIAL if cle in etat]
+    while a_parcourir:
+        objet = a_parcourir.pop()
+        if id(objet) in vus:
+            continue
+        vus.add(id(objet))
+        total += sys.getsizeof(objet)
+        if isinstance(objet, np.ndarray) and objet.base is not None:
+            total += objet.nbytes
+        a_parcourir.extend(_composants(objet))
+    return total
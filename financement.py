@@ -0,0 +1,291 @@
+# Financement des investissements et amortissements : chaque poste d'investissement a une
+# source de financement (fonds propres, emprunt bancaire, crédit-bail) et une durée
+# d'amortissement comptable.
+#
+# Les échéanciers sont calculés en forme fermée (annuités constantes, capital restant dû
+# après k échéances, dotations linéaires), vectorisés sur N structures de financement : les
+# postes sont agrégés avant de développer les M mois, et un balayage de milliers de
+# structures ne coûte que quelques passes NumPy.
+# Les intérêts, loyers de crédit-bail et dotations sont déductibles du bénéfice imposable
+# (voir moteur.calculer_indicateurs_lot et projection.projeter_tresorerie).
+import numpy as np
+
+from imports_differes import ModuleDiffere
+from moteur import en_matrice
+
+pd = ModuleDiffere("pandas")
+
+# Sources de financement (indice dans la colonne `sources` d'un plan)
+SOURCES = ("Fonds propres", "Emprunt bancaire", "Crédit-bail")
+FONDS_PROPRES, EMPRUNT, CREDIT_BAIL = range(len(SOURCES))
+
+# Durées d'amortissement usuelles (mois) des postes d'investissement de la page ; les autres
+# postes (dépôts, stock initial, publicité de lancement) ne s'amortissent pas
+DUREES_AMORTISSEMENT_USUELLES = {
+    "Crépier": 60,
+    "Gauffrel": 60,
+    "Plaque & Pancakes": 60,
+    "Blender": 36,
+    "Extracteur de jus": 60,
+    "Machine café": 60,
+    "Vitrine 2 glaces": 60,
+    "Réfrigérateur": 60,
+    "Congélateur": 60,
+    "Presse agrume": 36,
+    "Ustensiles": 36,
+    "Peinture & Travaux": 120,
+    "Décoration & Lumières": 120,
+    "Étagères": 120,
+    "Comptoir": 120,
+    "Tables + Chaises": 60,
+    "Panneaux extérieurs": 120,
+    "TV + Caisse enregistreuse": 36,
+    "Caméras de surveillance": 60,
+}
+
+# Colonnes d'un plan de financement, par poste
+COLONNES = ('sources', 'parts', 'taux', 'durees', 'durees_amortissement')
+
+# Valeur d'un poste absent du plan : fonds propres, sans amortissement
+VALEURS_DEFAUT = {'sources': FONDS_PROPRES, 'parts': 1.0, 'taux': 0.0, 'durees': 0.0, 'durees_amortissement': 0.0}
+
+
+# Plan de financement : pour chaque poste nommé, source, part financée (0 à 1, le reste en
+# fonds propres), taux annuel (%), durée du crédit (mois) et durée d'amortissement (mois).
+# Un plan vide (ou neutre) reproduit le calcul sans financement ni amortissement.
+class PlanFinancement:
+    def __init__(self, noms=(), sources=(), parts=(), taux=(), durees=(), durees_amortissement=()):
+        self.noms = [str(nom) for nom in noms]
+        self.sources = np.asarray(sources, dtype=np.intp).reshape(-1)
+        self.parts = np.clip(np.asarray(parts, dtype=float).reshape(-1), 0.0, 1.0)
+        self.taux = np.asarray(taux, dtype=float).reshape(-1)
+        self.durees = np.asarray(durees, dtype=float).reshape(-1)
+        self.durees_amortissement = np.asarray(durees_amortissement, dtype=float).reshape(-1)
+        if len({len(self.noms), *(len(getattr(self, c)) for c in COLONNES)}) != 1:
+            raise ValueError("Les colonnes du plan de financement n'ont pas la même longueur")
+        if len(self.sources) and (self.sources.min() < 0 or self.sources.max() >= len(SOURCES)):
+            raise ValueError("Source de financement inconnue")
+        _verifier_durees(self.sources, self.parts, self.durees, self.noms)
+        self._positions = {nom: i for i, nom in enumerate(self.noms)}
+
+    # Plan à partir d'un DataFrame de colonnes poste, source (libellé de SOURCES), part (%),
+    # taux (%/an), duree (mois), amortissement (mois)
+    @classmethod
+    def depuis_dataframe(cls, tableau):
+        manquantes = [c for c in ('poste', 'source', 'part', 'taux', 'duree', 'amortissement')
+                      if c not in tableau.columns]
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes dans le plan de financement : {', '.join(manquantes)}")
+        tableau = tableau[tableau['poste'].notna()].drop_duplicates('poste', keep='last')
+        inconnues = set(tableau['source'].dropna()) - set(SOURCES)
+        if inconnues:
+            raise ValueError(f"Source de financement inconnue : {', '.join(sorted(map(str, inconnues)))}")
+        valeurs = {c: pd.to_numeric(tableau[c], errors='coerce').fillna(0.0).clip(lower=0.0).to_numpy()
+                   for c in ('part', 'taux', 'duree', 'amortissement')}
+        return cls(tableau['poste'].astype(str).tolist(),
+                   [SOURCES.index(s) if s in SOURCES else FONDS_PROPRES for s in tableau['source']],
+                   valeurs['part'] / 100, valeurs['taux'], valeurs['duree'], valeurs['amortissement'])
+
+    def __len__(self):
+        return len(self.noms)
+
+    # Plan figé (modèle partagé entre sessions) : colonnes en lecture seule
+    def figer(self):
+        self.noms = tuple(self.noms)
+        for colonne in COLONNES:
+            getattr(self, colonne).flags.writeable = False
+        return self
+
+    # Sans crédit ni amortissement : le plan ne change pas les indicateurs
+    def neutre(self):
+        finances = (self.sources != FONDS_PROPRES) & (self.parts > 0)
+        return not (finances.any() or (self.durees_amortissement > 0).any())
+
+    # Colonnes (I,) du plan alignées sur les postes `noms` (postes absents : VALEURS_DEFAUT)
+    def aligner(self, noms):
+        positions = np.array([self._positions.get(nom, -1) for nom in noms], dtype=np.intp)
+        connus = positions >= 0
+        alignees = {}
+        for colonne in COLONNES:
+            valeurs = np.full(len(noms), VALEURS_DEFAUT[colonne], dtype=getattr(self, colonne).dtype)
+            valeurs[connus] = getattr(self, colonne)[positions[connus]]
+            alignees[colonne] = valeurs
+        return alignees
+
+    # Lignes du plan pour les postes `noms` et leurs `montants`, au format de depuis_dataframe
+    def en_dataframe(self, noms, montants):
+        colonnes = self.aligner(noms)
+        return pd.DataFrame({
+            'poste': list(noms),
+            'montant': np.asarray(montants, dtype=float),
+            'source': [SOURCES[s] for s in colonnes['sources']],
+            'part': colonnes['parts'] * 100,
+            'taux': colonnes['taux'],
+            'duree': colonnes['durees'],
+            'amortissement': colonnes['durees_amortissement'],
+        })
+
+    # Paramètres du plan pour un calcul mis en cache (tuple hachable)
+    def parametres(self):
+        return (tuple(self.noms),) + tuple(tuple(getattr(self, c).tolist()) for c in COLONNES)
+
+
+# Un emprunt ou un crédit-bail sans durée ne serait jamais remboursé : le poste deviendrait
+# gratuit. ValueError si une part financée (hors fonds propres) n'a pas de durée positive.
+def _verifier_durees(sources, parts, durees, noms=None):
+    sans_duree = (sources != FONDS_PROPRES) & (parts > 0) & ~(durees >= 1)
+    if sans_duree.any():
+        if noms is not None:
+            postes = ', '.join(np.asarray(noms, dtype=object)[sans_duree.reshape(-1)])
+            raise ValueError(f"Durée du crédit manquante pour : {postes}")
+        raise ValueError("Durée du crédit manquante pour une part empruntée ou en crédit-bail")
+
+
+# Mensualité constante d'un crédit de `montant` au taux annuel `taux` (%) sur `duree` mois
+# (tableaux diffusés entre eux ; durée nulle : aucune mensualité)
+def mensualite(montant, taux, duree):
+    montant, duree = np.asarray(montant, dtype=float), np.asarray(duree, dtype=float)
+    r = np.asarray(taux, dtype=float) / 1200
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        annuite = np.where(r > 0, montant * r / -np.expm1(-duree * np.log1p(r)), montant / duree)
+    return np.where(duree > 0, annuite, 0.0)
+
+
+# Capital restant dû après `echeances` mensualités (0 après la dernière)
+def capital_restant(montant, taux, duree, echeances):
+    montant, duree = np.asarray(montant, dtype=float), np.asarray(duree, dtype=float)
+    echeances = np.minimum(np.asarray(echeances, dtype=float), duree)
+    r = np.asarray(taux, dtype=float) / 1200
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # ((1 + r)^n - (1 + r)^k) / ((1 + r)^n - 1), écrit pour rester précis aux petits taux
+        croissance = np.log1p(r)
+        restant = np.where(r > 0, -np.expm1((echeances - duree) * croissance) / -np.expm1(-duree * croissance),
+                           1.0 - echeances / duree)
+    return np.where(duree > 0, montant * restant, 0.0)
+
+
+# Échéanciers mensuels de mois 1 à `nb_mois` pour N structures de financement.
+#   montants : (I,) ou (N, I) montant de chaque poste d'investissement
+#   sources, parts, taux, durees, durees_amortissement : (I,) ou (N, I), voir PlanFinancement
+# Retourne des tableaux (N, M) : 'interets', 'principal' (capital remboursé), 'loyers' (crédit-bail),
+# 'dotations', 'capital_restant' (fin de mois) ; et (N,) : 'apport' (fonds propres versés au
+# mois 0), 'emprunte', 'credit_bail' (montants financés), 'cout_credit' (intérêts et coût du
+# crédit-bail sur toute la durée)
+#
+# Les postes sont agrégés avant de développer les mois : loyers et dotations sont des paliers
+# (montant constant jusqu'à la fin de la durée), cumulés par différences ; les emprunts de même
+# taux et durée d'une structure sont additionnés (le capital restant dû est linéaire en
+# montant), et seul chaque groupe est développé sur les mois.
+def echeanciers(montants, sources, parts, taux, durees, durees_amortissement, nb_mois=60):
+    montants, sources, parts, taux, durees, amortissement = np.broadcast_arrays(
+        en_matrice(montants), en_matrice(sources), en_matrice(parts), en_matrice(taux),
+        en_matrice(durees), en_matrice(durees_amortissement))
+    parts = np.clip(parts, 0.0, 1.0)
+    _verifier_durees(sources, parts * (montants != 0), durees)
+    finance = montants * np.where(sources != FONDS_PROPRES, parts, 0.0)
+    emprunte = np.where(sources == EMPRUNT, finance, 0.0)
+    loue = np.where(sources == CREDIT_BAIL, finance, 0.0)
+    # Les biens en crédit-bail n'appartiennent pas à l'entreprise : pas d'amortissement
+    amortissable = np.where(sources == CREDIT_BAIL, montants - loue, montants)
+    loyer = mensualite(loue, taux, durees)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dotation = np.where(amortissement > 0, amortissable / amortissement, 0.0)
+
+    # Emprunts groupés (N, K), capital restant dû en fin de mois 0..M : avant et après chaque échéance
+    groupes, taux_groupes, durees_groupes = _grouper_emprunts(emprunte, taux, durees)
+    restants = capital_restant(groupes[..., np.newaxis], taux_groupes[..., np.newaxis],
+                               durees_groupes[..., np.newaxis], np.arange(nb_mois + 1, dtype=float))
+    interets = (restants[..., :-1] * (taux_groupes[..., np.newaxis] / 1200)).sum(axis=1)
+    restants = restants.sum(axis=1)
+
+    total_mensualites = mensualite(emprunte, taux, durees) * durees
+    return {
+        'interets': interets,
+        'principal': restants[:, :-1] - restants[:, 1:],
+        'loyers': _paliers(loyer, durees, nb_mois),
+        'dotations': _paliers(dotation, amortissement, nb_mois),
+        'capital_restant': restants[:, 1:],
+        'apport': (montants - finance).sum(axis=1),
+        'emprunte': emprunte.sum(axis=1),
+        'credit_bail': loue.sum(axis=1),
+        'cout_credit': (total_mensualites - emprunte + loyer * durees - loue).sum(axis=1),
+    }
+
+
+# Somme (N, M) de paliers : chaque poste verse `valeurs` (N, I) chaque mois de 1 à `durees` (N, I)
+def _paliers(valeurs, durees, nb_mois):
+    n, i = valeurs.shape
+    fins = np.clip(np.floor(durees), 0, nb_mois).astype(np.intp)
+    valeurs = np.where(fins > 0, valeurs, 0.0)
+    lignes = np.repeat(np.arange(n) * (nb_mois + 1), i)
+    variations = np.bincount(lignes + fins.reshape(-1), weights=-valeurs.reshape(-1), minlength=n * (nb_mois + 1))
+    variations = variations.reshape(n, nb_mois + 1)
+    variations[:, 0] += valeurs.sum(axis=1)
+    return np.cumsum(variations[:, :-1], axis=1)
+
+
+# Montants empruntés (N, I) additionnés par couple (taux, durée) au sein de chaque structure :
+# (montants, taux, durées) des K groupes (N, K), groupes vides à montant nul
+def _grouper_emprunts(emprunte, taux, durees):
+    n, i = emprunte.shape
+    lignes, postes = np.nonzero(emprunte)
+    if not len(lignes):
+        return np.zeros((n, 1)), np.zeros((n, 1)), np.zeros((n, 1))
+    valeurs_taux, codes_taux = np.unique(taux[lignes, postes], return_inverse=True)
+    valeurs_durees, codes_durees = np.unique(durees[lignes, postes], return_inverse=True)
+    nb_couples = len(valeurs_taux) * len(valeurs_durees)
+    cles, inverse = np.unique(lignes * nb_couples + codes_taux * len(valeurs_durees) + codes_durees,
+                              return_inverse=True)
+    lignes_cles, couples = np.divmod(cles, nb_couples)
+    # Rang de chaque groupe dans sa structure
+    rangs = np.arange(len(cles)) - np.searchsorted(lignes_cles, lignes_cles)
+    k = rangs.max() + 1
+    montants = np.zeros((n, k))
+    np.add.at(montants, (lignes_cles[inverse], rangs[inverse]), emprunte[lignes, postes])
+    taux_groupes, durees_groupes = np.zeros((n, k)), np.zeros((n, k))
+    taux_groupes[lignes_cles, rangs] = valeurs_taux[couples // len(valeurs_durees)]
+    durees_groupes[lignes_cles, rangs] = valeurs_durees[couples % len(valeurs_durees)]
+    return montants, taux_groupes, durees_groupes
+
+
+# Charges financières (intérêts et loyers de crédit-bail) et dotations mensuelles moyennes
+# (N,) sur les `mois` premiers mois, pour les indicateurs d'un mois type du moteur
+def deductions_mensuelles(echeancier, mois=12):
+    return {
+        'charges_financieres': (echeancier['interets'][:, :mois] + echeancier['loyers'][:, :mois]).mean(axis=1),
+        'dotations': echeancier['dotations'][:, :mois].mean(axis=1),
+        'apport': echeancier['apport'],
+    }
+
+
+# Échéancier annuel d'un plan (une ligne par année) à partir d'un échéancier mensuel
+# (première structure du lot)
+def tableau_annuel(echeancier):
+    nb_annees = -(-echeancier['interets'].shape[1] // 12)
+    lignes = {}
+    for cle, libelle in (('interets', "Intérêts"), ('principal', "Capital remboursé"),
+                         ('loyers', "Loyers de crédit-bail"), ('dotations', "Dotations aux amortissements")):
+        mensuel = echeancier[cle][0]
+        lignes[libelle] = np.add.reduceat(mensuel, np.arange(0, len(mensuel), 12)) if len(mensuel) else []
+    lignes["Capital restant dû (fin d'année)"] = echeancier['capital_restant'][0][11::12].tolist() + (
+        [echeancier['capital_restant'][0][-1]] if echeancier['interets'].shape[1] % 12 else [])
+    return pd.DataFrame({"Année": np.arange(1, nb_annees + 1), **lignes})
+
+
+# Structures de financement d'un balayage : les postes en crédit-bail gardent leurs conditions
+# (colonnes alignées de PlanFinancement.aligner), tous les autres passent en emprunt bancaire
+# au taux `taux_emprunt`, pour chaque part financée de `grille_parts` (0 à 1) et chaque durée
+# de `grille_durees` (mois). Retourne les colonnes (N, I) et les grilles (N,) 'part' et 'duree'.
+def structures_emprunt(colonnes, taux_emprunt, grille_parts, grille_durees):
+    part, duree = (g.reshape(-1) for g in np.meshgrid(np.asarray(grille_parts, dtype=float),
+                                                      np.asarray(grille_durees, dtype=float), indexing='ij'))
+    loue = colonnes['sources'] == CREDIT_BAIL
+    return {
+        'sources': np.broadcast_to(np.where(loue, CREDIT_BAIL, EMPRUNT), (len(part), len(loue))),
+        'parts': np.where(loue, colonnes['parts'], part[:, np.newaxis]),
+        'taux': np.where(loue, colonnes['taux'], float(taux_emprunt)),
+        'durees': np.where(loue, colonnes['durees'], duree[:, np.newaxis]),
+        'durees_amortissement': colonnes['durees_amortissement'],
+        'part': part,
+        'duree': duree,
+    }
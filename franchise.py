@@ -0,0 +1,167 @@
+# Portefeuille de sites (franchise) : chaque site a ses propres commandes par jour, charges
+# mensuelles et investissements ; le catalogue (prix et coûts unitaires) et les charges
+# centrales (siège, marketing, centrale d'achat...) sont communs à tous les sites.
+#
+# L'évaluation déterministe est vectorisée : les S sites forment un lot de S scénarios du
+# moteur. Les simulations Monte Carlo sont réparties par blocs de sites sur plusieurs
+# processus ; les sites étant supposés indépendants, la distribution consolidée s'obtient
+# en sommant mois par mois les bénéfices simulés des sites, sans renvoyer les tirages.
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from moteur import calculer_indicateurs_lot, en_colonne, en_matrice
+from monte_carlo import resumer_simulation, simuler_mois
+
+
+# Entrées par site alignées sur le nombre de sites S (les entrées de taille 1 sont diffusées) :
+# commandes (S, P), charges (S, C), investissements (S, I), jours (S,)
+def _aligner_sites(commandes_sites, charges_sites, investissements_sites, jours_activite):
+    commandes = en_matrice(commandes_sites)
+    charges = en_matrice(charges_sites)
+    investissements = en_matrice(investissements_sites)
+    jours = en_colonne(jours_activite)
+    s = max(len(commandes), len(charges), len(investissements), len(jours))
+    return (*(np.broadcast_to(t, (s, t.shape[1])) for t in (commandes, charges, investissements)),
+            np.broadcast_to(jours, (s,)))
+
+
+# Quote-part (S,) des charges centrales supportée par chaque site, au prorata du chiffre
+# d'affaires (parts égales si aucun site n'a de chiffre d'affaires)
+def repartir_charges_centrales(revenus_sites, montant):
+    revenus = np.asarray(revenus_sites, dtype=float)
+    total = revenus.sum()
+    parts = revenus / total if total > 0 else np.full(len(revenus), 1.0 / max(len(revenus), 1))
+    return parts * float(np.sum(montant))
+
+
+# Charges (S, C+1) et investissements (S, I+1) des sites alignés, complétés de leur quote-part
+# des charges et de l'investissement centraux ; retourne aussi les indicateurs des sites
+# autonomes (hors siège) et la quote-part des charges centrales (S,)
+def _sites_avec_siege(prix_vente, cout_unitaire, commandes, charges, investissements, jours, taux_impot,
+                      nb_associes, charges_centrales, investissement_central):
+    autonomes = calculer_indicateurs_lot(prix_vente, cout_unitaire, commandes, charges, investissements,
+                                         jours, taux_impot, nb_associes)
+    quote_part = repartir_charges_centrales(autonomes['revenu_brut'], charges_centrales)
+    quote_part_investissement = repartir_charges_centrales(autonomes['revenu_brut'], investissement_central)
+    return (np.column_stack([charges, quote_part]),
+            np.column_stack([investissements, quote_part_investissement]),
+            autonomes, quote_part)
+
+
+# Indicateurs par site et consolidés d'un portefeuille.
+#   prix_vente, cout_unitaire : (P,) communs à tous les sites
+#   commandes_sites : (S, P)    charges_sites : (S, C)    investissements_sites : (S, I)
+#   jours_activite : scalaire ou (S,)
+#   charges_centrales / investissement_central : montants (ou vecteurs) du siège
+# Retourne :
+#   'sites' : indicateurs du moteur par site (S,), charges centrales réparties comprises
+#   'contribution' : bénéfice avant impôt de chaque site hors charges centrales (S,)
+#   'quote_part_centrale' : charges centrales réparties sur chaque site (S,)
+#   'consolide' : indicateurs du moteur (1,) de l'ensemble, l'impôt étant calculé sur le
+#   bénéfice consolidé (les pertes d'un site compensent les profits des autres)
+def evaluer_portefeuille(prix_vente, cout_unitaire, commandes_sites, charges_sites,
+                         investissements_sites, jours_activite=30, taux_impot=20.0, nb_associes=6,
+                         charges_centrales=0.0, investissement_central=0.0):
+    commandes, charges, investissements, jours = _aligner_sites(commandes_sites, charges_sites,
+                                                                investissements_sites, jours_activite)
+    charges_sites, investissements_sites, autonomes, quote_part = _sites_avec_siege(
+        prix_vente, cout_unitaire, commandes, charges, investissements, jours, taux_impot, nb_associes,
+        charges_centrales, investissement_central)
+    sites = calculer_indicateurs_lot(prix_vente, cout_unitaire, commandes, charges_sites, investissements_sites,
+                                     jours, taux_impot, nb_associes)
+
+    # Ensemble : volumes mensuels cumulés (un seul "jour" d'activité), charges et
+    # investissements des sites et du siège
+    consolide = calculer_indicateurs_lot(
+        prix_vente, cout_unitaire, (commandes * jours[:, np.newaxis]).sum(axis=0),
+        [charges.sum(), np.sum(charges_centrales)],
+        [investissements.sum(), np.sum(investissement_central)],
+        1, taux_impot, nb_associes)
+
+    return {
+        'sites': sites,
+        'contribution': autonomes['benefice_brut'],
+        'quote_part_centrale': quote_part,
+        'consolide': consolide,
+    }
+
+
+# Simulation d'un bloc de sites (point d'entrée des processus de travail) : résumé de chaque
+# site, et somme mois par mois des bénéfices avant impôt du bloc (nb_mois,). Les charges et
+# investissements des sites comprennent déjà leur quote-part centrale.
+def simuler_bloc_sites(prix_vente, cout_unitaire, commandes_sites, charges_sites, investissements_sites,
+                       jours_sites, taux_impot, nb_associes, graines, nb_mois, dispersion,
+                       variabilite_commune):
+    resumes = []
+    benefice_bloc = np.zeros(nb_mois)
+    for i, graine in enumerate(graines):
+        simulation = simuler_mois(prix_vente, cout_unitaire, commandes_sites[i], charges_sites[i],
+                                  investissements_sites[i], jours_sites[i], taux_impot, nb_associes,
+                                  nb_mois=nb_mois, dispersion=dispersion,
+                                  variabilite_commune=variabilite_commune, graine=graine)
+        resumes.append(resumer_simulation(simulation))
+        benefice_bloc += simulation['benefice_brut']
+    return resumes, benefice_bloc
+
+
+# Soumission à `executeur` des simulations Monte Carlo d'un portefeuille, par blocs de sites
+# (par défaut quatre blocs par processeur, pour équilibrer la charge). Chaque site supporte
+# la même quote-part des charges et de l'investissement centraux que dans
+# evaluer_portefeuille(). Les graines des sites dérivent de `graine` : le résultat ne dépend
+# pas du découpage. Retourne la liste des tâches (futures), à passer à
+# consolider_simulations() une fois terminées.
+def lancer_simulations(executeur, prix_vente, cout_unitaire, commandes_sites, charges_sites,
+                       investissements_sites, jours_activite=30, taux_impot=20.0, nb_associes=6,
+                       charges_centrales=0.0, investissement_central=0.0, nb_mois=10_000, dispersion=1.0,
+                       variabilite_commune=0.0, graine=None, nb_blocs=None):
+    commandes, charges, investissements, jours = _aligner_sites(commandes_sites, charges_sites,
+                                                                investissements_sites, jours_activite)
+    charges, investissements, _, _ = _sites_avec_siege(
+        prix_vente, cout_unitaire, commandes, charges, investissements, jours, taux_impot, nb_associes,
+        charges_centrales, investissement_central)
+    s = len(jours)
+    graines = np.random.SeedSequence(graine).spawn(s)
+
+    nb_blocs = min(s, nb_blocs or 4 * (os.cpu_count() or 1))
+    return [
+        executeur.submit(simuler_bloc_sites, prix_vente, cout_unitaire, commandes[bloc], charges[bloc],
+                         investissements[bloc], jours[bloc], taux_impot, nb_associes,
+                         [graines[i] for i in bloc], nb_mois, dispersion, variabilite_commune)
+        for bloc in np.array_split(np.arange(s), nb_blocs)
+    ]
+
+
+# Résumés par site et résumé consolidé (mêmes clés que monte_carlo.resumer_simulation) à
+# partir des résultats des blocs : bénéfice des sites (quotes-parts des charges centrales
+# déduites, leur somme étant les charges centrales), impôt sur le bénéfice consolidé, temps
+# de retour de l'investissement total (sites et siège)
+def consolider_simulations(resultats_blocs, investissement_total, taux_impot=20.0):
+    resumes_sites = [resume for resumes, _ in resultats_blocs for resume in resumes]
+    benefice_brut = sum(benefice for _, benefice in resultats_blocs)
+    profit_net = benefice_brut - np.where(benefice_brut > 0, benefice_brut * (taux_impot / 100), 0.0)
+    with np.errstate(divide='ignore'):
+        temps_retour = np.where(profit_net > 0, investissement_total / profit_net, np.inf)
+    consolide = resumer_simulation({'benefice_brut': benefice_brut, 'profit_net': profit_net,
+                                    'temps_retour': temps_retour})
+    return {'sites': resumes_sites, 'consolide': consolide}
+
+
+# Simulation Monte Carlo complète d'un portefeuille (appel bloquant, pour les scripts) :
+# les blocs de sites sont répartis sur `processus` processus (par défaut, un par processeur)
+def simuler_portefeuille(prix_vente, cout_unitaire, commandes_sites, charges_sites, investissements_sites,
+                         jours_activite=30, taux_impot=20.0, nb_associes=6, charges_centrales=0.0,
+                         investissement_central=0.0, nb_mois=10_000, dispersion=1.0,
+                         variabilite_commune=0.0, graine=None, processus=None):
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processus, mp_context=contexte) as executeur:
+        taches = lancer_simulations(executeur, prix_vente, cout_unitaire, commandes_sites, charges_sites,
+                                    investissements_sites, jours_activite, taux_impot, nb_associes,
+                                    charges_centrales, investissement_central, nb_mois, dispersion,
+                                    variabilite_commune, graine)
+        resultats = [tache.result() for tache in taches]
+    investissements = _aligner_sites(commandes_sites, charges_sites, investissements_sites, jours_activite)[2]
+    return consolider_simulations(resultats, investissements.sum() + float(np.sum(investissement_central)),
+                                  taux_impot)
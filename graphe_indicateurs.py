@@ -0,0 +1,214 @@
+# Indicateurs recalculés par différences, pour les grands catalogues et portefeuilles de sites.
+#
+# Les indicateurs forment un graphe de dépendances :
+#   entrées par produit (prix, coûts, commandes) -> revenus / coûts / marges par produit
+#     -> revenu_brut, cout_variable (sommes)
+#   charges mensuelles, investissements -> cout_fixe, total_investissement (sommes)
+#   totaux et paramètres (taux d'impôt, associés, financement) -> NOEUDS_TOTAUX du moteur
+# Le graphe conserve toutes ses valeurs pour un lot de N scénarios (N sites, ou N = 1). Une
+# modification ne recalcule que les cellules touchées (produits x sites), ajoute leur écart
+# aux sommes, puis réévalue les seuls noeuds de NOEUDS_TOTAUX en aval : changer le prix d'un
+# produit sur 500 coûte quelques opérations sur des colonnes (N,), sans repasser sur les N x P
+# revenus. Les sommes tenues par écarts sont recalculées entièrement toutes les
+# RESYNCHRONISATION modifications, pour ne pas accumuler d'erreurs d'arrondi.
+import numpy as np
+
+from moteur import INDICATEURS, INDICATEURS_PRODUITS, NOEUDS_TOTAUX, en_colonne, en_matrice, evaluer_noeuds
+from scenario import vecteurs_scenario
+
+# Entrées par produit (N, P), par poste (N, C) avec la somme qu'elles alimentent, et par scénario (N,)
+ENTREES_PRODUITS = ('prix_vente', 'cout_unitaire', 'commandes_jour')
+ENTREES_POSTES = {'charges_mensuelles': 'cout_fixe', 'charges_investissement': 'total_investissement'}
+ENTREES_SCENARIO = ('jours_activite', 'taux_impot', 'nb_associes', 'charges_financieres', 'dotations')
+
+# Nombre de modifications par écarts entre deux recalculs complets des sommes
+RESYNCHRONISATION = 1024
+
+
+class GrapheIndicateurs:
+    # Mêmes entrées que moteur.calculer_indicateurs_lot ; `produits` nomme les colonnes des
+    # entrées par produit (positions acceptées par modifier() à la place des indices)
+    def __init__(self, prix_vente, cout_unitaire, commandes_jour, charges_mensuelles, charges_investissement,
+                 jours_activite=30, taux_impot=20.0, nb_associes=6, charges_financieres=0.0, dotations=0.0,
+                 apport=None, produits=None):
+        entrees = {
+            'prix_vente': en_matrice(prix_vente),
+            'cout_unitaire': en_matrice(cout_unitaire),
+            'commandes_jour': en_matrice(commandes_jour),
+            'charges_mensuelles': en_matrice(charges_mensuelles),
+            'charges_investissement': en_matrice(charges_investissement),
+            'jours_activite': en_colonne(jours_activite),
+            'taux_impot': en_colonne(taux_impot),
+            'nb_associes': en_colonne(nb_associes),
+            'charges_financieres': en_colonne(charges_financieres),
+            'dotations': en_colonne(dotations),
+        }
+        if apport is not None:
+            entrees['apport'] = en_colonne(apport)
+        n = max(len(valeur) for valeur in entrees.values())
+        # Copies modifiables, diffusées sur les N scénarios
+        self.valeurs = {cle: np.array(np.broadcast_to(valeur, (n, *valeur.shape[1:])))
+                        for cle, valeur in entrees.items()}
+        self.valeurs.setdefault('apport', None)
+        nb_produits = self.valeurs['prix_vente'].shape[1]
+        self.produits = list(range(nb_produits) if produits is None else produits)
+        if len(self.produits) != nb_produits:
+            raise ValueError("Le nombre de noms de produits ne correspond pas aux entrées")
+        self._positions = {nom: i for i, nom in enumerate(self.produits)}
+        self.recalculer()
+
+    # Graphe d'un scénario au format de scenario.py (dictionnaires {nom: valeur}) ; `financement` :
+    # charges_financieres, dotations et apport, comme pour calculer_indicateurs_lot
+    @classmethod
+    def depuis_scenario(cls, scenario, **financement):
+        return cls(*vecteurs_scenario(scenario), **financement, produits=scenario['produits'])
+
+    def __len__(self):
+        return len(self.valeurs['revenu_brut'])
+
+    # Recalcul complet de toutes les valeurs dérivées
+    def recalculer(self):
+        valeurs = self.valeurs
+        volumes = valeurs['commandes_jour'] * valeurs['jours_activite'][:, np.newaxis]
+        valeurs['revenus_produits'] = valeurs['prix_vente'] * volumes
+        valeurs['couts_produits'] = valeurs['cout_unitaire'] * volumes
+        valeurs['marges_produits'] = valeurs['revenus_produits'] - valeurs['couts_produits']
+        valeurs['revenu_brut'] = valeurs['revenus_produits'].sum(axis=1)
+        valeurs['cout_variable'] = valeurs['couts_produits'].sum(axis=1)
+        for entree, total in ENTREES_POSTES.items():
+            valeurs[total] = valeurs[entree].sum(axis=1)
+        evaluer_noeuds(valeurs)
+        self._ecarts = 0
+
+    # Indices de colonnes pour des noms de produits (ou des positions), un seul ou plusieurs
+    def positions(self, produits):
+        produits = produits if isinstance(produits, (list, tuple, np.ndarray)) else [produits]
+        return np.array([self._positions.get(p, p) for p in produits], dtype=np.intp)
+
+    # Modification de l'entrée `entree` :
+    #   entrées par produit : colonnes `positions` (noms ou indices de produits, tous par défaut)
+    #   charges_mensuelles, charges_investissement : colonnes `positions` (indices des postes)
+    #   entrées par scénario et apport (None : total des investissements) : `positions` ignoré
+    # `sites` restreint la modification à certaines lignes du lot (indices distincts).
+    # `valeurs` est diffusé sur la sélection (sites x positions). Retourne l'ensemble des
+    # valeurs recalculées.
+    def modifier(self, entree, valeurs, positions=None, sites=None):
+        lignes = np.arange(len(self)) if sites is None else np.atleast_1d(np.asarray(sites, dtype=np.intp))
+        if entree in ENTREES_PRODUITS:
+            colonnes = np.arange(len(self.produits)) if positions is None else self.positions(positions)
+            modifiees = self._modifier_produits(entree, valeurs, lignes, colonnes)
+        elif entree in ENTREES_POSTES:
+            tableau = self.valeurs[entree]
+            colonnes = (np.arange(tableau.shape[1]) if positions is None
+                        else np.atleast_1d(np.asarray(positions, dtype=np.intp)))
+            selection = np.ix_(lignes, colonnes)
+            ancien = tableau[selection].copy()
+            tableau[selection] = valeurs
+            self.valeurs[ENTREES_POSTES[entree]][lignes] += (tableau[selection] - ancien).sum(axis=1)
+            self._ecarts += 1
+            modifiees = {entree, ENTREES_POSTES[entree]}
+        elif entree == 'jours_activite':
+            self.valeurs[entree][lignes] = valeurs
+            # Tous les volumes des sites changent : leurs lignes sont recalculées entièrement
+            modifiees = self._modifier_produits(None, None, lignes, np.arange(len(self.produits)))
+        elif entree in ENTREES_SCENARIO:
+            self.valeurs[entree][lignes] = valeurs
+            modifiees = {entree}
+        elif entree == 'apport':
+            if valeurs is None:
+                self.valeurs['apport'] = None
+            else:
+                if self.valeurs['apport'] is None:
+                    self.valeurs['apport'] = self.valeurs['total_investissement'].copy()
+                self.valeurs['apport'][lignes] = valeurs
+            modifiees = {entree}
+        else:
+            raise KeyError(f"Entrée inconnue : {entree}")
+
+        if self._ecarts >= RESYNCHRONISATION:
+            self.recalculer()
+            return set(self.valeurs)
+        return self._propager(modifiees)
+
+    # Cellules (lignes x colonnes) des indicateurs par produit, et écarts reportés sur les sommes
+    def _modifier_produits(self, entree, valeurs, lignes, colonnes):
+        v = self.valeurs
+        selection = np.ix_(lignes, colonnes)
+        if entree is not None:
+            v[entree][selection] = valeurs
+        volumes = v['commandes_jour'][selection] * v['jours_activite'][lignes, np.newaxis]
+        modifiees = {entree, 'marges_produits'}
+        for produits, total, prix in (('revenus_produits', 'revenu_brut', 'prix_vente'),
+                                      ('couts_produits', 'cout_variable', 'cout_unitaire')):
+            # Un prix de vente ne change pas les coûts, ni un coût unitaire les revenus
+            if entree not in (None, 'commandes_jour', prix):
+                continue
+            nouveaux = v[prix][selection] * volumes
+            v[total][lignes] += (nouveaux - v[produits][selection]).sum(axis=1)
+            v[produits][selection] = nouveaux
+            modifiees.update((produits, total))
+        v['marges_produits'][selection] = v['revenus_produits'][selection] - v['couts_produits'][selection]
+        self._ecarts += 1
+        return modifiees
+
+    # Réévaluation des seuls noeuds dont une entrée a changé, dans l'ordre du moteur
+    def _propager(self, modifiees):
+        noeuds = []
+        for noeud in NOEUDS_TOTAUX:
+            if modifiees.intersection(noeud[1]):
+                noeuds.append(noeud)
+                modifiees.add(noeud[0])
+        evaluer_noeuds(self.valeurs, noeuds)
+        modifiees.discard(None)
+        return modifiees
+
+    # Mise à jour vers de nouvelles entrées complètes (mêmes arguments que le constructeur) :
+    # seules les colonnes et paramètres qui diffèrent sont modifiés. Un changement de forme
+    # (produit ou poste ajouté, retiré) reconstruit le graphe. Retourne les valeurs recalculées.
+    def synchroniser(self, prix_vente, cout_unitaire, commandes_jour, charges_mensuelles, charges_investissement,
+                     jours_activite=30, taux_impot=20.0, nb_associes=6, charges_financieres=0.0, dotations=0.0,
+                     apport=None, produits=None):
+        nouvelles = dict(zip(
+            (*ENTREES_PRODUITS, *ENTREES_POSTES, *ENTREES_SCENARIO),
+            (prix_vente, cout_unitaire, commandes_jour, charges_mensuelles, charges_investissement,
+             jours_activite, taux_impot, nb_associes, charges_financieres, dotations)))
+        produits = self.produits if produits is None else list(produits)
+        formes = [(cle, en_matrice(valeur) if cle in ENTREES_PRODUITS or cle in ENTREES_POSTES
+                   else en_colonne(valeur)) for cle, valeur in nouvelles.items()]
+        if produits != self.produits or any(
+                valeur.ndim == 2 and valeur.shape[1] != self.valeurs[cle].shape[1] or len(valeur) not in (1, len(self))
+                for cle, valeur in formes):
+            self.__init__(**nouvelles, apport=apport, produits=produits)
+            return set(self.valeurs)
+
+        modifiees = set()
+        # Scénarios d'abord : un changement de jours recalcule déjà tous les produits
+        for cle, valeur in sorted(formes, key=lambda forme: forme[0] != 'jours_activite'):
+            ancienne = self.valeurs[cle]
+            if valeur.ndim == 2:
+                differentes = np.flatnonzero((np.broadcast_to(valeur, ancienne.shape) != ancienne).any(axis=0))
+                if len(differentes):
+                    modifiees |= self.modifier(cle, valeur[:, differentes], differentes)
+            elif (np.broadcast_to(valeur, ancienne.shape) != ancienne).any():
+                modifiees |= self.modifier(cle, valeur)
+        ancien_apport = self.valeurs['apport']
+        if (apport is None) != (ancien_apport is None) or apport is not None and (
+                np.broadcast_to(en_colonne(apport), ancien_apport.shape) != ancien_apport).any():
+            modifiees |= self.modifier('apport', apport)
+        return modifiees
+
+    # Mise à jour vers un scénario au format de scenario.py (voir depuis_scenario)
+    def synchroniser_scenario(self, scenario, **financement):
+        return self.synchroniser(*vecteurs_scenario(scenario), **financement, produits=scenario['produits'])
+
+    # Indicateurs au format de calculer_indicateurs_lot (tableaux du graphe, à ne pas modifier)
+    def indicateurs(self):
+        return {cle: self.valeurs[cle] for cle in (*INDICATEURS_PRODUITS, *INDICATEURS)}
+
+    # Indicateurs d'un scénario du lot au format de calculer_indicateurs_scenario
+    def resultat(self, site=0):
+        resultat = {cle: dict(zip(self.produits, self.valeurs[cle][site].tolist())) for cle in INDICATEURS_PRODUITS}
+        for cle in INDICATEURS:
+            resultat[cle] = float(self.valeurs[cle][site])
+        return resultat
+
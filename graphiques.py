@@ -0,0 +1,148 @@
+# Graphiques de la page, dessinés avec l'API objet de matplotlib (Figure) et non pyplot :
+# aucune figure n'est enregistrée dans l'état global de pyplot, rien n'est à fermer, et
+# plusieurs sessions peuvent dessiner en parallèle sans se marcher dessus.
+import io
+import threading
+
+import matplotlib.colors as mcolors
+import numpy as np
+from matplotlib.figure import Figure
+
+from cache import CacheLRU
+
+# Formats d'export supportés et leur type MIME
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+# Sérialisation d'une figure en PNG ou SVG
+def figure_en_octets(fig, format='png'):
+    tampon = io.BytesIO()
+    fig.savefig(tampon, format=format, bbox_inches='tight')
+    return tampon.getvalue()
+
+
+# Diagramme en barres revenu / coût / bénéfice / impôt / profit net, avec les charges du plan
+# de financement (financement.deductions_mensuelles) entre le bénéfice et l'impôt
+def dessiner_repartition_financiere(indicateurs, financement=None):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    labels = ['Revenu brut', 'Coût total', 'Bénéfice brut', 'Impôt', 'Profit net']
+    values = [
+        indicateurs['revenu_brut'],
+        indicateurs['cout_total'],
+        indicateurs['benefice_brut'],
+        indicateurs['impot'],
+        indicateurs['profit_net']
+    ]
+    if financement:
+        labels[3:3] = ['Charges financières', 'Dotations']
+        values[3:3] = [float(np.sum(financement.get('charges_financieres', 0.0))),
+                       float(np.sum(financement.get('dotations', 0.0)))]
+
+    bars = ax.bar(labels, values)
+
+    # Coloriser les barres selon les valeurs positives/négatives
+    for i, bar in enumerate(bars):
+        if values[i] < 0:
+            bar.set_color('#dc3545')  # Rouge pour valeurs négatives
+        else:
+            bar.set_color('#28a745')  # Vert pour valeurs positives
+
+    ax.set_ylabel('Montant (Dh)')
+    ax.set_title('Répartition financière mensuelle')
+
+    # Ajouter les valeurs au-dessus des barres
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 50,
+                f'{height:.2f} Dh', ha='center', va='bottom')
+
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    return fig
+
+
+# Camembert des valeurs strictement positives
+def dessiner_camembert(labels, valeurs, titre):
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    ax.pie(valeurs, labels=labels, autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')
+    ax.set_title(titre)
+    return fig
+
+
+# Carte de chaleur du profit net (grille de balayage.grille_profit) avec le seuil de rentabilité
+def dessiner_carte_rentabilite(grille, clients_actuels):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    profit_grille = grille['profit_net']
+    amplitude = max(abs(profit_grille.min()), abs(profit_grille.max()), 1.0)
+    carte = ax.pcolormesh(grille['clients'], grille['multiplicateurs'], profit_grille, shading='auto',
+                          cmap='RdYlGn', norm=mcolors.TwoSlopeNorm(vcenter=0.0, vmin=-amplitude, vmax=amplitude))
+    fig.colorbar(carte, ax=ax, label='Profit net mensuel (Dh)')
+
+    # Contour du seuil de rentabilité (profit net nul)
+    if profit_grille.min() < 0 < profit_grille.max():
+        ax.contour(grille['clients'], grille['multiplicateurs'], profit_grille, levels=[0.0],
+                   colors='black', linewidths=2)
+
+    # Position du scénario actuel
+    ax.plot(clients_actuels, 1.0, marker='o', color='black')
+    ax.set_xlabel('Clients par jour (répartition actuelle des commandes)')
+    ax.set_ylabel('Multiplicateur des prix de vente')
+    ax.set_title('Profit net mensuel et seuil de rentabilité')
+    return fig
+
+
+# Ventes et clients perdus par heure d'ouverture (barres empilées)
+def dessiner_charge_horaire(heures, ventes, abandons):
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    libelles = [f"{heure}h" for heure in heures]
+    ax.bar(libelles, ventes, color='#28a745', label='Commandes servies')
+    ax.bar(libelles, abandons, bottom=ventes, color='#dc3545', label='Clients perdus')
+    ax.set_ylabel('Clients par jour')
+    ax.set_title("Demande et capacité de service par heure")
+    ax.legend()
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    return fig
+
+
+# Rendu des graphiques avec cache des images par (nom, format, empreinte de scénario).
+# Un verrou par clé évite que plusieurs sessions dessinent simultanément la même image.
+class RenduGraphiques:
+    def __init__(self, taille_max=256):
+        self.cache = CacheLRU(taille_max)
+        self._verrous = {}
+        self._verrou = threading.Lock()
+
+    # Image (octets) du graphique ; `dessin()` n'est appelé qu'en cas d'absence du cache
+    def rendre(self, nom, cle, dessin, format='png'):
+        if format not in FORMATS:
+            raise ValueError(f"Format de graphique non supporté : {format}")
+        cle_complete = f"{nom}:{format}:{cle}"
+        image = self.cache.lire(cle_complete)
+        if image is not None:
+            return image
+
+        # Verrou de la clé et nombre de sessions qui le tiennent ou l'attendent : il n'est retiré
+        # qu'au départ de la dernière, sans quoi une session arrivée entre-temps en créerait un
+        # second et rendrait la même image en parallèle
+        with self._verrou:
+            entree = self._verrous.setdefault(cle_complete, [threading.Lock(), 0])
+            entree[1] += 1
+        try:
+            with entree[0]:
+                # Une autre session a pu terminer le rendu pendant l'attente du verrou
+                image = self.cache.lire(cle_complete)
+                if image is None:
+                    image = figure_en_octets(dessin(), format)
+                    self.cache.ecrire(cle_complete, image)
+        finally:
+            with self._verrou:
+                entree[1] -= 1
+                if not entree[1]:
+                    del self._verrous[cle_complete]
+        return image
@@ -0,0 +1,118 @@
+# Graphiques de la page au format Vega-Lite (dictionnaires JSON affichés par
+# st.vega_lite_chart et dessinés par le navigateur) : aucun import de matplotlib, rien à
+# rendre côté serveur. Mêmes fonctions et mêmes arguments que graphiques.py, qui reste le
+# rendu haute fidélité (images PNG/SVG) optionnel.
+import numpy as np
+
+# Taille maximale de la grille envoyée au navigateur pour la carte de rentabilité
+CELLULES_MAX_CARTE = 60
+
+
+# Diagramme en barres revenu / coût / bénéfice / impôt / profit net, avec les charges du plan
+# de financement entre le bénéfice et l'impôt
+def dessiner_repartition_financiere(indicateurs, financement=None):
+    labels = ['Revenu brut', 'Coût total', 'Bénéfice brut', 'Impôt', 'Profit net']
+    montants = [indicateurs[c] for c in ('revenu_brut', 'cout_total', 'benefice_brut', 'impot', 'profit_net')]
+    if financement:
+        labels[3:3] = ['Charges financières', 'Dotations']
+        montants[3:3] = [np.sum(financement.get('charges_financieres', 0.0)),
+                         np.sum(financement.get('dotations', 0.0))]
+    return {
+        'title': 'Répartition financière mensuelle',
+        'data': {'values': [{'poste': l, 'montant': round(float(m), 2)} for l, m in zip(labels, montants)]},
+        'encoding': {
+            'x': {'field': 'poste', 'type': 'nominal', 'sort': labels, 'title': None, 'axis': {'labelAngle': 0}},
+            'y': {'field': 'montant', 'type': 'quantitative', 'title': 'Montant (Dh)'},
+        },
+        'layer': [
+            {'mark': 'bar', 'encoding': {
+                'color': {'condition': {'test': 'datum.montant < 0', 'value': '#dc3545'}, 'value': '#28a745'},
+                'tooltip': [{'field': 'poste'}, {'field': 'montant', 'format': '.2f'}],
+            }},
+            {'mark': {'type': 'text', 'dy': -8}, 'encoding': {'text': {'field': 'montant', 'format': '.2f'}}},
+        ],
+    }
+
+
+# Camembert des valeurs strictement positives
+def dessiner_camembert(labels, valeurs, titre):
+    return {
+        'title': titre,
+        'data': {'values': [{'libelle': l, 'valeur': float(v)} for l, v in zip(labels, valeurs)]},
+        'mark': {'type': 'arc', 'tooltip': True},
+        'encoding': {
+            'theta': {'field': 'valeur', 'type': 'quantitative', 'stack': 'normalize'},
+            'color': {'field': 'libelle', 'type': 'nominal', 'sort': list(labels), 'title': None},
+            'order': {'field': 'valeur', 'type': 'quantitative', 'sort': 'descending'},
+            'tooltip': [{'field': 'libelle', 'title': 'Poste'},
+                        {'field': 'valeur', 'title': 'Montant (Dh)', 'format': '.2f'}],
+        },
+    }
+
+
+# Carte de chaleur du profit net (grille de balayage.grille_profit) et position du scénario
+# actuel ; la grille est sous-échantillonnée à CELLULES_MAX_CARTE x CELLULES_MAX_CARTE
+def dessiner_carte_rentabilite(grille, clients_actuels):
+    clients = np.asarray(grille['clients'], dtype=float)
+    multiplicateurs = np.asarray(grille['multiplicateurs'], dtype=float)
+    pas_x = max(1, -(-len(clients) // CELLULES_MAX_CARTE))
+    pas_y = max(1, -(-len(multiplicateurs) // CELLULES_MAX_CARTE))
+    x, y = clients[::pas_x], multiplicateurs[::pas_y]
+    profit = np.asarray(grille['profit_net'])[::pas_y, ::pas_x]
+    demi_x = (x[1] - x[0]) / 2 if len(x) > 1 else 0.5
+    demi_y = (y[1] - y[0]) / 2 if len(y) > 1 else 0.5
+    amplitude = float(max(abs(profit.min()), abs(profit.max()), 1.0))
+
+    cellules = [{'x': xi - demi_x, 'x2': xi + demi_x, 'y': yj - demi_y, 'y2': yj + demi_y,
+                 'clients': xi, 'multiplicateur': round(yj, 3), 'profit': round(float(profit[j, i]), 2)}
+                for j, yj in enumerate(y.tolist()) for i, xi in enumerate(x.tolist())]
+    return {
+        'title': 'Profit net mensuel et seuil de rentabilité',
+        'layer': [
+            {
+                'data': {'values': cellules},
+                'mark': 'rect',
+                'encoding': {
+                    'x': {'field': 'x', 'type': 'quantitative',
+                          'title': 'Clients par jour (répartition actuelle des commandes)'},
+                    'x2': {'field': 'x2'},
+                    'y': {'field': 'y', 'type': 'quantitative', 'title': 'Multiplicateur des prix de vente'},
+                    'y2': {'field': 'y2'},
+                    'color': {'field': 'profit', 'type': 'quantitative', 'title': 'Profit net (Dh)',
+                              'scale': {'scheme': 'redyellowgreen', 'domainMid': 0,
+                                        'domain': [-amplitude, amplitude]}},
+                    'tooltip': [{'field': 'clients', 'title': 'Clients/jour'},
+                                {'field': 'multiplicateur', 'title': 'Multiplicateur des prix'},
+                                {'field': 'profit', 'title': 'Profit net (Dh)', 'format': '.2f'}],
+                },
+            },
+            {
+                'data': {'values': [{'x': float(clients_actuels), 'y': 1.0}]},
+                'mark': {'type': 'point', 'filled': True, 'color': 'black', 'size': 80},
+                'encoding': {'x': {'field': 'x', 'type': 'quantitative'},
+                             'y': {'field': 'y', 'type': 'quantitative'}},
+            },
+        ],
+    }
+
+
+# Ventes et clients perdus par heure d'ouverture (barres empilées)
+def dessiner_charge_horaire(heures, ventes, abandons):
+    libelles = [f"{heure}h" for heure in heures]
+    valeurs = ([{'heure': l, 'serie': 'Commandes servies', 'clients': round(float(v), 2)}
+                for l, v in zip(libelles, ventes)]
+               + [{'heure': l, 'serie': 'Clients perdus', 'clients': round(float(v), 2)}
+                  for l, v in zip(libelles, abandons)])
+    return {
+        'title': "Demande et capacité de service par heure",
+        'data': {'values': valeurs},
+        'mark': 'bar',
+        'encoding': {
+            'x': {'field': 'heure', 'type': 'nominal', 'sort': libelles, 'title': None, 'axis': {'labelAngle': 0}},
+            'y': {'field': 'clients', 'type': 'quantitative', 'title': 'Clients par jour'},
+            'color': {'field': 'serie', 'type': 'nominal', 'title': None,
+                      'scale': {'domain': ['Commandes servies', 'Clients perdus'], 'range': ['#28a745', '#dc3545']}},
+            'order': {'field': 'serie', 'sort': 'descending'},
+            'tooltip': [{'field': 'heure'}, {'field': 'serie'}, {'field': 'clients', 'format': '.1f'}],
+        },
+    }
@@ -0,0 +1,23 @@
+# Import différé des modules lourds (pandas...) : le module n'est chargé qu'au premier accès
+# à l'un de ses attributs, c'est-à-dire par la première section qui s'en sert, et non au
+# démarrage de chaque processus du serveur. importlib.import_module s'appuie sur les verrous
+# d'import de Python : plusieurs sessions peuvent déclencher le chargement en même temps.
+import importlib
+import sys
+
+
+class ModuleDiffere:
+    def __init__(self, nom):
+        self._nom = nom
+
+    def __getattr__(self, attribut):
+        return getattr(importlib.import_module(self._nom), attribut)
+
+    def __repr__(self):
+        etat = "chargé" if self._nom in sys.modules else "non chargé"
+        return f"<module différé {self._nom} ({etat})>"
+
+
+# Modules lourds déjà chargés dans le processus, parmi `noms`
+def modules_charges(noms=('pandas', 'pyarrow', 'matplotlib', 'openpyxl')):
+    return [nom for nom in noms if nom in sys.modules]
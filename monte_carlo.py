@@ -0,0 +1,109 @@
+# Simulation Monte Carlo de l'incertitude sur la demande journalière.
+#
+# Modèle : pour chaque jour d'activité, la demande du produit p suit une loi de
+# moyenne commandes_jour[p] x A_j, où A_j est un choc commun à tous les produits
+# (loi Gamma de moyenne 1, corrélant les produits entre eux), et de rapport
+# variance / moyenne dispersion[p] (1 = Poisson, > 1 = binomiale négative).
+# La somme sur le mois de ces lois reste dans la même famille, ce qui permet de
+# tirer directement le total mensuel de chaque produit : un mois simulé coûte un
+# tirage par produit au lieu d'un tirage par produit et par jour.
+import numpy as np
+
+from moteur import calculer_indicateurs_lot
+
+# Taille des lots de tirages (bornent la mémoire : ~taille_lot x nb_produits flottants)
+TAILLE_LOT = 200_000
+
+# Centiles de profit_net rapportés
+CENTILES = (5, 50, 95)
+
+
+# Tirage des commandes mensuelles (n, P) pour un lot de n mois simulés
+def tirer_commandes_mensuelles(rng, n, commandes_jour, jours_activite,
+                               dispersion=1.0, variabilite_commune=0.0):
+    moyennes = np.asarray(commandes_jour, dtype=float)
+    dispersion = np.broadcast_to(np.asarray(dispersion, dtype=float), moyennes.shape)
+
+    # Somme sur le mois des chocs journaliers communs (Gamma de moyenne 1 par jour)
+    if variabilite_commune > 0:
+        forme = 1.0 / variabilite_commune ** 2
+        cumul_chocs = rng.gamma(jours_activite * forme, 1.0 / forme, size=n)
+    else:
+        cumul_chocs = np.full(n, float(jours_activite))
+
+    esperances = cumul_chocs[:, np.newaxis] * moyennes
+    commandes = np.zeros((n, len(moyennes)))
+
+    # Produits sans surdispersion : loi de Poisson
+    poisson = (dispersion <= 1.0) & (moyennes > 0)
+    if poisson.any():
+        commandes[:, poisson] = rng.poisson(esperances[:, poisson])
+
+    # Produits surdispersés : binomiale négative de même espérance
+    surdispersion = (dispersion > 1.0) & (moyennes > 0)
+    if surdispersion.any():
+        d = dispersion[surdispersion]
+        commandes[:, surdispersion] = rng.negative_binomial(
+            esperances[:, surdispersion] / (d - 1.0), 1.0 / d)
+
+    return commandes
+
+
+# Simulation de nb_mois mois d'activité ; retourne benefice_brut, profit_net et temps_retour
+# par mois simulé. `financement` : charges_financieres, dotations et apport de
+# calculer_indicateurs_lot (les mêmes chaque mois simulé)
+def simuler_mois(prix_vente, cout_unitaire, commandes_jour, charges_mensuelles,
+                 charges_investissement, jours_activite=30, taux_impot=20.0, nb_associes=6,
+                 nb_mois=100_000, dispersion=1.0, variabilite_commune=0.0,
+                 graine=None, taille_lot=TAILLE_LOT, **financement):
+    rng = np.random.default_rng(graine)
+    benefice_brut = np.empty(nb_mois)
+    profit_net = np.empty(nb_mois)
+    temps_retour = np.empty(nb_mois)
+
+    for debut in range(0, nb_mois, taille_lot):
+        fin = min(debut + taille_lot, nb_mois)
+        commandes = tirer_commandes_mensuelles(rng, fin - debut, commandes_jour, jours_activite,
+                                               dispersion, variabilite_commune)
+        # Les commandes tirées sont déjà des totaux mensuels : un seul "jour" d'activité
+        lot = calculer_indicateurs_lot(prix_vente, cout_unitaire, commandes, charges_mensuelles,
+                                       charges_investissement, 1, taux_impot, nb_associes, **financement)
+        benefice_brut[debut:fin] = lot['benefice_brut']
+        profit_net[debut:fin] = lot['profit_net']
+        temps_retour[debut:fin] = lot['temps_retour']
+
+    return {'benefice_brut': benefice_brut, 'profit_net': profit_net, 'temps_retour': temps_retour}
+
+
+# Résumé statistique d'une simulation : centiles, probabilité de perte, distribution du retour
+def resumer_simulation(simulation, nb_classes=30):
+    profit_net = simulation['profit_net']
+    temps_retour = simulation['temps_retour']
+    fini = np.isfinite(temps_retour)
+
+    resume = {
+        'nb_mois': len(profit_net),
+        'profit_moyen': float(profit_net.mean()),
+        'proba_perte': float((profit_net < 0).mean()),
+        'proba_sans_retour': float(1.0 - fini.mean()),
+    }
+    for c, valeur in zip(CENTILES, np.percentile(profit_net, CENTILES)):
+        resume[f'profit_p{c}'] = float(valeur)
+
+    if fini.any():
+        retours = temps_retour[fini]
+        for c, valeur in zip(CENTILES, np.percentile(retours, CENTILES)):
+            resume[f'retour_p{c}'] = float(valeur)
+        effectifs, bornes = np.histogram(retours, bins=nb_classes)
+        resume['histogramme_retour'] = {'effectifs': effectifs.tolist(), 'bornes': bornes.tolist()}
+    else:
+        for c in CENTILES:
+            resume[f'retour_p{c}'] = float('inf')
+        resume['histogramme_retour'] = {'effectifs': [], 'bornes': []}
+
+    return resume
+
+
+# Point d'entrée des travailleurs en arrière-plan : simule puis ne renvoie que le résumé
+def simuler_et_resumer(*args, **kwargs):
+    return resumer_simulation(simuler_mois(*args, **kwargs))
@@ -0,0 +1,174 @@
+# Moteur de calcul des indicateurs financiers, indépendant de Streamlit.
+# Toutes les fonctions travaillent sur des tableaux NumPy : un lot de N scénarios
+# est évalué en une seule passe vectorisée, sans boucle Python par produit.
+import numpy as np
+
+# Indicateurs scalaires retournés pour chaque scénario (un tableau de taille N chacun)
+INDICATEURS = (
+    'revenu_brut',
+    'cout_variable',
+    'cout_fixe',
+    'cout_total',
+    'benefice_brut',
+    'impot',
+    'profit_net',
+    'profit_par_associe',
+    'total_investissement',
+    'seuil_rentabilite',
+    'marge_cout_variable',
+    'roi_mensuel',
+    'roi_annuel',
+    'temps_retour',
+    'marge_nette',
+)
+
+# Indicateurs pour lesquels une valeur plus basse est meilleure (coûts, seuil, délai)
+INDICATEURS_A_MINIMISER = frozenset({
+    'cout_variable', 'cout_fixe', 'cout_total', 'impot', 'total_investissement', 'seuil_rentabilite',
+    'temps_retour',
+})
+
+# Indicateurs par produit (un tableau N x P chacun)
+INDICATEURS_PRODUITS = ('revenus_produits', 'couts_produits', 'marges_produits')
+
+
+# Indicateurs dérivés des totaux, dans l'ordre de calcul : (nom, entrées, formule) sur des
+# colonnes (N,). Le moteur les évalue tous ; graphe_indicateurs.py ne réévalue que ceux dont
+# une entrée a changé.
+NOEUDS_TOTAUX = (
+    ('cout_total', ('cout_variable', 'cout_fixe'), lambda variable, fixe: variable + fixe),
+    ('benefice_brut', ('revenu_brut', 'cout_total'), lambda revenu, cout: revenu - cout),
+    # Intérêts et amortissements : charges déductibles (les dotations ne sont pas décaissées)
+    ('benefice_imposable', ('benefice_brut', 'charges_financieres', 'dotations'),
+     lambda benefice, financieres, dotations: benefice - financieres - dotations),
+    ('impot', ('benefice_imposable', 'taux_impot'),
+     lambda imposable, taux: np.where(imposable > 0, imposable * (taux / 100), 0.0)),
+    ('profit_net', ('benefice_imposable', 'impot'), lambda imposable, impot: imposable - impot),
+    ('profit_par_associe', ('profit_net', 'nb_associes'),
+     lambda profit, associes: np.where(associes > 0, profit / associes, 0.0)),
+    ('marge_nette', ('profit_net', 'revenu_brut'),
+     lambda profit, revenu: np.where(revenu > 0, profit / revenu * 100, 0.0)),
+    # Part investie par les associés (par défaut, le total des investissements)
+    ('investi', ('total_investissement', 'apport'),
+     lambda total, apport: total if apport is None else en_colonne(apport)),
+    ('taux_marge', ('cout_variable', 'revenu_brut'), lambda variable, revenu: 1 - (variable / revenu)),
+    # Seuil de rentabilité (charges financières et dotations comprises)
+    ('seuil_rentabilite', ('revenu_brut', 'cout_fixe', 'charges_financieres', 'dotations', 'taux_marge'),
+     lambda revenu, fixe, financieres, dotations, taux_marge:
+     np.where(revenu > 0, (fixe + financieres + dotations) / taux_marge, 0.0)),
+    ('marge_cout_variable', ('revenu_brut', 'taux_marge'),
+     lambda revenu, taux_marge: np.where(revenu > 0, taux_marge * 100, 0.0)),
+    # ROI et temps de retour sur la part investie
+    ('rentable', ('investi', 'profit_net'), lambda investi, profit: (investi > 0) & (profit > 0)),
+    ('roi_mensuel', ('rentable', 'profit_net', 'investi'),
+     lambda rentable, profit, investi: np.where(rentable, profit / investi * 100, 0.0)),
+    ('roi_annuel', ('roi_mensuel',), lambda roi: roi * 12),
+    ('temps_retour', ('rentable', 'investi', 'profit_net'),
+     lambda rentable, investi, profit: np.where(rentable, investi / profit, np.inf)),
+)
+
+
+# Conversion d'une entrée en matrice (N, K) : un vecteur (K,) devient un lot d'un scénario
+def en_matrice(valeurs):
+    tableau = np.asarray(valeurs, dtype=float)
+    if tableau.ndim == 0:
+        tableau = tableau.reshape(1, 1)
+    elif tableau.ndim == 1:
+        tableau = tableau[np.newaxis, :]
+    return tableau
+
+
+# Conversion d'un paramètre scalaire (ou d'un vecteur de N valeurs) en colonne (N,)
+def en_colonne(valeurs):
+    return np.atleast_1d(np.asarray(valeurs, dtype=float))
+
+
+# Évaluation des noeuds `noeuds` (par défaut tous) : `valeurs` doit contenir leurs entrées et
+# reçoit leurs résultats
+def evaluer_noeuds(valeurs, noeuds=NOEUDS_TOTAUX):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for nom, entrees, formule in noeuds:
+            valeurs[nom] = formule(*map(valeurs.__getitem__, entrees))
+    return valeurs
+
+
+# Calcul vectorisé des indicateurs pour un lot de scénarios.
+#   prix_vente, cout_unitaire, commandes_jour : (P,) ou (N, P)
+#   charges_mensuelles : (C,) ou (N, C)      charges_investissement : (I,) ou (N, I)
+#   jours_activite, taux_impot (en %), nb_associes : scalaire ou (N,)
+#   charges_financieres, dotations : scalaire ou (N,) intérêts (et loyers de crédit-bail) et
+#     dotations aux amortissements du mois, déduits du bénéfice imposable (financement.py)
+#   apport : scalaire ou (N,) fonds propres investis, base du ROI et du temps de retour
+#     (par défaut, le total des investissements)
+# Retourne un dictionnaire de tableaux : (N,) pour les totaux, (N, P) par produit.
+def calculer_indicateurs_lot(prix_vente, cout_unitaire, commandes_jour,
+                             charges_mensuelles, charges_investissement,
+                             jours_activite=30, taux_impot=20.0, nb_associes=6,
+                             charges_financieres=0.0, dotations=0.0, apport=None):
+    prix = en_matrice(prix_vente)
+    couts = en_matrice(cout_unitaire)
+    commandes = en_matrice(commandes_jour)
+    charges = en_matrice(charges_mensuelles)
+    investissements = en_matrice(charges_investissement)
+    jours = en_colonne(jours_activite)
+    taux = en_colonne(taux_impot)
+    associes = en_colonne(nb_associes)
+    financieres = en_colonne(charges_financieres)
+    dotations = en_colonne(dotations)
+
+    # Nombre de scénarios du lot (les entrées de taille 1 sont diffusées)
+    n = max(len(prix), len(couts), len(commandes), len(charges), len(investissements),
+            len(jours), len(taux), len(associes), len(financieres), len(dotations),
+            len(en_colonne(0.0 if apport is None else apport)))
+
+    # Calcul des revenus et coûts par produit
+    volumes = commandes * jours[:, np.newaxis]
+    revenus_produits = prix * volumes
+    revenus_produits = np.broadcast_to(revenus_produits, (n, revenus_produits.shape[1]))
+    couts_produits = np.broadcast_to(couts * volumes, revenus_produits.shape)
+    marges_produits = revenus_produits - couts_produits
+
+    # Calcul des totaux, puis des indicateurs qui en dérivent
+    valeurs = {
+        'revenu_brut': revenus_produits.sum(axis=1),
+        'cout_variable': couts_produits.sum(axis=1),
+        'cout_fixe': np.broadcast_to(charges.sum(axis=1), (n,)),
+        'total_investissement': np.broadcast_to(investissements.sum(axis=1), (n,)),
+        'taux_impot': taux,
+        'nb_associes': associes,
+        'charges_financieres': financieres,
+        'dotations': dotations,
+        'apport': apport,
+    }
+    evaluer_noeuds(valeurs)
+
+    return {
+        'revenus_produits': revenus_produits,
+        'couts_produits': couts_produits,
+        'marges_produits': marges_produits,
+        **{cle: valeurs[cle] for cle in INDICATEURS},
+    }
+
+
+# Calcul des indicateurs d'un seul scénario décrit par des dictionnaires {nom: valeur},
+# au format historique de calculer_indicateurs() (dictionnaires par produit, flottants).
+# `financement` : charges_financieres, dotations et apport de calculer_indicateurs_lot.
+def calculer_indicateurs_scenario(produits, prix_vente, cout_unitaire, commandes_jour,
+                                  charges_mensuelles, charges_investissement,
+                                  jours_activite, taux_impot, nb_associes, **financement):
+    noms = list(produits)
+    lot = calculer_indicateurs_lot(
+        [prix_vente[p] for p in noms],
+        [cout_unitaire[p] for p in noms],
+        [commandes_jour[p] for p in noms],
+        list(charges_mensuelles.values()) or [0.0],
+        list(charges_investissement.values()) or [0.0],
+        jours_activite, taux_impot, nb_associes, **financement
+    )
+
+    resultat = {}
+    for cle in INDICATEURS_PRODUITS:
+        resultat[cle] = dict(zip(noms, lot[cle][0].tolist()))
+    for cle in INDICATEURS:
+        resultat[cle] = float(lot[cle][0])
+    return resultat
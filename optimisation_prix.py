@@ -0,0 +1,172 @@
+# Optimisation des prix de vente sous demande élastique.
+#
+# Demande à élasticité constante autour du point actuel (prix0, commandes0) :
+#     q_p(x) = q0_p * prod_j (x_j / x0_j) ** E[p, j]
+# E[p, p] est l'élasticité propre du produit p (négative), E[p, j] l'élasticité croisée
+# (positive pour des produits substituables, comme Crêpes et Gaufres).
+# Le profit net étant croissant avec le bénéfice avant impôt, on maximise ce dernier :
+#     pi(x) = jours * sum_p (x_p - c_p) q_p(x) - charges fixes
+# par méthode de Newton projetée en log-prix, gradient et hessienne analytiques, avec
+# recherche linéaire par rebroussement. Sans élasticités croisées la hessienne est
+# diagonale et le problème séparable : aucun système linéaire n'est résolu.
+# Tout est vectorisé sur le lot de N scénarios.
+import numpy as np
+
+from moteur import calculer_indicateurs_lot, en_colonne, en_matrice
+
+# Borne haute par défaut (multiple du prix actuel) si aucun prix maximal n'est fourni :
+# avec une élasticité propre >= -1, le profit croît sans limite avec le prix.
+MULTIPLE_PRIX_MAX = 5.0
+
+# Variation maximale du log-prix par itération
+PAS_MAX = 0.5
+
+
+# Matrice d'élasticités (N, P, P) à partir d'élasticités propres (P,)/(N, P)
+# et, optionnellement, d'élasticités croisées (P, P)/(N, P, P) (diagonale ignorée)
+def matrice_elasticites(elasticites, elasticites_croisees=None, nb_produits=None):
+    propres = en_matrice(elasticites)
+    p = nb_produits or propres.shape[1]
+    propres = np.broadcast_to(propres, (len(propres), p))
+    if elasticites_croisees is None:
+        croisees = np.zeros((1, p, p))
+    else:
+        croisees = np.asarray(elasticites_croisees, dtype=float)
+        croisees = croisees[np.newaxis] if croisees.ndim == 2 else croisees
+    croisees = croisees * (1.0 - np.eye(p))
+    return croisees + propres[:, :, np.newaxis] * np.eye(p)
+
+
+# Demande (N, P) aux prix x pour des log-prix relatifs log(x / x0)
+def _demande(commandes0, log_relatif, elasticites):
+    return commandes0 * np.exp(np.einsum('npj,nj->np', elasticites, log_relatif))
+
+
+# Bénéfice mensuel avant impôt et charges fixes, gradient et hessienne en log-prix
+# (hessienne complète (N, P, P) si `complete`, sinon sa diagonale (N, P))
+def _profit_et_derivees(prix, couts, commandes0, log_relatif, elasticites, jours, complete):
+    q = _demande(commandes0, log_relatif, elasticites)
+    chiffre = prix * q
+    marge = (prix - couts) * q
+    profit = (jours * marge).sum(axis=1)
+    # d pi / d log x_k = x_k q_k + sum_p m_p E[p, k]
+    gradient = jours * (chiffre + np.einsum('np,npk->nk', marge, elasticites))
+    if complete:
+        # d² pi / d log x_k d log x_l = x_k q_k (d_kl + E_kl) + x_l q_l E_lk + sum_p m_p E_pk E_pl
+        hessienne = (chiffre[:, :, np.newaxis] * (np.eye(prix.shape[1]) + elasticites)
+                     + (chiffre[:, :, np.newaxis] * elasticites).transpose(0, 2, 1)
+                     + np.einsum('np,npk,npl->nkl', marge, elasticites, elasticites))
+        return profit, gradient, jours[:, :, np.newaxis] * hessienne
+    # d² pi / d (log x_k)² = x_k q_k (1 + 2 E_kk) + sum_p m_p E_pk²
+    diag = np.diagonal(elasticites, axis1=1, axis2=2)
+    hessienne = jours * (chiffre * (1.0 + 2.0 * diag) + np.einsum('np,npk->nk', marge, elasticites ** 2))
+    return profit, gradient, hessienne
+
+
+# Direction de Newton projetée : les prix bloqués sur une borne (le gradient poussant vers
+# l'extérieur) sont fixés, le système est résolu sur les autres. Là où la hessienne réduite
+# n'est pas définie négative (profit non concave localement), elle est décalée de sa plus
+# grande valeur propre (Newton modifié à la Levenberg-Marquardt) : la direction reste
+# ascendante et s'allonge le long des directions de courbure positive.
+def _direction_newton(gradient, hessienne, bloques):
+    libres = ~bloques
+    masque = libres[:, :, np.newaxis] & libres[:, np.newaxis, :]
+    identite = np.eye(gradient.shape[1])
+    echelle = np.abs(np.diagonal(hessienne, axis1=1, axis2=2)).max(axis=1) + 1e-12
+    reduite = np.where(masque, hessienne, -echelle[:, np.newaxis, np.newaxis] * identite)
+    valeurs_propres = np.linalg.eigvalsh(reduite)
+    decalage = np.maximum(valeurs_propres.max(axis=1), 0.0) + 1e-3 * echelle
+    decalage = np.where(valeurs_propres.max(axis=1) < 0, 0.0, decalage)
+    systeme = reduite - decalage[:, np.newaxis, np.newaxis] * identite
+    direction = np.linalg.solve(systeme, -np.where(libres, gradient, 0.0)[..., np.newaxis])[..., 0]
+    return np.where(libres, direction, 0.0)
+
+
+# Prix maximisant le profit pour un lot de scénarios.
+#   prix_vente, cout_unitaire, commandes_jour : (P,) ou (N, P) au point de référence
+#   elasticites : élasticités propres (P,) ou (N, P) ; elasticites_croisees : (P, P) ou (N, P, P)
+#   prix_min / prix_max : bornes (P,) ou (N, P) ; par défaut coût unitaire et 5 x prix actuel
+#   financement : charges_financieres, dotations et apport de calculer_indicateurs_lot (des
+#     charges fixes pour l'optimum : elles ne changent que les indicateurs retournés)
+# Retourne les prix et commandes optimaux, les indicateurs associés et le nombre d'itérations.
+def optimiser_prix(prix_vente, cout_unitaire, commandes_jour, charges_mensuelles,
+                   charges_investissement, jours_activite=30, taux_impot=20.0, nb_associes=6,
+                   elasticites=-1.5, elasticites_croisees=None, prix_min=None, prix_max=None,
+                   iterations_max=100, tolerance=1e-9, **financement):
+    prix0 = en_matrice(prix_vente)
+    couts = en_matrice(cout_unitaire)
+    commandes0 = en_matrice(commandes_jour)
+    p = max(prix0.shape[1], couts.shape[1], commandes0.shape[1])
+    elasticites = matrice_elasticites(elasticites, elasticites_croisees, p)
+    n = max(len(prix0), len(couts), len(commandes0), len(elasticites))
+    prix0, couts, commandes0 = (np.broadcast_to(t, (n, p)) for t in (prix0, couts, commandes0))
+    elasticites = np.broadcast_to(elasticites, (n, p, p))
+    jours = en_colonne(jours_activite)[:, np.newaxis]
+
+    bas = np.broadcast_to(en_matrice(couts if prix_min is None else prix_min), (n, p))
+    haut = np.broadcast_to(en_matrice(MULTIPLE_PRIX_MAX * prix0 if prix_max is None else prix_max), (n, p))
+    borne_basse = np.log(np.maximum(bas, 1e-9) / prix0)
+    borne_haute = np.log(np.maximum(haut, bas) / prix0)
+
+    # Point de départ : optimum à élasticité propre seule, x = c E / (1 + E) si E < -1
+    propres = np.diagonal(elasticites, axis1=1, axis2=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        depart = np.where(propres < -1.0, couts * propres / (1.0 + propres), haut)
+        log_relatif = np.clip(np.log(depart / prix0), borne_basse, borne_haute)
+    log_relatif = np.where(np.isfinite(log_relatif), log_relatif, 0.0)
+
+    complete = elasticites_croisees is not None
+    converge = np.zeros(n, dtype=bool)
+    iterations = 0
+    for iterations in range(1, iterations_max + 1):
+        prix = prix0 * np.exp(log_relatif)
+        profit, gradient, hessienne = _profit_et_derivees(prix, couts, commandes0, log_relatif,
+                                                          elasticites, jours, complete)
+
+        if complete:
+            bloques = (((log_relatif <= borne_basse) & (gradient < 0))
+                       | ((log_relatif >= borne_haute) & (gradient > 0)))
+            direction = _direction_newton(gradient, hessienne, bloques)
+        else:
+            # Newton diagonal là où la courbure est négative ; ailleurs le profit est convexe
+            # dans cette direction : pas maximal dans le sens du gradient
+            with np.errstate(divide='ignore', invalid='ignore'):
+                direction = np.where(hessienne < 0, -gradient / hessienne, PAS_MAX * np.sign(gradient))
+        direction = np.clip(direction, -PAS_MAX, PAS_MAX)
+
+        # Recherche linéaire par rebroussement, ligne par ligne (les lignes convergées sont figées)
+        pas = np.ones(n)
+        candidat = log_relatif
+        profit_candidat = profit
+        accepte = converge.copy()
+        for _ in range(30):
+            essai = np.clip(log_relatif + pas[:, np.newaxis] * direction, borne_basse, borne_haute)
+            profit_essai = (jours * (prix0 * np.exp(essai) - couts)
+                            * _demande(commandes0, essai, elasticites)).sum(axis=1)
+            nouveau = ~accepte & (profit_essai >= profit)
+            candidat = np.where(nouveau[:, np.newaxis], essai, candidat)
+            profit_candidat = np.where(nouveau, profit_essai, profit_candidat)
+            accepte |= nouveau
+            if accepte.all():
+                break
+            pas = np.where(accepte, pas, pas / 2)
+
+        # Convergence : gain de profit relatif ou déplacement négligeable
+        gain = profit_candidat - profit
+        deplacement = np.abs(candidat - log_relatif).max(axis=1)
+        converge |= (gain <= tolerance * np.maximum(np.abs(profit), 1.0)) | (deplacement < tolerance)
+        log_relatif = candidat
+        if converge.all():
+            break
+
+    prix_optimaux = prix0 * np.exp(log_relatif)
+    commandes_optimales = _demande(commandes0, log_relatif, elasticites)
+    indicateurs = calculer_indicateurs_lot(prix_optimaux, couts, commandes_optimales, charges_mensuelles,
+                                           charges_investissement, jours_activite, taux_impot, nb_associes,
+                                           **financement)
+    return {
+        'prix': prix_optimaux,
+        'commandes_jour': commandes_optimales,
+        'indicateurs': indicateurs,
+        'iterations': iterations,
+    }
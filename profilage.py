@@ -0,0 +1,135 @@
+# Profilage optionnel des exécutions de la page : durée de chaque section, de chaque calcul
+# d'indicateurs et de chaque rendu de graphique, exportable au format Chrome trace
+# (chrome://tracing, Perfetto).
+#
+# Le profileur actif est propre au thread d'exécution (un thread par exécution du script
+# Streamlit). Sans profileur actif, mesure() se réduit à un test : le coût est négligeable
+# quand le profilage est désactivé.
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class Profileur:
+    # origine : instant de départ (time.perf_counter_ns()) s'il précède la création du
+    # profileur, par exemple le début du script avant ses imports
+    def __init__(self, nom='execution', origine=None):
+        self.nom = nom
+        self.evenements = []
+        self.origine = time.perf_counter_ns() if origine is None else origine
+        self.debut = time.time() - (time.perf_counter_ns() - self.origine) / 1e9
+        self.fin = None
+        self._profondeur = 0
+
+    # Fin de l'exécution profilée
+    def terminer(self):
+        self.fin = time.perf_counter_ns()
+
+    # Enregistrement d'un intervalle chronométré (durées en nanosecondes)
+    def enregistrer(self, nom, categorie, debut, duree, profondeur, arguments=None):
+        self.evenements.append({
+            'nom': nom,
+            'categorie': categorie,
+            'debut': debut - self.origine,
+            'duree': duree,
+            'profondeur': profondeur,
+            'thread': threading.get_ident(),
+            'arguments': arguments or {},
+        })
+
+    # Durée totale de l'exécution (ms) : jusqu'à terminer(), à défaut jusqu'au dernier intervalle
+    def duree_totale(self):
+        if self.fin is not None:
+            return (self.fin - self.origine) / 1e6
+        return max((e['debut'] + e['duree'] for e in self.evenements), default=0) / 1e6
+
+    # Répartition par intervalle : appels, durée totale, durée propre (hors intervalles
+    # imbriqués, soit la construction des éléments Streamlit pour une section) et maximum
+    def resume(self):
+        propres = [e['duree'] for e in self.evenements]
+        for i, evenement in enumerate(self.evenements):
+            # Les intervalles sont enregistrés à leur fin : les enfants précèdent leur parent
+            fin = evenement['debut'] + evenement['duree']
+            for j in range(i - 1, -1, -1):
+                enfant = self.evenements[j]
+                if enfant['debut'] < evenement['debut']:
+                    break
+                if enfant['profondeur'] == evenement['profondeur'] + 1 and enfant['debut'] + enfant['duree'] <= fin:
+                    propres[i] -= enfant['duree']
+
+        lignes = {}
+        for evenement, propre in zip(self.evenements, propres):
+            ligne = lignes.setdefault((evenement['categorie'], evenement['nom']), {
+                'categorie': evenement['categorie'], 'nom': evenement['nom'],
+                'appels': 0, 'total_ms': 0.0, 'propre_ms': 0.0, 'max_ms': 0.0,
+            })
+            ligne['appels'] += 1
+            ligne['total_ms'] += evenement['duree'] / 1e6
+            ligne['propre_ms'] += propre / 1e6
+            ligne['max_ms'] = max(ligne['max_ms'], evenement['duree'] / 1e6)
+        return sorted(lignes.values(), key=lambda l: l['total_ms'], reverse=True)
+
+    # Événements au format Chrome trace ("X" : intervalles complets, en microsecondes)
+    def evenements_chrome(self, pid=None):
+        pid = os.getpid() if pid is None else pid
+        return [{
+            'name': e['nom'],
+            'cat': e['categorie'],
+            'ph': 'X',
+            'ts': e['debut'] / 1e3,
+            'dur': e['duree'] / 1e3,
+            'pid': pid,
+            'tid': e['thread'],
+            'args': e['arguments'],
+        } for e in self.evenements]
+
+
+# Trace Chrome (dictionnaire sérialisable en JSON) d'une ou plusieurs exécutions, placées
+# sur une même échelle de temps
+def trace_chrome(profileurs):
+    profileurs = list(profileurs)
+    if not profileurs:
+        return {'traceEvents': [], 'displayTimeUnit': 'ms'}
+    origine = min(p.origine for p in profileurs)
+    evenements = []
+    for profileur in profileurs:
+        decalage = (profileur.origine - origine) / 1e3
+        for evenement in profileur.evenements_chrome():
+            evenement['ts'] += decalage
+            evenements.append(evenement)
+        evenements.append({'name': profileur.nom, 'ph': 'i', 's': 'p', 'ts': decalage,
+                           'pid': os.getpid(), 'tid': 0})
+    return {'traceEvents': evenements, 'displayTimeUnit': 'ms'}
+
+
+# Profileur actif du thread courant (None si le profilage est désactivé)
+def profileur_actif():
+    return getattr(_local, 'profileur', None)
+
+
+# Activation d'un profileur pour le thread courant (None pour désactiver) ; retourne le précédent
+def activer(profileur):
+    precedent = profileur_actif()
+    _local.profileur = profileur
+    return precedent
+
+
+# Chronométrage d'un bloc : with mesure("section:resume", "section"): ...
+@contextmanager
+def mesure(nom, categorie='fonction', **arguments):
+    profileur = profileur_actif()
+    if profileur is None:
+        yield
+        return
+    profondeur = profileur._profondeur
+    profileur._profondeur += 1
+    debut = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        profileur._profondeur = profondeur
+        profileur.enregistrer(nom, categorie, debut, time.perf_counter_ns() - debut, profondeur, arguments)
+
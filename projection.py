@@ -0,0 +1,135 @@
+# Projection de trésorerie mois par mois sur plusieurs années.
+# Vectorisée sur les mois et sur les scénarios : N scénarios x M mois en une passe,
+# sans jamais construire de tableau N x P x M quand la saisonnalité est commune.
+import numpy as np
+
+from moteur import en_colonne, en_matrice
+
+# Noms des mois calendaires (colonnes de la table de saisonnalité)
+MOIS = ('Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Juin', 'Juil', 'Août', 'Sep', 'Oct', 'Nov', 'Déc')
+
+
+# Coefficient de montée en charge (N, M) : part de la demande nominale atteinte au mois m,
+# progression linéaire de `niveau_initial` au 1er mois jusqu'à 1 après `duree_montee` mois
+def montee_en_charge(nb_mois, niveau_initial=1.0, duree_montee=0):
+    niveau = en_colonne(niveau_initial)[:, np.newaxis]
+    duree = en_colonne(duree_montee)[:, np.newaxis]
+    mois = np.arange(nb_mois)[np.newaxis, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        progression = np.where(duree > 0, np.minimum(mois / duree, 1.0), 1.0)
+    return niveau + (1.0 - niveau) * progression
+
+
+# Facteur d'inflation (N, M) au mois m (composé mensuellement à partir d'un taux annuel en %)
+def facteur_inflation(nb_mois, taux_annuel=0.0):
+    taux = en_colonne(taux_annuel)[:, np.newaxis] / 100
+    return (1.0 + taux) ** (np.arange(nb_mois)[np.newaxis, :] / 12)
+
+
+# Projection de trésorerie.
+#   saisonnalite : None, (P, 12) ou (N, P, 12) coefficients par mois calendaire et produit
+#   mois_depart : mois calendaire d'ouverture (1 = janvier)
+#   inflation_prix / inflation_couts / inflation_charges : taux annuels en %
+#   taux_actualisation : taux annuel en % pour la valeur actuelle nette
+#   financement : échéanciers de financement.echeanciers sur au moins nb_mois mois ; sans
+#     financement, tout l'investissement est payé comptant et n'est pas amorti
+# Le mois 0 porte la sortie d'investissement (l'apport des associés avec un financement) ;
+# les mois 1..nb_mois l'exploitation, le service de la dette et les loyers de crédit-bail.
+def projeter_tresorerie(prix_vente, cout_unitaire, commandes_jour, charges_mensuelles,
+                        charges_investissement, jours_activite=30, taux_impot=20.0,
+                        nb_mois=60, niveau_initial=1.0, duree_montee=0, saisonnalite=None,
+                        mois_depart=1, inflation_prix=0.0, inflation_couts=0.0,
+                        inflation_charges=0.0, taux_actualisation=0.0, financement=None):
+    prix = en_matrice(prix_vente)
+    couts = en_matrice(cout_unitaire)
+    volumes = en_matrice(commandes_jour) * en_colonne(jours_activite)[:, np.newaxis]
+    cout_fixe = en_matrice(charges_mensuelles).sum(axis=1)[:, np.newaxis]
+    investissement = en_matrice(charges_investissement).sum(axis=1)
+    taux = en_colonne(taux_impot)[:, np.newaxis] / 100
+
+    # Coefficient saisonnier de chaque mois projeté, par produit : (P, M) ou (N, P, M)
+    calendrier = (mois_depart - 1 + np.arange(nb_mois)) % 12
+    if saisonnalite is None:
+        saisons = np.ones((volumes.shape[1], 1))
+    else:
+        saisons = np.asarray(saisonnalite, dtype=float)[..., calendrier]
+
+    # Revenus et coûts variables mensuels (N, M), ou (N, 1) sans saisonnalité, avant montée
+    # en charge et inflation
+    chiffre = prix * volumes
+    achats = couts * volumes
+    if saisons.ndim == 2:
+        revenus_base = chiffre @ saisons
+        achats_base = achats @ saisons
+    else:
+        revenus_base = np.einsum('np,npm->nm', chiffre, saisons)
+        achats_base = np.einsum('np,npm->nm', achats, saisons)
+
+    montee = montee_en_charge(nb_mois, niveau_initial, duree_montee)
+    revenus = revenus_base * montee * facteur_inflation(nb_mois, inflation_prix)
+    cout_variable = achats_base * montee * facteur_inflation(nb_mois, inflation_couts)
+    cout_fixe = cout_fixe * facteur_inflation(nb_mois, inflation_charges)
+
+    benefice_brut = revenus - cout_variable - cout_fixe
+    if financement is None:
+        charges_financieres = dotations = remboursements = 0.0
+        decaissement = investissement
+    else:
+        charges_financieres = financement['interets'][:, :nb_mois] + financement['loyers'][:, :nb_mois]
+        dotations = financement['dotations'][:, :nb_mois]
+        remboursements = financement['principal'][:, :nb_mois]
+        decaissement = financement['apport']
+    benefice_imposable = benefice_brut - charges_financieres - dotations
+    impot = np.where(benefice_imposable > 0, benefice_imposable * taux, 0.0)
+    profit_net = benefice_imposable - impot
+    forme = profit_net.shape
+
+    # Flux de trésorerie : investissement au mois 0 puis profit net mensuel (dotations non
+    # décaissées rajoutées, capital emprunté remboursé déduit)
+    n = max(forme[0], len(decaissement))
+    flux = np.empty((n, nb_mois + 1))
+    flux[:, 0] = -decaissement
+    flux[:, 1:] = profit_net + dotations - remboursements
+    cumul = np.cumsum(flux, axis=1)
+
+    return {
+        'revenus': np.broadcast_to(revenus, forme),
+        'cout_variable': np.broadcast_to(cout_variable, forme),
+        'cout_fixe': np.broadcast_to(cout_fixe, forme),
+        'impot': impot,
+        'profit_net': profit_net,
+        'flux': flux,
+        'cumul': cumul,
+        'temps_retour': temps_retour_cumul(cumul),
+        'besoin_tresorerie': -np.minimum(cumul.min(axis=1), 0.0),
+        'van': valeur_actuelle_nette(flux, taux_actualisation),
+    }
+
+
+# Mois (fractionnaire) où la trésorerie cumulée redevient positive, interpolé entre deux mois ;
+# inf si le cumul reste négatif sur tout l'horizon. Une trésorerie négative après un retour
+# (mois de perte) repousse le retour au dernier passage définitif au-dessus de zéro.
+def temps_retour_cumul(cumul):
+    negatif = cumul < 0
+    # Dernier mois où le cumul est négatif ; le retour a lieu pendant le mois suivant
+    dernier_negatif = cumul.shape[1] - 1 - np.argmax(negatif[:, ::-1], axis=1)
+    jamais_negatif = ~negatif.any(axis=1)
+    toujours_negatif = negatif[:, -1]
+
+    suivant = np.minimum(dernier_negatif + 1, cumul.shape[1] - 1)
+    lignes = np.arange(len(cumul))
+    avant = cumul[lignes, dernier_negatif]
+    apres = cumul[lignes, suivant]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(apres > avant, -avant / (apres - avant), 1.0)
+    retour = dernier_negatif + fraction
+
+    retour = np.where(toujours_negatif, np.inf, retour)
+    return np.where(jamais_negatif, 0.0, retour)
+
+
+# Valeur actuelle nette des flux mensuels (taux d'actualisation annuel en %)
+def valeur_actuelle_nette(flux, taux_actualisation=0.0):
+    taux = en_colonne(taux_actualisation)[:, np.newaxis] / 100
+    actualisation = (1.0 + taux) ** (-np.arange(flux.shape[1])[np.newaxis, :] / 12)
+    return (flux * actualisation).sum(axis=1)
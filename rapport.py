@@ -0,0 +1,249 @@
+# Rapports téléchargeables d'un scénario : PDF (matplotlib, toujours disponible) et classeur
+# Excel (openpyxl, optionnel). Les deux couvrent le résumé financier, les tableaux par
+# produit, les charges, les investissements, les graphiques et les recommandations.
+#
+# Les fonctions ne dépendent que du scénario (dictionnaire de scenario.py) : elles peuvent
+# tourner dans un processus de travail et leur résultat être mis en cache par empreinte.
+# pandas et matplotlib ne sont chargés qu'à la génération d'un rapport.
+import importlib.util
+import io
+from datetime import date
+
+import numpy as np
+
+from catalogue import parts_principales
+from imports_differes import ModuleDiffere
+from moteur import calculer_indicateurs_scenario
+from scenario import CLES_SCENARIO
+
+pd = ModuleDiffere("pandas")
+
+# Formats de rapport et leur type MIME
+FORMATS_RAPPORT = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Lignes de tableau par page du PDF, et longueur maximale des listes de recommandations
+LIGNES_PAR_PAGE = 28
+MAX_PRODUITS_LISTES = 10
+
+# Format de page (A4 paysage, en pouces)
+TAILLE_PAGE = (11.69, 8.27)
+
+# Affichage d'une valeur infinie (temps de retour ou seuil d'un projet jamais rentable), comme la page
+NON_RENTABLE = "Non rentable"
+
+
+# Formats disponibles dans l'environnement (l'Excel nécessite openpyxl)
+def formats_disponibles():
+    return [f for f in FORMATS_RAPPORT if f != 'xlsx' or importlib.util.find_spec('openpyxl') is not None]
+
+
+# Recommandations (lignes de texte) selon la rentabilité du scénario
+def recommandations(scenario, indicateurs):
+    noms = list(scenario['produits'])
+    marges = np.array([indicateurs['marges_produits'][p] for p in noms], dtype=float)
+    lignes = []
+    if indicateurs['profit_net'] > 0:
+        lignes.append("Le projet est rentable.")
+        for i, position in enumerate(np.argsort(-marges, kind='stable')[:3]):
+            if marges[position] > 0:
+                lignes.append(f"Produit le plus rentable n°{i + 1} : {noms[position]} "
+                              f"(marge mensuelle {marges[position]:.2f} Dh)")
+        prix = np.array([scenario['prix_vente'][p] for p in noms], dtype=float)
+        couts = np.array([scenario['cout_unitaire'][p] for p in noms], dtype=float)
+        a_augmenter = np.flatnonzero(prix < 3 * couts)
+        for position in a_augmenter[:MAX_PRODUITS_LISTES]:
+            lignes.append(f"Prix à revoir : {noms[position]}, prix actuel {prix[position]:.2f} Dh, "
+                          f"prix suggéré {3 * couts[position]:.2f} Dh")
+        if len(a_augmenter) > MAX_PRODUITS_LISTES:
+            lignes.append(f"... et {len(a_augmenter) - MAX_PRODUITS_LISTES} autres produits dont le prix est à revoir")
+    else:
+        lignes.append("Le projet n'est pas rentable dans sa configuration actuelle.")
+        if indicateurs['revenu_brut'] < indicateurs['cout_fixe']:
+            lignes.append("Les revenus sont insuffisants pour couvrir les charges fixes")
+        if indicateurs['marge_cout_variable'] < 40:
+            lignes.append("La marge sur coût variable est trop faible")
+        non_rentables = [noms[position] for position in np.flatnonzero(marges < 0)]
+        if non_rentables:
+            liste = ', '.join(non_rentables[:MAX_PRODUITS_LISTES])
+            if len(non_rentables) > MAX_PRODUITS_LISTES:
+                liste += f" et {len(non_rentables) - MAX_PRODUITS_LISTES} autres"
+            lignes.append(f"Certains produits ne sont pas rentables : {liste}")
+        lignes.append("Augmentez les prix ou le volume des ventes, réduisez les coûts fixes ou variables, "
+                      "réévaluez les investissements initiaux.")
+    return lignes
+
+
+# Contenu commun aux rapports : indicateurs, tableaux (DataFrames) et recommandations.
+# `financement` : déductions mensuelles du plan de financement (financement.deductions_mensuelles)
+def contenu_rapport(scenario, financement=None):
+    financement = financement or {}
+    indicateurs = calculer_indicateurs_scenario(*[scenario[cle] for cle in CLES_SCENARIO], **financement)
+    noms = list(scenario['produits'])
+    jours = scenario['jours_activite']
+
+    resume = pd.DataFrame({
+        "Indicateur": ["Revenu brut mensuel", "Coûts variables", "Charges fixes", "Bénéfice brut",
+                       "Impôt", "Profit net mensuel", "Profit par associé", "Investissement total",
+                       "Seuil de rentabilité", "ROI annuel (%)", "Temps de retour (mois)"],
+        "Valeur": [indicateurs['revenu_brut'], indicateurs['cout_variable'], indicateurs['cout_fixe'],
+                   indicateurs['benefice_brut'], indicateurs['impot'], indicateurs['profit_net'],
+                   indicateurs['profit_par_associe'], indicateurs['total_investissement'],
+                   indicateurs['seuil_rentabilite'], indicateurs['roi_annuel'], indicateurs['temps_retour']],
+    })
+    if financement:
+        # Charges du plan de financement, entre le bénéfice brut et l'impôt
+        deductions = pd.DataFrame({
+            "Indicateur": ["Charges financières", "Dotations aux amortissements"],
+            "Valeur": [float(np.sum(financement.get('charges_financieres', 0.0))),
+                       float(np.sum(financement.get('dotations', 0.0)))],
+        })
+        resume = pd.concat([resume.iloc[:4], deductions, resume.iloc[4:]], ignore_index=True)
+    prix = np.array([scenario['prix_vente'][p] for p in noms], dtype=float)
+    couts = np.array([scenario['cout_unitaire'][p] for p in noms], dtype=float)
+    commandes = np.array([scenario['commandes_jour'][p] for p in noms], dtype=float)
+    produits = pd.DataFrame({
+        "Produit": noms,
+        "Prix unitaire (Dh)": prix,
+        "Coût unitaire (Dh)": couts,
+        "Marge unitaire (Dh)": prix - couts,
+        "Commandes/jour": commandes,
+        "Revenu mensuel (Dh)": prix * commandes * jours,
+        "Coût mensuel (Dh)": couts * commandes * jours,
+        "Marge mensuelle (Dh)": (prix - couts) * commandes * jours,
+    })
+    charges = pd.DataFrame({"Charge": list(scenario['charges_mensuelles']),
+                            "Montant mensuel (Dh)": list(scenario['charges_mensuelles'].values())})
+    investissements = pd.DataFrame({"Investissement": list(scenario['charges_investissement']),
+                                    "Montant (Dh)": list(scenario['charges_investissement'].values())})
+    return {
+        'indicateurs': indicateurs,
+        'resume': resume,
+        'produits': produits,
+        'charges': charges,
+        'investissements': investissements,
+        'recommandations': recommandations(scenario, indicateurs),
+    }
+
+
+# Mise en forme d'une cellule d'un tableau du PDF (montants à deux décimales)
+def _cellule(valeur):
+    if not isinstance(valeur, (float, np.floating)):
+        return str(valeur)
+    return f"{valeur:,.2f}".replace(",", " ") if np.isfinite(valeur) else NON_RENTABLE
+
+
+def _cellules(tableau):
+    return [[_cellule(v) for v in ligne] for ligne in tableau.itertuples(index=False)]
+
+
+# Pages du PDF pour un tableau, découpé en pages de LIGNES_PAR_PAGE lignes
+def _pages_tableau(pdf, titre, tableau):
+    from matplotlib.figure import Figure
+    for debut in range(0, max(len(tableau), 1), LIGNES_PAR_PAGE):
+        fig = Figure(figsize=TAILLE_PAGE)
+        ax = fig.subplots()
+        ax.axis('off')
+        suite = " (suite)" if debut else ""
+        ax.set_title(f"{titre}{suite}", fontsize=14, loc='left')
+        morceau = tableau.iloc[debut:debut + LIGNES_PAR_PAGE]
+        if len(morceau):
+            table = ax.table(cellText=_cellules(morceau), colLabels=list(tableau.columns), loc='upper center')
+            table.auto_set_font_size(False)
+            table.set_fontsize(8)
+            table.scale(1, 1.3)
+        pdf.savefig(fig)
+
+
+# Page de texte du PDF (titre et paragraphes)
+def _page_texte(pdf, titre, lignes):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=TAILLE_PAGE)
+    fig.text(0.06, 0.92, titre, fontsize=16, weight='bold')
+    for i, ligne in enumerate(lignes):
+        fig.text(0.06, 0.85 - i * 0.035, f"• {ligne}", fontsize=10, wrap=True)
+    pdf.savefig(fig)
+
+
+# Rapport PDF (octets)
+def generer_pdf(scenario, financement=None):
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    from graphiques import dessiner_camembert, dessiner_repartition_financiere
+
+    contenu = contenu_rapport(scenario, financement)
+    indicateurs = contenu['indicateurs']
+    tampon = io.BytesIO()
+    with PdfPages(tampon, metadata={'Title': "SimuProfit - Rapport financier"}) as pdf:
+        _page_texte(pdf, f"SimuProfit - Rapport financier du {date.today():%d/%m/%Y}", [
+            f"Profit net mensuel : {indicateurs['profit_net']:.2f} Dh",
+            f"Profit par associé : {indicateurs['profit_par_associe']:.2f} Dh",
+            f"ROI annuel : {indicateurs['roi_annuel']:.2f}%",
+            "Temps de retour : " + (f"{indicateurs['temps_retour']:.1f} mois"
+                                    if np.isfinite(indicateurs['temps_retour']) else NON_RENTABLE),
+        ])
+        _pages_tableau(pdf, "Résumé financier mensuel", contenu['resume'])
+        _pages_tableau(pdf, "Détails par produit", contenu['produits'])
+        _pages_tableau(pdf, "Charges mensuelles", contenu['charges'])
+        _pages_tableau(pdf, "Investissements initiaux", contenu['investissements'])
+
+        pdf.savefig(dessiner_repartition_financiere(indicateurs, financement))
+        labels, valeurs = parts_principales(list(scenario['produits']),
+                                            list(indicateurs['couts_produits'].values()))
+        if valeurs:
+            pdf.savefig(dessiner_camembert(labels, valeurs, 'Répartition des coûts variables par produit'))
+        labels, valeurs = parts_principales(list(scenario['charges_mensuelles']),
+                                            list(scenario['charges_mensuelles'].values()))
+        if valeurs:
+            pdf.savefig(dessiner_camembert(labels, valeurs, 'Répartition des charges fixes mensuelles'))
+
+        _page_texte(pdf, "Recommandations", contenu['recommandations'])
+    return tampon.getvalue()
+
+
+# Classeur Excel (octets) : une feuille par tableau, graphiques natifs d'Excel
+def generer_xlsx(scenario, financement=None):
+    try:
+        from openpyxl.chart import BarChart, PieChart, Reference
+    except ImportError:
+        raise ImportError("Le rapport Excel nécessite openpyxl (pip install openpyxl)")
+
+    contenu = contenu_rapport(scenario, financement)
+    tampon = io.BytesIO()
+    with pd.ExcelWriter(tampon, engine='openpyxl') as classeur:
+        feuilles = {'Résumé': contenu['resume'], 'Produits': contenu['produits'],
+                    'Charges': contenu['charges'], 'Investissements': contenu['investissements'],
+                    'Recommandations': pd.DataFrame({"Recommandation": contenu['recommandations']})}
+        for nom, tableau in feuilles.items():
+            tableau.to_excel(classeur, sheet_name=nom, index=False, inf_rep=NON_RENTABLE)
+            feuille = classeur.sheets[nom]
+            for colonne, titre in zip(feuille.columns, tableau.columns):
+                feuille.column_dimensions[colonne[0].column_letter].width = max(14, len(str(titre)) + 2)
+
+        # Graphiques : marge mensuelle par produit, répartition des charges fixes
+        produits = classeur.sheets['Produits']
+        n = len(contenu['produits'])
+        if n:
+            barres = BarChart()
+            barres.title = "Marge mensuelle par produit (Dh)"
+            barres.add_data(Reference(produits, min_col=8, min_row=1, max_row=n + 1), titles_from_data=True)
+            barres.set_categories(Reference(produits, min_col=1, min_row=2, max_row=n + 1))
+            produits.add_chart(barres, "J2")
+        charges = classeur.sheets['Charges']
+        n = len(contenu['charges'])
+        if n:
+            camembert = PieChart()
+            camembert.title = "Répartition des charges fixes"
+            camembert.add_data(Reference(charges, min_col=2, min_row=1, max_row=n + 1), titles_from_data=True)
+            camembert.set_categories(Reference(charges, min_col=1, min_row=2, max_row=n + 1))
+            charges.add_chart(camembert, "D2")
+    return tampon.getvalue()
+
+
+# Rapport d'un scénario au format demandé (point d'entrée des processus de travail)
+def generer_rapport(scenario, format='pdf', financement=None):
+    if format not in FORMATS_RAPPORT:
+        raise ValueError(f"Format de rapport inconnu : {format}")
+    return generer_pdf(scenario, financement) if format == 'pdf' else generer_xlsx(scenario, financement)
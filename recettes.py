@@ -0,0 +1,169 @@
+# Recettes (nomenclature) : quantité de chaque ingrédient entrant dans une unité de produit.
+#
+# La matrice produits x ingrédients est creuse (quelques ingrédients par produit) : elle est
+# stockée par lignes compressées (CSR) dans trois tableaux NumPy, sans dépendance à scipy :
+#   indptr (P + 1,) : les ingrédients du produit p occupent les positions indptr[p]:indptr[p + 1]
+#   indices (Q,) : indice de l'ingrédient de chaque position
+#   quantites (Q,) : quantité de l'ingrédient par unité de produit
+# Les coûts unitaires (prix des ingrédients -> produits) et les achats d'ingrédients
+# (commandes -> ingrédients) sont deux produits matrice creuse x matrice dense, évalués en
+# une opération pour un lot de N scénarios de prix ou de volumes. Le produit parcourt les
+# recettes par rang (1er ingrédient de chaque produit, puis 2e...) : chaque rang ajoute des
+# lignes entières du lot (N valeurs contiguës), sans tableau intermédiaire de taille N x Q.
+# Les achats utilisent la même structure transposée (ingrédient -> produits).
+import numpy as np
+
+from imports_differes import ModuleDiffere
+
+pd = ModuleDiffere("pandas")
+
+
+class Recettes:
+    def __init__(self, produits=(), ingredients=(), indptr=(0,), indices=(), quantites=()):
+        self.produits = list(produits)
+        self.ingredients = list(ingredients)
+        self.indptr = np.asarray(indptr, dtype=np.intp)
+        self.indices = np.asarray(indices, dtype=np.intp)
+        self.quantites = np.asarray(quantites, dtype=float)
+        if len(self.indptr) != len(self.produits) + 1 or self.indptr[-1] != len(self.indices):
+            raise ValueError("Structure de recettes incohérente")
+        if len(self.indices) != len(self.quantites):
+            raise ValueError("Les indices et les quantités des recettes n'ont pas la même longueur")
+        # Produit (ligne) de chaque position
+        self.lignes = np.repeat(np.arange(len(self.produits)), np.diff(self.indptr))
+        # Structure transposée : produits utilisant chaque ingrédient
+        ordre = np.argsort(self.indices, kind='stable')
+        self.indptr_ingredients = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.indices, minlength=len(self.ingredients)))]).astype(np.intp)
+        self.produits_ingredients = self.lignes[ordre]
+        self.quantites_ingredients = self.quantites[ordre]
+        self._positions = {nom: i for i, nom in enumerate(self.produits)}
+
+    # Recettes à partir de lignes (produit, ingrédient, quantité) ; les lignes répétées
+    # s'additionnent, les quantités nulles sont ignorées
+    @classmethod
+    def depuis_lignes(cls, lignes, ingredients=None):
+        lignes = [(str(p), str(i), float(q)) for p, i, q in lignes if q]
+        produits = list(dict.fromkeys(p for p, _, _ in lignes))
+        ingredients = list(ingredients or [])
+        ingredients += [i for i in dict.fromkeys(i for _, i, _ in lignes) if i not in ingredients]
+        pos_produits = {nom: k for k, nom in enumerate(produits)}
+        pos_ingredients = {nom: k for k, nom in enumerate(ingredients)}
+
+        rangs = np.array([pos_produits[p] for p, _, _ in lignes], dtype=np.intp)
+        colonnes = np.array([pos_ingredients[i] for _, i, _ in lignes], dtype=np.intp)
+        quantites = np.array([q for _, _, q in lignes])
+        # Tri par produit puis ingrédient, et cumul des doublons
+        cles, inverse = np.unique(rangs * len(ingredients) + colonnes, return_inverse=True)
+        cumul = np.bincount(inverse, weights=quantites, minlength=len(cles))
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(cles // max(len(ingredients), 1),
+                                                            minlength=len(produits)))])
+        return cls(produits, ingredients, indptr, cles % max(len(ingredients), 1), cumul)
+
+    # Recettes à partir d'un DataFrame de colonnes produit, ingredient, quantite
+    @classmethod
+    def depuis_dataframe(cls, tableau, ingredients=None):
+        manquantes = [c for c in ('produit', 'ingredient', 'quantite') if c not in tableau.columns]
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes dans les recettes : {', '.join(manquantes)}")
+        tableau = tableau.dropna(subset=['produit', 'ingredient'])
+        quantites = pd.to_numeric(tableau['quantite'], errors='coerce').fillna(0.0)
+        return cls.depuis_lignes(zip(tableau['produit'], tableau['ingredient'], quantites), ingredients)
+
+    # Lecture d'un fichier CSV (chemin ou objet fichier) au format de depuis_dataframe
+    @classmethod
+    def importer(cls, fichier, ingredients=None):
+        return cls.depuis_dataframe(pd.read_csv(fichier), ingredients)
+
+    def __len__(self):
+        return len(self.produits)
+
+    def __contains__(self, produit):
+        return produit in self._positions
+
+    # Recettes figées (modèle partagé entre sessions) : tableaux en lecture seule
+    def figer(self):
+        self.produits = tuple(self.produits)
+        self.ingredients = tuple(self.ingredients)
+        for tableau in (self.indptr, self.indices, self.quantites, self.lignes, self.indptr_ingredients,
+                        self.produits_ingredients, self.quantites_ingredients):
+            tableau.flags.writeable = False
+        return self
+
+    # Lignes (produit, ingrédient, quantité), au format de depuis_dataframe
+    def en_dataframe(self):
+        return pd.DataFrame({
+            'produit': [self.produits[p] for p in self.lignes],
+            'ingredient': [self.ingredients[i] for i in self.indices],
+            'quantite': self.quantites,
+        })
+
+    # Matrice dense (P, I), pour l'affichage ou les vérifications
+    def en_matrice(self):
+        dense = np.zeros((len(self.produits), len(self.ingredients)))
+        dense[self.lignes, self.indices] = self.quantites
+        return dense
+
+    # Coûts unitaires des produits (N, P) pour des prix d'ingrédients (I,) ou (N, I) : somme
+    # sur la recette des quantités x prix, chaque ingrédient étant majoré de son taux de
+    # perte (part de l'ingrédient acheté qui est jetée : 0.1 = 10 %)
+    def couts_unitaires(self, prix_ingredients, pertes=0.0):
+        prix = np.atleast_2d(np.asarray(prix_ingredients, dtype=float))
+        prix_effectifs = prix / (1.0 - np.asarray(pertes, dtype=float))
+        return _produit_creux(self.indptr, self.indices, self.quantites, prix_effectifs.T).T
+
+    # Quantités d'ingrédients à acheter (N, I) pour des volumes de produits (P,) ou (N, P)
+    # (commandes par jour x jours d'activité pour des achats mensuels), pertes comprises
+    def achats(self, volumes, pertes=0.0):
+        volumes = np.atleast_2d(np.asarray(volumes, dtype=float))
+        utilises = _produit_creux(self.indptr_ingredients, self.produits_ingredients,
+                                  self.quantites_ingredients, volumes.T).T
+        return utilises / (1.0 - np.asarray(pertes, dtype=float))
+
+    # Valeurs (I,) d'un dictionnaire {ingrédient: valeur} alignées sur les ingrédients des
+    # recettes (`defaut` pour les ingrédients absents)
+    def vecteur(self, valeurs, defaut=0.0):
+        return np.array([valeurs.get(nom, defaut) for nom in self.ingredients], dtype=float)
+
+    # Coûts unitaires (N, P) alignés sur les produits `noms` d'un catalogue : coût de la recette
+    # pour les produits qui en ont une, `couts_actuels` pour les autres. Retourne (coûts, masque
+    # des produits calculés).
+    def couts_catalogue(self, noms, couts_actuels, prix_ingredients, pertes=0.0):
+        calcules = self.couts_unitaires(prix_ingredients, pertes)
+        avec_recette = np.array([nom in self._positions for nom in noms], dtype=bool)
+        couts = np.tile(np.asarray(couts_actuels, dtype=float), (len(calcules), 1))
+        couts[:, avec_recette] = calcules[:, [self._positions[nom] for nom, a in zip(noms, avec_recette) if a]]
+        return couts, avec_recette
+
+    # Volumes des produits de la recette (P,) à partir des commandes d'un catalogue (produits
+    # sans recette ignorés)
+    def volumes_catalogue(self, noms, volumes):
+        alignes = np.zeros(len(self.produits))
+        for nom, volume in zip(noms, np.asarray(volumes, dtype=float)):
+            if nom in self._positions:
+                alignes[self._positions[nom]] = volume
+        return alignes
+
+
+# Produit d'une matrice creuse (R, C) stockée par lignes (indptr, indices, quantites) et d'une
+# matrice dense (C, N) : résultat (R, N), accumulé rang par rang
+def _produit_creux(indptr, indices, quantites, entrees):
+    entrees = np.ascontiguousarray(entrees)
+    longueurs = np.diff(indptr)
+    sortie = np.zeros((len(longueurs), entrees.shape[1]))
+    for rang in range(longueurs.max(initial=0)):
+        lignes = np.flatnonzero(longueurs > rang)
+        positions = indptr[lignes] + rang
+        sortie[lignes] += entrees[indices[positions]] * quantites[positions, np.newaxis]
+    return sortie
+
+
+# Lot de prix d'ingrédients (N, I) : scénario de référence, puis un choc de `variation`
+# (0.1 = +10 %) sur chaque ingrédient seul, puis `aleatoires` scénarios où tous les prix
+# varient ensemble (loi log-normale d'écart-type `volatilite`)
+def chocs_prix(prix_ingredients, variation=0.1, aleatoires=0, volatilite=0.1, graine=None):
+    prix = np.asarray(prix_ingredients, dtype=float)
+    isoles = prix * (1.0 + variation * np.eye(len(prix)))
+    rng = np.random.default_rng(graine)
+    communs = prix * rng.lognormal(-volatilite ** 2 / 2, volatilite, (aleatoires, len(prix)))
+    return np.vstack([prix, isoles, communs])
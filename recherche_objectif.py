@@ -0,0 +1,128 @@
+# Recherche de valeur cible : quelle valeur d'une saisie donne un profit par associé,
+# un profit net ou un temps de retour visé ?
+#
+# Le moteur est traité comme une boîte noire : la racine est cherchée par la méthode de
+# la fausse position (variante Illinois), vectorisée sur un lot de N cibles. Le profit
+# étant affine par morceaux en chacune des saisies (coude de l'impôt à zéro), la
+# convergence est atteinte en quelques évaluations du moteur.
+import numpy as np
+
+from moteur import calculer_indicateurs_lot, en_colonne, en_matrice
+
+# Indicateurs pouvant servir d'objectif
+OBJECTIFS = ('profit_par_associe', 'profit_net', 'temps_retour')
+
+# Saisies pouvant être résolues :
+#   commandes : multiplicateur des commandes par jour (répartition entre produits conservée)
+#   prix : prix de vente du produit `indice`      charge : charge mensuelle `indice`
+#   jours : jours d'activité par mois
+VARIABLES = ('commandes', 'prix', 'charge', 'jours')
+
+
+# Racines d'un lot de fonctions croissantes ou décroissantes sur [bas, haut] (tableaux (N,)).
+# `fonction(x)` évalue les N fonctions en x (N,) ; une ligne a convergé quand |f| <= tolerance
+# (scalaire ou (N,)) ou que l'intervalle est négligeable. Les lignes dont l'intervalle
+# n'encadre pas de racine valent nan. Retourne (racines, nombre d'itérations).
+def trouver_racines(fonction, bas, haut, tolerance=1e-9, iterations_max=100):
+    a, b = np.array(bas, dtype=float), np.array(haut, dtype=float)
+    fa, fb = fonction(a), fonction(b)
+    encadree = np.sign(fa) * np.sign(fb) <= 0
+    converge = ~encadree | (fa == 0) | (fb == 0)
+    b = np.where(fa == 0, a, b)
+    fb = np.where(fa == 0, fa, fb)
+
+    iterations = 0
+    for iterations in range(1, iterations_max + 1):
+        if converge.all():
+            break
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = np.where(fb != fa, (a * fb - b * fa) / (fb - fa), (a + b) / 2)
+        c = np.where(converge, b, c)
+        fc = fonction(c)
+
+        # Illinois : l'extrémité conservée deux fois de suite voit sa valeur divisée par deux
+        oppose = np.sign(fc) * np.sign(fb) < 0
+        a, fa = np.where(oppose, b, a), np.where(oppose, fb, fa / 2)
+        b, fb = c, fc
+        converge |= (np.abs(fb) <= tolerance) | (np.abs(b - a) <= 1e-12 * np.maximum(np.abs(b), 1.0))
+
+    return np.where(encadree, b, np.nan), iterations
+
+
+# Écart à la cible d'un indicateur (N,), monotone en la saisie. Le temps de retour,
+# infini pour un scénario non rentable, est comparé par son inverse (retour mensuel).
+def _ecart(indicateurs, objectif, cible):
+    if objectif == 'temps_retour':
+        with np.errstate(divide='ignore'):
+            return 1.0 / indicateurs['temps_retour'] - 1.0 / cible
+    return indicateurs[objectif] - cible
+
+
+# Valeur d'une saisie atteignant un objectif, pour un lot de N cibles et/ou de scénarios.
+#   objectif : élément de OBJECTIFS     cible : scalaire ou (N,)
+#   variable : élément de VARIABLES     indice : produit ou charge concerné
+#   tolerance : écart relatif à la cible toléré
+#   bas / haut : intervalle de recherche (scalaire ou (N,)) ; par défaut, de 0 à une borne
+#   large propre à la variable (100 x les commandes, 100 x le prix, 31 jours...)
+#   financement : charges_financieres, dotations et apport de calculer_indicateurs_lot
+# Retourne la valeur trouvée (nan si la cible est hors d'atteinte), la valeur actuelle,
+# les indicateurs au point trouvé et le nombre d'itérations.
+def resoudre_objectif(prix_vente, cout_unitaire, commandes_jour, charges_mensuelles,
+                      charges_investissement, jours_activite=30, taux_impot=20.0, nb_associes=6,
+                      objectif='profit_par_associe', cible=0.0, variable='commandes', indice=0,
+                      bas=None, haut=None, tolerance=1e-9, iterations_max=100, **financement):
+    if objectif not in OBJECTIFS:
+        raise ValueError(f"Objectif inconnu : {objectif}")
+    if variable not in VARIABLES:
+        raise ValueError(f"Variable inconnue : {variable}")
+
+    prix = en_matrice(prix_vente)
+    commandes = en_matrice(commandes_jour)
+    charges = en_matrice(charges_mensuelles)
+    jours = en_colonne(jours_activite)
+    cible = en_colonne(cible)
+    base = calculer_indicateurs_lot(prix, cout_unitaire, commandes, charges, charges_investissement,
+                                    jours, taux_impot, nb_associes, **financement)
+    n = max(len(cible), len(base['profit_net']))
+
+    # Valeur actuelle de la saisie et borne haute par défaut
+    if variable == 'commandes':
+        actuelle = np.ones(1)
+        borne = 100.0
+    elif variable == 'prix':
+        actuelle = prix[:, indice]
+        borne = 100.0 * np.maximum(np.maximum(actuelle, en_matrice(cout_unitaire)[:, indice]), 1.0)
+    elif variable == 'charge':
+        actuelle = charges[:, indice]
+        borne = 10.0 * (actuelle + np.maximum(base['revenu_brut'], 1.0))
+    else:
+        actuelle = jours
+        borne = 31.0
+    bas = np.broadcast_to(en_colonne(0.0 if bas is None else bas), (n,))
+    haut = np.broadcast_to(en_colonne(borne if haut is None else haut), (n,))
+
+    # Indicateurs du lot lorsque la saisie vaut x (N,)
+    def evaluer(x):
+        entrees = {'prix': prix, 'commandes': commandes, 'charges': charges, 'jours': jours}
+        if variable == 'commandes':
+            entrees['commandes'] = commandes * x[:, np.newaxis]
+        elif variable == 'jours':
+            entrees['jours'] = x
+        else:
+            cle = 'prix' if variable == 'prix' else 'charges'
+            modifiee = np.array(np.broadcast_to(entrees[cle], (n, entrees[cle].shape[1])))
+            modifiee[:, indice] = x
+            entrees[cle] = modifiee
+        return calculer_indicateurs_lot(entrees['prix'], cout_unitaire, entrees['commandes'],
+                                        entrees['charges'], charges_investissement, entrees['jours'],
+                                        taux_impot, nb_associes, **financement)
+
+    valeurs, iterations = trouver_racines(lambda x: _ecart(evaluer(x), objectif, cible),
+                                          bas, haut, tolerance * np.maximum(np.abs(cible), 1.0),
+                                          iterations_max)
+    return {
+        'valeur': valeurs,
+        'actuelle': np.broadcast_to(actuelle, (n,)),
+        'indicateurs': evaluer(np.where(np.isnan(valeurs), np.broadcast_to(actuelle, (n,)), valeurs)),
+        'iterations': iterations,
+    }
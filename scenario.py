@@ -0,0 +1,64 @@
+# Représentation canonique d'un scénario (l'ensemble des saisies de la page) et
+# empreinte stable servant de clé aux caches.
+import hashlib
+import json
+
+# Paramètres qui composent un scénario
+CLES_SCENARIO = (
+    'produits',
+    'prix_vente',
+    'cout_unitaire',
+    'commandes_jour',
+    'charges_mensuelles',
+    'charges_investissement',
+    'jours_activite',
+    'taux_impot',
+    'nb_associes',
+)
+
+
+# Construction d'un scénario à partir de l'état de session (ou de tout dictionnaire équivalent).
+# Les produits viennent du catalogue en colonnes (`catalogue`) s'il est présent, sinon des
+# dictionnaires produits / prix_vente / cout_unitaire / commandes_jour.
+def scenario_depuis_session(etat):
+    if 'catalogue' in etat:
+        parametres_produits = etat['catalogue'].parametres_scenario()
+    else:
+        produits = list(etat['produits'])
+        parametres_produits = {
+            'produits': produits,
+            'prix_vente': {p: float(etat['prix_vente'][p]) for p in produits},
+            'cout_unitaire': {p: float(etat['cout_unitaire'][p]) for p in produits},
+            'commandes_jour': {p: float(etat['commandes_jour'][p]) for p in produits},
+        }
+    return {
+        **parametres_produits,
+        'charges_mensuelles': {c: float(v) for c, v in etat['charges_mensuelles'].items()},
+        'charges_investissement': {i: float(v) for i, v in etat['charges_investissement'].items()},
+        'jours_activite': int(etat['jours_activite']),
+        'taux_impot': float(etat['taux_impot']),
+        'nb_associes': int(etat['nb_associes']),
+    }
+
+
+# Vecteurs NumPy-compatibles (dans l'ordre des produits) attendus par le moteur
+def vecteurs_scenario(scenario):
+    produits = scenario['produits']
+    return (
+        [scenario['prix_vente'][p] for p in produits],
+        [scenario['cout_unitaire'][p] for p in produits],
+        [scenario['commandes_jour'][p] for p in produits],
+        list(scenario['charges_mensuelles'].values()) or [0.0],
+        list(scenario['charges_investissement'].values()) or [0.0],
+        scenario['jours_activite'],
+        scenario['taux_impot'],
+        scenario['nb_associes'],
+    )
+
+
+# Empreinte canonique d'un scénario (ou d'une partie de ses paramètres avec `cles`).
+# Les dictionnaires sont sérialisés à clés triées : l'empreinte ne dépend que des valeurs.
+def hachage_scenario(scenario, cles=CLES_SCENARIO):
+    contenu = {cle: scenario[cle] for cle in cles}
+    texte = json.dumps(contenu, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(texte.encode('utf-8'), digest_size=16).hexdigest()
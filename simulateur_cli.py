@@ -0,0 +1,269 @@
+# Évaluation en ligne de commande de fichiers de scénarios, sans Streamlit.
+#
+# Chaque ligne d'entrée est un scénario. Les colonnes sont nommées "<paramètre>.<nom>" :
+#   prix_vente.Crêpes, cout_unitaire.Crêpes, commandes_jour.Crêpes, ...
+#   charges_mensuelles.Loyer, ..., charges_investissement.Crépier, ...
+# plus, optionnellement, jours_activite, taux_impot et nb_associes, et les déductions d'un plan
+# de financement (financement.deductions_mensuelles) : charges_financieres et dotations
+# mensuelles, apport des associés (par défaut, le total des investissements). Les autres colonnes
+# (identifiant, site, variante de menu...) sont recopiées telles quelles dans les résultats.
+# En JSON Lines, un scénario peut aussi être un objet imbriqué au format de scenario.py
+# ({"prix_vente": {"Crêpes": 30.0, ...}, ...}) : il est aplati avec le même séparateur.
+#
+# Exemple :
+#   python simulateur_cli.py scenarios.csv resultats.csv --taille-bloc 100000 --processus 4
+import argparse
+import io
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from moteur import INDICATEURS, INDICATEURS_A_MINIMISER, calculer_indicateurs_lot
+
+# Paramètres vectoriels lus dans les colonnes "<paramètre>.<nom>"
+PARAMETRES_PRODUITS = ('prix_vente', 'cout_unitaire', 'commandes_jour')
+PARAMETRES_CHARGES = ('charges_mensuelles', 'charges_investissement')
+
+# Valeurs par défaut des paramètres d'activité (identiques à la page)
+DEFAUTS_ACTIVITE = {'jours_activite': 30, 'taux_impot': 20.0, 'nb_associes': 6}
+
+# Déductions du financement par défaut (sans plan de financement)
+DEFAUTS_FINANCEMENT = {'charges_financieres': 0.0, 'dotations': 0.0}
+
+
+# Format d'un fichier d'après son extension
+def format_fichier(chemin):
+    extension = os.path.splitext(chemin)[1].lower()
+    formats = {'.csv': 'csv', '.json': 'json', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+    if extension not in formats:
+        raise ValueError(f"Format de fichier non supporté : {chemin}")
+    return formats[extension]
+
+
+# Lecture du fichier d'entrée par blocs de `taille_bloc` scénarios (mémoire bornée).
+# Un fichier .json (tableau unique) est lu d'un coup : préférer .jsonl pour les gros volumes.
+def lire_blocs(chemin, taille_bloc):
+    format = format_fichier(chemin)
+    if format == 'csv':
+        yield from pd.read_csv(chemin, chunksize=taille_bloc)
+    elif format == 'jsonl':
+        for bloc in pd.read_json(chemin, lines=True, chunksize=taille_bloc):
+            yield _aplatir(bloc)
+    elif format == 'json':
+        tout = _aplatir(pd.read_json(chemin))
+        for debut in range(0, len(tout), taille_bloc):
+            yield tout.iloc[debut:debut + taille_bloc]
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("La lecture Parquet nécessite pyarrow (pip install pyarrow)")
+        for lot in pq.ParquetFile(chemin).iter_batches(batch_size=taille_bloc):
+            yield lot.to_pandas()
+
+
+# Aplatissement des colonnes contenant des objets imbriqués ({"prix_vente": {...}})
+def _aplatir(bloc):
+    if len(bloc) and any(isinstance(v, dict) for v in bloc.iloc[0].values):
+        return pd.json_normalize(bloc.to_dict(orient='records'), sep='.')
+    return bloc
+
+
+# Colonnes d'un paramètre vectoriel, dans l'ordre du fichier
+def _colonnes(bloc, parametre):
+    prefixe = parametre + '.'
+    return [c for c in bloc.columns if isinstance(c, str) and c.startswith(prefixe)]
+
+
+# Évaluation d'un bloc de scénarios (exécutée dans un processus de travail)
+def evaluer_bloc(bloc):
+    colonnes = {p: _colonnes(bloc, p) for p in PARAMETRES_PRODUITS + PARAMETRES_CHARGES}
+
+    # Les produits sont alignés sur l'union des noms : un produit absent vaut 0
+    produits = []
+    for parametre in PARAMETRES_PRODUITS:
+        for colonne in colonnes[parametre]:
+            nom = colonne.split('.', 1)[1]
+            if nom not in produits:
+                produits.append(nom)
+
+    def matrice(parametre, noms):
+        cibles = [f'{parametre}.{nom}' for nom in noms]
+        return bloc.reindex(columns=cibles).to_numpy(dtype=float, na_value=0.0)
+
+    def charges(parametre):
+        if not colonnes[parametre]:
+            return np.zeros((len(bloc), 1))
+        return np.nan_to_num(bloc[colonnes[parametre]].to_numpy(dtype=float, na_value=0.0))
+
+    def activite(parametre):
+        defaut = {**DEFAUTS_ACTIVITE, **DEFAUTS_FINANCEMENT}[parametre]
+        if parametre in bloc.columns:
+            return bloc[parametre].fillna(defaut).to_numpy(dtype=float)
+        return defaut
+
+    investissements = charges('charges_investissement')
+    apport = None
+    if 'apport' in bloc.columns:
+        apport = bloc['apport'].to_numpy(dtype=float, na_value=np.nan)
+        apport = np.where(np.isnan(apport), investissements.sum(axis=1), apport)
+
+    lot = calculer_indicateurs_lot(
+        matrice('prix_vente', produits),
+        matrice('cout_unitaire', produits),
+        matrice('commandes_jour', produits),
+        charges('charges_mensuelles'),
+        investissements,
+        activite('jours_activite'),
+        activite('taux_impot'),
+        activite('nb_associes'),
+        activite('charges_financieres'),
+        activite('dotations'),
+        apport
+    )
+
+    # Colonnes descriptives recopiées, suivies des indicateurs
+    utilisees = set(sum(colonnes.values(), [])) | set(DEFAUTS_ACTIVITE) | set(DEFAUTS_FINANCEMENT) | {'apport'}
+    resultats = bloc[[c for c in bloc.columns if c not in utilisees]].reset_index(drop=True)
+    for cle in INDICATEURS:
+        resultats[cle] = lot[cle]
+    return resultats
+
+
+# Sérialisation d'un bloc de résultats en texte CSV (sans en-tête) ou JSON Lines :
+# retourne (colonnes, texte, nombre de lignes).
+# Le formatage des flottants est coûteux : il est fait dans les processus de travail.
+def serialiser(resultats, format):
+    if format == 'csv':
+        texte = resultats.to_csv(header=False, index=False)
+    else:
+        texte = resultats.to_json(orient='records', lines=True, force_ascii=False)
+    return list(resultats.columns), texte, len(resultats)
+
+
+# Évaluation d'un bloc, sérialisé directement si la sortie est textuelle
+def _traiter_bloc(bloc, format_texte):
+    resultats = evaluer_bloc(bloc)
+    return serialiser(resultats, format_texte) if format_texte else resultats
+
+
+# Écriture incrémentale des résultats (CSV, JSON Lines ou Parquet).
+# `ecrire` accepte un DataFrame ou un bloc déjà sérialisé par serialiser().
+class EcrivainResultats:
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.format = format_fichier(chemin)
+        if self.format == 'json':
+            raise ValueError("Utilisez .jsonl pour écrire les résultats en JSON (écriture en flux)")
+        self._premier = True
+        self._colonnes = None
+        self._parquet = None
+
+    # Bloc aligné sur les colonnes du premier bloc écrit (en-tête CSV, schéma Parquet) : des
+    # lignes JSON aux clés différentes d'un bloc à l'autre ne décalent pas les colonnes
+    def _aligner(self, resultats):
+        if isinstance(resultats, tuple):
+            colonnes, texte, nombre = resultats
+            if colonnes == self._colonnes or self.format == 'jsonl' or not nombre:
+                return resultats
+            # Relu en texte : les valeurs déjà formatées sont recopiées telles quelles
+            resultats = pd.read_csv(io.StringIO(texte), names=colonnes, header=None, dtype=str,
+                                    keep_default_na=False)
+        elif list(resultats.columns) == self._colonnes or self.format == 'jsonl':
+            return resultats
+        return resultats.reindex(columns=self._colonnes)
+
+    def ecrire(self, resultats):
+        if self._colonnes is None:
+            self._colonnes = list(resultats[0] if isinstance(resultats, tuple) else resultats.columns)
+        resultats = self._aligner(resultats)
+        if self.format in ('csv', 'jsonl'):
+            colonnes, texte, _ = (resultats if isinstance(resultats, tuple)
+                                  else serialiser(resultats, self.format))
+            with open(self.chemin, 'w' if self._premier else 'a', encoding='utf-8', newline='') as f:
+                if self._premier and self.format == 'csv':
+                    f.write(pd.DataFrame(columns=colonnes).to_csv(index=False))
+                f.write(texte)
+                if texte and not texte.endswith('\n'):
+                    f.write('\n')
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(resultats, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.chemin, table.schema)
+            self._parquet.write_table(table)
+        self._premier = False
+
+    def fermer(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+# Évaluation des blocs dans un pool de processus, en conservant l'ordre du fichier.
+# Au plus 2 blocs par processus sont en vol : la mémoire reste bornée quelle que soit l'entrée.
+# Avec `format_texte` ('csv' ou 'jsonl'), les blocs sont retournés déjà sérialisés.
+def evaluer_fichier(blocs, processus=None, format_texte=None):
+    processus = processus or os.cpu_count() or 1
+    if processus == 1:
+        for bloc in blocs:
+            yield _traiter_bloc(bloc, format_texte)
+        return
+
+    with ProcessPoolExecutor(max_workers=processus) as executeur:
+        en_cours = deque()
+        for bloc in blocs:
+            en_cours.append(executeur.submit(_traiter_bloc, bloc, format_texte))
+            if len(en_cours) >= 2 * processus:
+                yield en_cours.popleft().result()
+        while en_cours:
+            yield en_cours.popleft().result()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Évaluation des indicateurs d'un fichier de scénarios")
+    parser.add_argument("entree", help="Fichier de scénarios (.csv, .json, .jsonl, .parquet)")
+    parser.add_argument("sortie", help="Fichier de résultats (.csv, .jsonl, .parquet)")
+    parser.add_argument("--taille-bloc", type=int, default=100_000,
+                        help="Nombre de scénarios lus et évalués par bloc (défaut : 100000)")
+    parser.add_argument("--processus", type=int, default=None,
+                        help="Nombre de processus de calcul (défaut : nombre de cœurs)")
+    parser.add_argument("--meilleurs", type=int, default=None,
+                        help="N'écrire que les N meilleurs scénarios selon --critere")
+    parser.add_argument("--critere", default="profit_net", choices=INDICATEURS,
+                        help="Indicateur de classement pour --meilleurs, les coûts, le seuil et le délai "
+                             "classés du plus bas au plus haut (défaut : profit_net)")
+    args = parser.parse_args(arguments)
+
+    ecrivain = EcrivainResultats(args.sortie)
+    meilleurs = None
+    total = 0
+    # Sans classement, les sorties textuelles sont sérialisées par les processus de calcul
+    format_texte = ecrivain.format if args.meilleurs is None and ecrivain.format != 'parquet' else None
+    try:
+        blocs = lire_blocs(args.entree, args.taille_bloc)
+        for resultats in evaluer_fichier(blocs, args.processus, format_texte):
+            if args.meilleurs is None:
+                total += resultats[2] if format_texte else len(resultats)
+                ecrivain.ecrire(resultats)
+            else:
+                total += len(resultats)
+                # Classement en mémoire bornée : seuls les N meilleurs sont conservés
+                candidats = resultats if meilleurs is None else pd.concat([meilleurs, resultats])
+                ascendant = args.critere in INDICATEURS_A_MINIMISER
+                meilleurs = (candidats.nsmallest(args.meilleurs, args.critere) if ascendant
+                             else candidats.nlargest(args.meilleurs, args.critere))
+        if meilleurs is not None:
+            ecrivain.ecrire(meilleurs)
+    finally:
+        ecrivain.fermer()
+
+    print(f"{total} scénarios évalués -> {args.sortie}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+# Calibrage de la demande à partir des exports de caisse (point de vente).
+#
+# Un export est un fichier CSV, JSON Lines ou Parquet dont chaque ligne est un article
+# vendu : date (ou horodatage) de la vente, libellé de l'article et, optionnellement,
+# quantité (1 par défaut). Les noms de colonnes usuels sont reconnus (COLONNES_POS).
+#
+# Les fichiers sont lus par blocs, en ne chargeant que ces trois colonnes : la mémoire
+# reste bornée quelle que soit la taille de l'export. Les ventes sont cumulées dans une
+# matrice jours x libellés (VentesAgregees) ; la correspondance avec les produits du
+# catalogue n'est faite qu'au calibrage, ce qui permet de la corriger sans relire les
+# fichiers. L'agrégat et le manifeste des fichiers traités (taille, date de modification)
+# sont conservés dans un dossier d'état : une nouvelle importation ne lit que les fichiers
+# nouveaux, et tout recalcule si un fichier déjà traité a changé.
+#
+# Exemple :
+#   python ventes_pos.py exports/*.csv --etat .ventes_pos --sortie calibrage.csv
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import unicodedata
+
+import numpy as np
+
+from imports_differes import ModuleDiffere
+
+pd = ModuleDiffere("pandas")
+
+# Noms de colonnes reconnus dans les exports (comparés sans casse ni accents)
+COLONNES_POS = {
+    'date': ('date', 'horodatage', 'date_heure', 'datetime', 'timestamp', 'date_vente'),
+    'article': ('produit', 'article', 'libelle', 'designation', 'item', 'product'),
+    'quantite': ('quantite', 'qte', 'qty', 'quantity', 'nombre'),
+}
+
+# Nombre de lignes lues par bloc, et taille des blocs lus par pyarrow quand il est installé
+TAILLE_BLOC = 500_000
+OCTETS_BLOC_ARROW = 16 << 20
+
+# Quantiles rapportés pour les distributions journalières et hebdomadaires
+QUANTILES = (0.1, 0.5, 0.9)
+
+# Fichiers du dossier d'état
+FICHIER_AGREGAT = "agregat.npz"
+FICHIER_MANIFESTE = "manifeste.json"
+
+
+# Libellé normalisé (sans casse, accents ni espaces superflus) pour les correspondances
+def normaliser(libelle):
+    texte = unicodedata.normalize('NFKD', str(libelle))
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return ' '.join(texte.lower().split())
+
+
+# Format d'un export d'après son extension
+def format_export(nom):
+    extension = os.path.splitext(nom)[1].lower()
+    formats = {'.csv': 'csv', '.txt': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+    if extension not in formats:
+        raise ValueError(f"Format d'export non supporté : {nom}")
+    return formats[extension]
+
+
+# Colonnes de l'export {rôle: nom de colonne} parmi `noms` ; `colonnes` force certains noms
+def reconnaitre_colonnes(noms, colonnes=None):
+    normalises = {normaliser(nom): nom for nom in noms}
+    trouvees = {}
+    for role, candidats in COLONNES_POS.items():
+        if colonnes and colonnes.get(role):
+            trouvees[role] = colonnes[role]
+            continue
+        for candidat in candidats:
+            if candidat in normalises:
+                trouvees[role] = normalises[candidat]
+                break
+    manquantes = [role for role in ('date', 'article') if role not in trouvees]
+    if manquantes:
+        raise ValueError(f"Colonnes introuvables dans l'export : {', '.join(manquantes)}")
+    return trouvees
+
+
+# Lecture d'un export (chemin ou objet fichier) par blocs de `taille_bloc` lignes ; seuls la
+# date, l'article et la quantité sont chargés. Retourne un itérateur de DataFrames aux
+# colonnes 'date', 'article' et, si présente, 'quantite'. Les CSV sont lus en colonnes par
+# pyarrow s'il est installé (lecture multithread, environ trois fois plus rapide), sinon
+# par pandas.
+def lire_export(source, format, taille_bloc=TAILLE_BLOC, colonnes=None):
+    if format == 'csv':
+        separateur = _separateur(source)
+        entete = pd.read_csv(source, sep=separateur, nrows=0)
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        trouvees = reconnaitre_colonnes(entete.columns, colonnes)
+        if importlib.util.find_spec('pyarrow') is not None:
+            blocs = _blocs_csv_arrow(source, separateur, trouvees)
+        else:
+            blocs = pd.read_csv(source, sep=separateur, usecols=list(trouvees.values()),
+                                dtype={trouvees['article']: 'category'}, chunksize=taille_bloc)
+    elif format == 'jsonl':
+        blocs = pd.read_json(source, lines=True, chunksize=taille_bloc, dtype=False)
+        trouvees = None
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("La lecture Parquet nécessite pyarrow (pip install pyarrow)")
+        fichier = pq.ParquetFile(source)
+        trouvees = reconnaitre_colonnes(fichier.schema_arrow.names, colonnes)
+        blocs = (lot.to_pandas() for lot in
+                 fichier.iter_batches(batch_size=taille_bloc, columns=list(trouvees.values())))
+
+    for bloc in blocs:
+        roles = trouvees or reconnaitre_colonnes(bloc.columns, colonnes)
+        yield bloc[list(roles.values())].rename(columns={nom: role for role, nom in roles.items()})
+
+
+# Blocs d'un CSV lus par pyarrow : articles en dictionnaire (catégories), dates et quantités
+# lues en texte puis converties par pyarrow ; un bloc contenant une valeur que pyarrow ne sait
+# pas convertir garde son texte, converti comme avec pandas (valeurs invalides ignorées)
+def _blocs_csv_arrow(source, separateur, trouvees):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    types = {nom: pa.string() for nom in trouvees.values()}
+    types[trouvees['article']] = pa.dictionary(pa.int32(), pa.string())
+    conversions = {trouvees['date']: pa.timestamp('ns')}
+    if 'quantite' in trouvees:
+        conversions[trouvees['quantite']] = pa.float64()
+    lecteur = pa_csv.open_csv(source, read_options=pa_csv.ReadOptions(block_size=OCTETS_BLOC_ARROW),
+                              parse_options=pa_csv.ParseOptions(delimiter=separateur),
+                              convert_options=pa_csv.ConvertOptions(include_columns=list(trouvees.values()),
+                                                                    column_types=types,
+                                                                    strings_can_be_null=True))
+    for lot in lecteur:
+        for nom, type_cible in conversions.items():
+            position = lot.schema.get_field_index(nom)
+            try:
+                lot = lot.set_column(position, nom, lot.column(position).cast(type_cible))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                pass
+        yield lot.to_pandas()
+
+
+# Séparateur d'un CSV d'après sa première ligne (virgule, point-virgule ou tabulation)
+def _separateur(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+        ligne = source.readline()
+        source.seek(0)
+        if isinstance(ligne, bytes):
+            ligne = ligne.decode('utf-8', errors='replace')
+    else:
+        with open(source, encoding='utf-8', errors='replace') as f:
+            ligne = f.readline()
+    return max((',', ';', '\t'), key=ligne.count)
+
+
+# Ventes cumulées par jour et par libellé d'article :
+#   libelles : libellés tels qu'ils apparaissent dans les exports (premier rencontré)
+#   origine : premier jour couvert (jours depuis le 1er janvier 1970)
+#   quantites : (jours, libellés) quantités vendues
+#   fichiers : manifeste {nom: signature} des fichiers déjà importés
+#   lignes, lignes_ignorees : lignes comptées et lignes rejetées (date ou quantité invalide)
+class VentesAgregees:
+    def __init__(self):
+        self.libelles = []
+        self._positions = {}
+        self.origine = None
+        self.quantites = np.zeros((0, 0))
+        self.fichiers = {}
+        self.lignes = 0
+        self.lignes_ignorees = 0
+
+    # Positions (colonnes) des libellés, ajoutés s'ils sont nouveaux
+    def _colonnes(self, libelles):
+        positions = np.empty(len(libelles), dtype=np.intp)
+        for i, libelle in enumerate(libelles):
+            cle = normaliser(libelle)
+            if cle not in self._positions:
+                self._positions[cle] = len(self.libelles)
+                self.libelles.append(str(libelle))
+            positions[i] = self._positions[cle]
+        return positions
+
+    # Agrandissement de la matrice pour couvrir les jours [premier, dernier] et tous les libellés
+    def _etendre(self, premier, dernier):
+        if self.origine is None:
+            self.origine = premier
+        debut = min(premier, self.origine)
+        fin = max(dernier + 1, self.origine + len(self.quantites))
+        forme = (fin - debut, len(self.libelles))
+        if forme != self.quantites.shape:
+            etendue = np.zeros(forme)
+            decalage = self.origine - debut
+            etendue[decalage:decalage + len(self.quantites), :self.quantites.shape[1]] = self.quantites
+            self.quantites = etendue
+            self.origine = debut
+
+    # Ajout d'un bloc de lignes (colonnes 'date', 'article' et, optionnellement, 'quantite')
+    def ajouter_bloc(self, bloc, format_date=None):
+        dates = pd.to_datetime(bloc['date'], format=format_date or 'ISO8601', errors='coerce')
+        quantites = (pd.to_numeric(bloc['quantite'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+                     if 'quantite' in bloc else np.ones(len(bloc)))
+        articles = bloc['article']
+        if isinstance(articles.dtype, pd.CategoricalDtype):
+            codes, uniques = articles.cat.codes.to_numpy(), articles.cat.categories
+        else:
+            codes, uniques = pd.factorize(articles)
+        valides = dates.notna().to_numpy() & np.isfinite(quantites) & (codes >= 0)
+        self.lignes += int(valides.sum())
+        self.lignes_ignorees += int(len(bloc) - valides.sum())
+        if not valides.any():
+            return
+
+        jours = dates.to_numpy()[valides].astype('datetime64[D]').astype(np.int64)
+        colonnes = self._colonnes(uniques)[codes[valides]]
+        premier, dernier = int(jours.min()), int(jours.max())
+        self._etendre(premier, dernier)
+
+        # Cumul du bloc sur les seuls jours qu'il couvre (matrice jours x libellés aplatie)
+        largeur = len(self.libelles)
+        cumul = np.bincount((jours - premier) * largeur + colonnes, weights=quantites[valides],
+                            minlength=(dernier - premier + 1) * largeur)
+        debut = premier - self.origine
+        self.quantites[debut:debut + dernier - premier + 1] += cumul.reshape(-1, largeur)
+
+    # Importation d'un export (chemin ou objet fichier) enregistrée sous `nom` dans le manifeste
+    def importer(self, source, nom=None, signature=None, format=None, taille_bloc=TAILLE_BLOC,
+                 colonnes=None, format_date=None):
+        nom = nom or str(source)
+        for bloc in lire_export(source, format or format_export(nom), taille_bloc, colonnes):
+            self.ajouter_bloc(bloc, format_date)
+        self.fichiers[nom] = signature or {}
+
+    def deja_importe(self, nom, signature):
+        return self.fichiers.get(nom) == signature
+
+    def copie(self):
+        autre = VentesAgregees()
+        autre._colonnes(self.libelles)
+        autre.origine = self.origine
+        autre.quantites = self.quantites.copy()
+        autre.fichiers = dict(self.fichiers)
+        autre.lignes = self.lignes
+        autre.lignes_ignorees = self.lignes_ignorees
+        return autre
+
+    # Jours couverts (datetime64[D]) et masque des jours d'ouverture (au moins une vente)
+    def jours(self):
+        jours = np.arange(self.origine or 0, (self.origine or 0) + len(self.quantites)).astype('datetime64[D]')
+        return jours, self.quantites.sum(axis=1) > 0
+
+    def enregistrer(self, dossier):
+        os.makedirs(dossier, exist_ok=True)
+        np.savez_compressed(os.path.join(dossier, FICHIER_AGREGAT), quantites=self.quantites,
+                            libelles=np.array(self.libelles, dtype=str),
+                            origine=np.array(-1 if self.origine is None else self.origine))
+        with open(os.path.join(dossier, FICHIER_MANIFESTE), 'w', encoding='utf-8') as f:
+            json.dump({'fichiers': self.fichiers, 'lignes': self.lignes,
+                       'lignes_ignorees': self.lignes_ignorees}, f, ensure_ascii=False, indent=2)
+
+    # Agrégat enregistré dans `dossier` (agrégat vide si le dossier n'en contient pas)
+    @classmethod
+    def charger(cls, dossier):
+        ventes = cls()
+        manifeste = os.path.join(dossier, FICHIER_MANIFESTE)
+        if not os.path.exists(manifeste):
+            return ventes
+        with open(manifeste, encoding='utf-8') as f:
+            etat = json.load(f)
+        with np.load(os.path.join(dossier, FICHIER_AGREGAT)) as agregat:
+            ventes.quantites = agregat['quantites']
+            ventes._colonnes(agregat['libelles'].tolist())
+            origine = int(agregat['origine'])
+        ventes.origine = None if origine < 0 else origine
+        ventes.fichiers = etat['fichiers']
+        ventes.lignes = etat['lignes']
+        ventes.lignes_ignorees = etat['lignes_ignorees']
+        return ventes
+
+
+# Signature d'un fichier sur disque (un fichier modifié change de signature)
+def signature_fichier(chemin):
+    etat = os.stat(chemin)
+    return {'taille': etat.st_size, 'mtime_ns': etat.st_mtime_ns}
+
+
+# Importation incrémentale de fichiers d'exports dans le dossier d'état `dossier` : seuls les
+# fichiers absents du manifeste sont lus ; si un fichier déjà importé a changé, l'agrégat
+# est reconstruit à partir de tous les fichiers. Retourne (ventes, fichiers lus).
+def importer_fichiers(chemins, dossier=None, taille_bloc=TAILLE_BLOC, colonnes=None, format_date=None):
+    ventes = VentesAgregees.charger(dossier) if dossier else VentesAgregees()
+    chemins = [os.path.abspath(chemin) for chemin in chemins]
+    signatures = {chemin: signature_fichier(chemin) for chemin in chemins}
+    modifies = [c for c in chemins if c in ventes.fichiers and not ventes.deja_importe(c, signatures[c])]
+    if modifies:
+        anciens = [c for c in ventes.fichiers if c not in signatures and os.path.exists(c)]
+        signatures.update({chemin: signature_fichier(chemin) for chemin in anciens})
+        chemins = anciens + chemins
+        ventes = VentesAgregees()
+
+    lus = []
+    for chemin in chemins:
+        if not ventes.deja_importe(chemin, signatures[chemin]):
+            ventes.importer(chemin, chemin, signatures[chemin], taille_bloc=taille_bloc,
+                            colonnes=colonnes, format_date=format_date)
+            lus.append(chemin)
+    if dossier:
+        ventes.enregistrer(dossier)
+    return ventes, lus
+
+
+# Ventes journalières (jours d'ouverture, P) des produits `noms` ; un libellé correspond au
+# produit de même nom normalisé, ou à celui que lui associe `correspondances` {libellé: produit}.
+# Retourne (ventes, dates des jours d'ouverture, {libellé non reconnu: quantité totale}).
+def ventes_par_produit(ventes, noms, correspondances=None):
+    positions = {normaliser(nom): i for i, nom in enumerate(noms)}
+    for libelle, produit in (correspondances or {}).items():
+        if normaliser(produit) in positions:
+            positions[normaliser(libelle)] = positions[normaliser(produit)]
+    cibles = np.array([positions.get(normaliser(l), -1) for l in ventes.libelles], dtype=np.intp)
+
+    dates, ouverts = ventes.jours()
+    quantites = ventes.quantites[ouverts]
+    par_produit = np.zeros((len(quantites), len(noms)))
+    reconnus = np.flatnonzero(cibles >= 0)
+    if len(reconnus):
+        # Somme des colonnes des libellés d'un même produit (matrice de correspondance 0/1)
+        correspondance = np.zeros((len(ventes.libelles), len(noms)))
+        correspondance[reconnus, cibles[reconnus]] = 1.0
+        par_produit = quantites @ correspondance
+    totaux = quantites.sum(axis=0)
+    non_reconnus = {ventes.libelles[i]: float(totaux[i]) for i in np.flatnonzero(cibles < 0) if totaux[i] > 0}
+    return par_produit, dates[ouverts], non_reconnus
+
+
+# Coefficients (P, k) de la demande journalière moyenne par groupe de jours (mois calendaire,
+# jour de la semaine...) rapportée à la moyenne générale ; 1 pour les groupes sans données
+def _coefficients(par_jour, groupes, k, moyenne):
+    sommes = np.zeros((k, par_jour.shape[1]))
+    np.add.at(sommes, groupes, par_jour)
+    effectifs = np.bincount(groupes, minlength=k)[:, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coefficients = sommes / effectifs / moyenne
+    return np.where(np.isfinite(coefficients) & (effectifs > 0), coefficients, 1.0).T
+
+
+# Calibrage des paramètres du simulateur pour les produits `noms` :
+#   'commandes_jour' (P,) : moyenne des ventes par jour d'ouverture
+#   'dispersion' (P,) : variance / moyenne des ventes journalières (au moins 1, loi de Poisson)
+#   'saisonnalite' (P, 12) : coefficients par mois calendaire (format de projection.py)
+#   'profil_semaine' (P, 7) : coefficients par jour de la semaine, du lundi au dimanche
+#   'quantiles_jour', 'quantiles_semaine' (len(QUANTILES), P) : distribution des ventes par jour
+#   d'ouverture et par semaine complète
+#   'jours_observes', 'premier_jour', 'dernier_jour', 'non_reconnus'
+def calibrer(ventes, noms, correspondances=None):
+    par_jour, dates, non_reconnus = ventes_par_produit(ventes, noms, correspondances)
+    p = len(noms)
+    if not len(dates):
+        raise ValueError("Aucune vente importée")
+
+    moyenne = par_jour.mean(axis=0)
+    variance = par_jour.var(axis=0, ddof=1) if len(dates) > 1 else np.zeros(p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dispersion = np.where(moyenne > 0, variance / moyenne, 1.0)
+
+    mois = dates.astype('datetime64[M]').astype(np.int64) % 12
+    numeros = dates.astype(np.int64)
+    jour_semaine = (numeros + 3) % 7  # le 1er janvier 1970 était un jeudi
+
+    # Semaines complètes (du lundi au dimanche) entièrement comprises dans la période observée
+    semaines = (numeros + 3) // 7
+    premiere = semaines[0] + (jour_semaine[0] != 0)
+    derniere = semaines[-1] - (jour_semaine[-1] != 6)
+    dans_periode = (semaines >= premiere) & (semaines <= derniere)
+    par_semaine = np.zeros((max(derniere - premiere + 1, 0), p))
+    np.add.at(par_semaine, semaines[dans_periode] - premiere, par_jour[dans_periode])
+
+    return {
+        'commandes_jour': moyenne,
+        'dispersion': np.maximum(dispersion, 1.0),
+        'saisonnalite': _coefficients(par_jour, mois, 12, moyenne),
+        'profil_semaine': _coefficients(par_jour, jour_semaine, 7, moyenne),
+        'quantiles_jour': np.quantile(par_jour, QUANTILES, axis=0),
+        'quantiles_semaine': (np.quantile(par_semaine, QUANTILES, axis=0) if len(par_semaine)
+                              else np.full((len(QUANTILES), p), np.nan)),
+        'jours_observes': len(dates),
+        'premier_jour': dates[0],
+        'dernier_jour': dates[-1],
+        'non_reconnus': non_reconnus,
+    }
+
+
+# Tableau récapitulatif d'un calibrage (une ligne par produit)
+def tableau_calibrage(calibrage, noms):
+    from projection import MOIS
+    tableau = pd.DataFrame({
+        'produit': list(noms),
+        'commandes_jour': calibrage['commandes_jour'],
+        'dispersion': calibrage['dispersion'],
+        **{f'jour_q{int(q * 100)}': calibrage['quantiles_jour'][i] for i, q in enumerate(QUANTILES)},
+        **{f'semaine_q{int(q * 100)}': calibrage['quantiles_semaine'][i] for i, q in enumerate(QUANTILES)},
+    })
+    saisons = pd.DataFrame(calibrage['saisonnalite'], columns=[f'saison_{m}' for m in MOIS])
+    return pd.concat([tableau, saisons], axis=1)
+
+
+# Correspondances {libellé: produit} lues dans un CSV de colonnes libelle, produit
+def lire_correspondances(chemin):
+    tableau = pd.read_csv(chemin)
+    return dict(zip(tableau['libelle'].astype(str), tableau['produit'].astype(str)))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Calibrage de la demande à partir d'exports de caisse")
+    parser.add_argument("exports", nargs='+', help="Fichiers d'export (.csv, .jsonl, .parquet)")
+    parser.add_argument("--etat", default=None,
+                        help="Dossier d'état (agrégat et manifeste) pour les importations incrémentales")
+    parser.add_argument("--catalogue", default=None,
+                        help="Catalogue CSV (colonne produit) ; par défaut, les produits de la page")
+    parser.add_argument("--correspondances", default=None,
+                        help="CSV de colonnes libelle, produit associant les libellés de caisse aux produits")
+    parser.add_argument("--format-date", default=None,
+                        help="Format strftime des dates (défaut : ISO 8601)")
+    parser.add_argument("--taille-bloc", type=int, default=TAILLE_BLOC,
+                        help=f"Nombre de lignes lues par bloc (défaut : {TAILLE_BLOC})")
+    parser.add_argument("--sortie", default=None, help="Fichier CSV du calibrage (défaut : sortie standard)")
+    args = parser.parse_args(arguments)
+
+    if args.catalogue:
+        from catalogue import Catalogue
+        noms = Catalogue.importer(args.catalogue).noms
+    else:
+        import defauts
+        noms = defauts.CATALOGUE.noms
+    correspondances = lire_correspondances(args.correspondances) if args.correspondances else None
+
+    ventes, lus = importer_fichiers(args.exports, args.etat, args.taille_bloc, format_date=args.format_date)
+    calibrage = calibrer(ventes, noms, correspondances)
+    tableau_calibrage(calibrage, noms).to_csv(args.sortie or sys.stdout, index=False, float_format='%.4f')
+
+    print(f"{len(lus)} fichier(s) lu(s), {ventes.lignes} lignes ({ventes.lignes_ignorees} ignorées), "
+          f"{calibrage['jours_observes']} jours d'ouverture du {calibrage['premier_jour']} "
+          f"au {calibrage['dernier_jour']}", file=sys.stderr)
+    if calibrage['non_reconnus']:
+        principaux = sorted(calibrage['non_reconnus'].items(), key=lambda e: -e[1])[:10]
+        print("Libellés non reconnus : " + ', '.join(f"{l} ({q:g})" for l, q in principaux), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()